@@ -0,0 +1 @@
+"""Benchmarks for the School Register System (run from the repository root)"""
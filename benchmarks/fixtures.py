@@ -0,0 +1,84 @@
+"""Scratch benchmark databases loaded with synthetic school data"""
+import os
+from datetime import date
+
+import mysql.connector
+
+import register
+from benchmarks.synthetic import (ATTENDANCE_COLUMNS, INCIDENT_COLUMNS, STUDENT_COLUMNS,
+                                  generate_attendance, generate_incidents, generate_students,
+                                  school_days)
+
+def insert_rows(connection, table, columns, rows, chunk_size=1000):
+    """Insert an iterable of tuples in multi-row chunks; returns the row count"""
+    cursor = connection.cursor()
+    query = (f"INSERT INTO {table} ({', '.join(columns)}) "
+             f"VALUES ({', '.join(['%s'] * len(columns))})")
+    count = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            cursor.executemany(query, chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        cursor.executemany(query, chunk)
+        count += len(chunk)
+    connection.commit()
+    cursor.close()
+    return count
+
+def reset_database(backend, database):
+    """Recreate the benchmark database from scratch and apply every migration
+    
+    `database` is a MySQL database name, or a file path (or ':memory:') for SQLite.
+    Returns a ConnectionPool for the new database.
+    """
+    if backend == 'sqlite':
+        if database == register.SQLITE_PATH:
+            raise ValueError("refusing to reset the application database; pass --database")
+        for suffix in ("", "-wal", "-shm"):
+            if database != ':memory:' and os.path.exists(database + suffix):
+                os.remove(database + suffix)
+        storage = register.SQLiteBackend(database)
+    else:
+        if database == register.DB_CONFIG['database']:
+            raise ValueError("refusing to reset the application database; pass --database")
+        db_config = dict(register.DB_CONFIG, database=database)
+        server_config = {k: v for k, v in db_config.items() if k != 'database'}
+        connection = mysql.connector.connect(**server_config)
+        cursor = connection.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+        cursor.execute(f"CREATE DATABASE `{database}`")
+        cursor.close()
+        connection.close()
+        storage = register.MySQLBackend(db_config)
+    
+    pool = register.ConnectionPool(storage, **register.POOL_CONFIG)
+    if register.SchoolRegisterSystem(pool=pool).run_migrations() is None:
+        raise RuntimeError("migrations failed on the benchmark database")
+    return pool
+
+def load_school(pool, forms=4, classes_per_form=3, students_per_class=40, days=20,
+                incident_rate=0.01, start=None, seed=1):
+    """Load a synthetic school; returns the students, school days and row counts"""
+    students = generate_students(forms, classes_per_form, students_per_class, seed)
+    school_calendar = school_days(start or date(2024, 1, 8), days)
+    
+    connection = pool.acquire()
+    try:
+        counts = {
+            'students': insert_rows(connection, "students", STUDENT_COLUMNS, students),
+            'daily_attendance': insert_rows(connection, "daily_attendance", ATTENDANCE_COLUMNS,
+                                            generate_attendance(students, school_calendar, seed)),
+            'student_incidents': insert_rows(connection, "student_incidents", INCIDENT_COLUMNS,
+                                             generate_incidents(students, school_calendar,
+                                                                incident_rate, seed)),
+        }
+    finally:
+        pool.release(connection)
+    
+    # Rows inserted directly bypass the rollup maintained by save_attendance
+    counts['class_daily_stats'] = register.SchoolRegisterSystem(pool=pool).rebuild_class_daily_stats()
+    return students, school_calendar, counts
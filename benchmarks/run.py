@@ -0,0 +1,237 @@
+"""Time SchoolRegisterSystem methods at several synthetic school sizes
+
+Usage (from the repository root, against a scratch database):
+
+    python -m benchmarks.run --database northlea_high_bench --output results.json
+    python -m benchmarks.run --scales small,medium --compare results.json --output new.json
+    python -m benchmarks.run --backend sqlite --database :memory: --output sqlite.json
+
+Each scale DROPS and recreates the target database, loads a synthetic school and
+times every case --repeat times with the caches cleared before each call, so the
+numbers measure the database path. Results are written as JSON; --compare prints
+each case's median against an earlier results file and exits with status 1 when
+any case is slower than --threshold times its previous median.
+"""
+import argparse
+import csv
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import register
+from benchmarks.baseline import calculate_monthly_summary_per_student
+from benchmarks.fixtures import load_school, reset_database
+from benchmarks.synthetic import ATTENDANCE_COLUMNS, generate_attendance
+
+SCALES = {
+    'small': dict(forms=2, classes_per_form=2, students_per_class=30, days=20, incident_rate=0.02),
+    'medium': dict(forms=4, classes_per_form=3, students_per_class=40, days=60, incident_rate=0.01),
+    'large': dict(forms=6, classes_per_form=4, students_per_class=45, days=190, incident_rate=0.01),
+}
+
+def _size(result):
+    """Rows (or students) a call returned, recorded so silent failures stand out"""
+    if isinstance(result, bool) or result is None:
+        return int(bool(result))
+    if isinstance(result, int):
+        return result
+    if isinstance(result, dict):
+        values = list(result.values())
+        if all(isinstance(value, int) for value in values):
+            return sum(values)          # counts, e.g. inserted/updated or rows per table
+        if all(isinstance(value, list) for value in values):
+            return sum(len(value) for value in values)
+        for key in ('updated', 'checked', 'imported'):
+            if key in result:
+                return result[key]
+        return 1                        # a single row
+    try:
+        return len(result)
+    except TypeError:
+        return 1
+
+def build_cases(system, students, days):
+    """(name, callable) pairs covering the register's reads, writes and reports"""
+    first = students[0]
+    form, class_name = first[10], first[11]
+    student_id = first[0]
+    first_day, last_day = days[0], days[-1]
+    month = first_day.strftime("%Y-%m")
+    academic_year, term = register.term_of(first_day)
+    months = sorted({day.strftime("%Y-%m") for day in days})
+    
+    class_students = [s for s in students if s[10] == form and s[11] == class_name]
+    class_day = [dict(zip(ATTENDANCE_COLUMNS, row))
+                 for row in generate_attendance(class_students, [last_day], seed=2)]
+    school_day = [dict(zip(ATTENDANCE_COLUMNS, row))
+                  for row in generate_attendance(students, [last_day], seed=3)]
+    school_day_csv = io.StringIO()
+    writer = csv.writer(school_day_csv)
+    writer.writerow(ATTENDANCE_COLUMNS)
+    writer.writerows(generate_attendance(students, [last_day], seed=4))
+    
+    register_data = {
+        'form': form, 'class_name': class_name, 'academic_year': academic_year, 'term': term,
+        'total_students': len(class_students), 'class_teacher': "Benchmark Teacher",
+        'class_prefect': "", 'assistant_prefect': "", 'target_attendance': 95.0,
+    }
+    incident = {
+        'student_id': student_id, 'incident_date': last_day, 'incident_type': "Positive",
+        'incident_category': "Leadership", 'description': "Benchmark incident",
+        'recorded_by': "benchmark",
+    }
+    
+    return [
+        ("get_classes", lambda: system.get_classes()),
+        ("get_class_students", lambda: system.get_class_students(form, class_name)),
+        ("get_todays_attendance (class)",
+         lambda: system.get_todays_attendance(form, class_name, last_day)),
+        ("get_todays_attendance (school, frame)",
+         lambda: system.get_todays_attendance(date_filter=last_day, as_frame=True)),
+        ("get_attendance_range_summary (school)",
+         lambda: system.get_attendance_range_summary(first_day, last_day)),
+        ("get_attendance_range (class)",
+         lambda: system.get_attendance_range(first_day, last_day, form, class_name)),
+        ("get_class_daily_stats (school)",
+         lambda: system.get_class_daily_stats(first_day, last_day)),
+        ("save_attendance (class day)", lambda: system.save_attendance(class_day)),
+        ("save_attendance (school day)", lambda: system.save_attendance(school_day)),
+        ("import_csv (school day of attendance)",
+         lambda: system.import_csv('daily_attendance', io.StringIO(school_day_csv.getvalue()))),
+        ("save_class_register", lambda: system.save_class_register(register_data)),
+        ("get_class_register",
+         lambda: system.get_class_register(form, class_name, academic_year, term)),
+        ("save_incident", lambda: system.save_incident(incident)),
+        ("get_student_incidents (school page)",
+         lambda: system.get_student_incidents(limit=register.INCIDENTS_PAGE_SIZE)),
+        ("count_student_incidents (class)",
+         lambda: system.count_student_incidents(form=form, class_name=class_name)),
+        ("get_student_history", lambda: system.get_student_history(student_id)),
+        ("calculate_monthly_summary", lambda: system.calculate_monthly_summary(month)),
+        ("calculate_monthly_summaries (all months)",
+         lambda: system.calculate_monthly_summaries(months)),
+        ("calculate_term_summaries", lambda: system.calculate_term_summaries(academic_year, term)),
+        ("get_class_term_summaries", lambda: system.get_class_term_summaries(academic_year, term)),
+        ("calculate_monthly_summary_per_student (baseline)",
+         lambda: calculate_monthly_summary_per_student(system.pool, month)),
+        ("verify_monthly_summary", lambda: system.verify_monthly_summary(month)),
+        ("get_monthly_summary (school)", lambda: system.get_monthly_summary(month)),
+        ("get_monthly_summary (class, frame)",
+         lambda: system.get_monthly_summary(month, form, class_name, as_frame=True)),
+        ("export_tables", lambda: system.export_tables(io.BytesIO())),
+    ]
+
+def time_case(system, function, repeat):
+    """Run a case `repeat` times from cold caches; returns timing statistics in seconds"""
+    runs = []
+    size = 0
+    for _ in range(repeat):
+        system.cache.clear()
+        system.history_cache.clear()
+        started = time.perf_counter()
+        result = function()
+        runs.append(time.perf_counter() - started)
+        size = _size(result)
+    return {
+        'runs': runs,
+        'min': min(runs),
+        'median': statistics.median(runs),
+        'max': max(runs),
+        'result_size': size,
+    }
+
+def run_scale(backend, database, name, shape, repeat):
+    pool = reset_database(backend, database)
+    started = time.perf_counter()
+    students, days, counts = load_school(pool, **shape)
+    load_seconds = time.perf_counter() - started
+    
+    system = register.SchoolRegisterSystem(
+        pool=pool,
+        cache=register.TTLCache(**register.CACHE_CONFIG),
+        history_cache=register.TTLCache(**register.HISTORY_CACHE_CONFIG),
+    )
+    # Report paths need summaries to read
+    system.calculate_monthly_summaries(sorted({day.strftime("%Y-%m") for day in days}))
+    
+    cases = {}
+    print(f"\n{name}: {counts}  (loaded in {load_seconds:.1f}s)")
+    print(f"{'case':<50}{'rows':>8}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for case_name, function in build_cases(system, students, days):
+        timing = time_case(system, function, repeat)
+        cases[case_name] = timing
+        print(f"{case_name:<50}{timing['result_size']:>8}{timing['median'] * 1000:>12.1f}"
+              f"{timing['min'] * 1000:>10.1f}{timing['max'] * 1000:>10.1f}")
+    
+    pool.close_all()
+    return {'shape': shape, 'rows': counts, 'load_seconds': load_seconds, 'cases': cases}
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, previous_path, threshold):
+    """Print median changes against an earlier results file; returns the regressed cases"""
+    with open(previous_path, encoding="utf-8") as previous_file:
+        previous = json.load(previous_file)
+    
+    regressions = []
+    print(f"\nCompared with {previous_path} ({previous.get('commit') or 'unknown commit'})")
+    for scale, result in results['scales'].items():
+        old_cases = previous.get('scales', {}).get(scale, {}).get('cases', {})
+        for case_name, timing in result['cases'].items():
+            old = old_cases.get(case_name)
+            if not old or not old['median']:
+                continue
+            ratio = timing['median'] / old['median']
+            marker = ""
+            if ratio > threshold:
+                marker = "  REGRESSION"
+                regressions.append((scale, case_name, ratio))
+            print(f"{scale:<8}{case_name:<50}{ratio:>8.2f}x{marker}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default=register.DB_BACKEND)
+    parser.add_argument("--database", default="northlea_high_bench",
+                        help="MySQL database name, or SQLite file path (':memory:' for in-process runs)")
+    parser.add_argument("--scales", default="small,medium,large",
+                        help=f"comma-separated subset of {', '.join(SCALES)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare medians against")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="median slow-down ratio reported as a regression")
+    args = parser.parse_args()
+    
+    results = {
+        'created_at': datetime.now().isoformat(timespec="seconds"),
+        'commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'backend': args.backend,
+        'repeat': args.repeat,
+        'scales': {},
+    }
+    for name in args.scales.split(","):
+        results['scales'][name] = run_scale(args.backend, args.database, name,
+                                             SCALES[name], args.repeat)
+    
+    with open(args.output, "w", encoding="utf-8") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"\nWrote {args.output}")
+    
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compare the per-student, set-based and per-class parallel monthly summary paths
+
+Usage (from the repository root, against a scratch database):
+
+    python -m benchmarks.summary --database northlea_high_bench --students-per-class 40
+
+The benchmark DROPS and recreates the target database.
+"""
+import argparse
+import time
+
+import register
+from benchmarks.baseline import calculate_monthly_summary_per_student
+from benchmarks.fixtures import load_school, reset_database
+from benchmarks.synthetic import school_days
+
+SUMMARY_COLUMNS = ("total_days", "days_present", "days_absent", "days_late", "days_excused",
+                   "attendance_percentage", "homework_completion_rate", "uniform_compliance_rate",
+                   "books_brought_rate", "average_participation")
+
+def prepare_database(backend, database, forms, classes_per_form, students_per_class, month_year):
+    """Recreate the benchmark database and load a synthetic month"""
+    pool = reset_database(backend, database)
+    month_start, month_end = register.month_bounds(month_year)
+    days = [d for d in school_days(month_start, 23) if d < month_end]
+    _, _, counts = load_school(pool, forms, classes_per_form, students_per_class,
+                               days=len(days), incident_rate=0, start=month_start)
+    return pool, counts['students'], counts['daily_attendance']
+
+def _snapshot(pool, month_year):
+    connection = pool.acquire()
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(f"SELECT student_id, {', '.join(SUMMARY_COLUMNS)} "
+                   "FROM monthly_attendance_summary WHERE month_year = %s", (month_year,))
+    rows = {row['student_id']: row for row in cursor.fetchall()}
+    cursor.close()
+    pool.release(connection)
+    return rows
+
+def _clear_summaries(pool):
+    connection = pool.acquire()
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM monthly_attendance_summary")
+    connection.commit()
+    cursor.close()
+    pool.release(connection)
+
+def _timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default=register.DB_BACKEND)
+    parser.add_argument("--database", default="northlea_high_bench",
+                        help="MySQL database name, or SQLite file path (':memory:' for in-process runs)")
+    parser.add_argument("--forms", type=int, default=4)
+    parser.add_argument("--classes-per-form", type=int, default=3)
+    parser.add_argument("--students-per-class", type=int, default=40)
+    parser.add_argument("--month", default="2024-03")
+    parser.add_argument("--workers", default="1,2,4",
+                        help="comma-separated worker counts for the per-class parallel run")
+    args = parser.parse_args()
+    
+    pool, student_count, row_count = prepare_database(
+        args.backend, args.database, args.forms, args.classes_per_form, args.students_per_class,
+        args.month)
+    print(f"Loaded {student_count} students, {row_count} attendance rows for {args.month}")
+    
+    system = register.SchoolRegisterSystem(pool=pool)
+    
+    _clear_summaries(pool)
+    legacy_count, legacy_time = _timed(calculate_monthly_summary_per_student, pool, args.month)
+    legacy_rows = _snapshot(pool, args.month)
+    
+    _clear_summaries(pool)
+    engine_count, engine_time = _timed(system.calculate_monthly_summary, args.month)
+    engine_rows = _snapshot(pool, args.month)
+    
+    # The per-student path breaks participation ties arbitrarily (LIMIT 1), so
+    # report those separately from real differences
+    differences = participation_ties = 0
+    for student_id, legacy in legacy_rows.items():
+        engine = engine_rows.get(student_id)
+        if engine is None:
+            differences += 1
+            continue
+        # SQLite keeps full-precision rates where MySQL rounds to DECIMAL(5,2)
+        if any(abs(float(legacy[c]) - float(engine[c])) >= 0.01
+               for c in SUMMARY_COLUMNS if c != 'average_participation'):
+            differences += 1
+        elif legacy['average_participation'] != engine['average_participation']:
+            participation_ties += 1
+    differences += len(set(engine_rows) - set(legacy_rows))
+    
+    print(f"{'path':<14}{'students':>10}{'seconds':>12}")
+    print(f"{'per-student':<14}{legacy_count:>10}{legacy_time:>12.3f}")
+    print(f"{'set-based':<14}{engine_count:>10}{engine_time:>12.3f}")
+    print(f"speed-up: {legacy_time / engine_time:.1f}x")
+    print(f"differing rows: {differences}, participation tie-breaks: {participation_ties}")
+    
+    # Whole-school recomputation split into per-class partitions
+    print(f"{'workers':<14}{'students':>10}{'seconds':>12}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        _clear_summaries(pool)
+        count, seconds = _timed(system.calculate_monthly_summary, args.month, workers)
+        print(f"{workers:<14}{count:>10}{seconds:>12.3f}")
+
+if __name__ == "__main__":
+    main()
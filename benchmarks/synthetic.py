@@ -0,0 +1,110 @@
+"""Deterministic synthetic school data for benchmarks"""
+import random
+from datetime import date, timedelta
+
+FIRST_NAMES = ["Tendai", "Rudo", "Tatenda", "Nyasha", "Farai", "Chipo", "Tawanda",
+               "Ruvimbo", "Kudzai", "Tinashe", "Vimbai", "Takudzwa", "Shamiso", "Anesu"]
+LAST_NAMES = ["Moyo", "Ncube", "Dube", "Sibanda", "Mpofu", "Ndlovu", "Nyathi",
+              "Khumalo", "Mlilo", "Tshuma", "Chikwanha", "Mutasa", "Banda", "Phiri"]
+CLASS_NAMES = ["Blue", "Green", "Red", "Yellow", "White", "Gold"]
+
+STATUS_WEIGHTS = [("Present", 88), ("Absent", 5), ("Late", 5), ("Excused", 2)]
+PARTICIPATION_WEIGHTS = [("Excellent", 20), ("Good", 50), ("Fair", 22), ("Poor", 8)]
+INCIDENT_WEIGHTS = [("Positive", 45), ("Negative", 40), ("Neutral", 15)]
+INCIDENT_CATEGORIES = {
+    "Positive": ["Academic Achievement", "Leadership", "Sports", "Helpfulness"],
+    "Negative": ["Late Coming", "Misconduct", "Incomplete Work", "Uniform"],
+    "Neutral": ["Parent Contact", "Medical", "Other"],
+}
+
+STUDENT_COLUMNS = ("student_id", "admission_number", "first_name", "last_name", "gender",
+                   "date_of_birth", "guardian_name", "guardian_phone", "stream", "suburb",
+                   "form", "class_name")
+
+ATTENDANCE_COLUMNS = ("student_id", "admission_number", "attendance_date", "form", "class_name",
+                      "morning_status", "afternoon_status", "completed_homework", "uniform_proper",
+                      "books_brought", "participation_level", "teacher_notes", "recorded_by")
+
+INCIDENT_COLUMNS = ("student_id", "incident_date", "incident_type", "incident_category",
+                    "description", "action_taken", "recorded_by")
+
+def _weighted(rng, weights):
+    values, cumulative = zip(*weights)
+    return rng.choices(values, weights=cumulative)[0]
+
+def school_days(start, count):
+    """The first `count` weekdays on or after `start`"""
+    days = []
+    current = start
+    while len(days) < count:
+        if current.weekday() < 5:
+            days.append(current)
+        current += timedelta(days=1)
+    return days
+
+def generate_students(forms=4, classes_per_form=3, students_per_class=40, seed=1):
+    """Student rows (tuples in STUDENT_COLUMNS order)"""
+    rng = random.Random(seed)
+    students = []
+    student_id = 0
+    for form in range(1, forms + 1):
+        for class_name in CLASS_NAMES[:classes_per_form]:
+            for _ in range(students_per_class):
+                student_id += 1
+                last_name = rng.choice(LAST_NAMES)
+                students.append((
+                    student_id,
+                    f"NH{student_id:06d}",
+                    rng.choice(FIRST_NAMES),
+                    last_name,
+                    rng.choice(["Male", "Female"]),
+                    date(2006 + (4 - form), rng.randint(1, 12), rng.randint(1, 28)),
+                    f"{rng.choice(FIRST_NAMES)} {last_name}",
+                    f"07{rng.randint(10000000, 99999999)}",
+                    rng.choice(["Sciences", "Commercials", "Arts"]),
+                    rng.choice(["Northlea", "Suburbs", "Hillside", "Kumalo"]),
+                    form,
+                    class_name,
+                ))
+    return students
+
+def generate_attendance(students, days, seed=1):
+    """Yield one attendance row per student per day (tuples in ATTENDANCE_COLUMNS order)"""
+    rng = random.Random(seed)
+    for day in days:
+        for student in students:
+            yield (
+                student[0],
+                student[1],
+                day,
+                student[10],
+                student[11],
+                _weighted(rng, STATUS_WEIGHTS),
+                _weighted(rng, STATUS_WEIGHTS),
+                rng.random() < 0.85,
+                rng.random() < 0.95,
+                rng.random() < 0.9,
+                _weighted(rng, PARTICIPATION_WEIGHTS),
+                "",
+                "benchmark",
+            )
+
+def generate_incidents(students, days, rate=0.01, seed=1):
+    """Yield incident rows, each student having `rate` chance of one per day
+    (tuples in INCIDENT_COLUMNS order)"""
+    rng = random.Random(seed)
+    for day in days:
+        for student in students:
+            if rng.random() >= rate:
+                continue
+            incident_type = _weighted(rng, INCIDENT_WEIGHTS)
+            category = rng.choice(INCIDENT_CATEGORIES[incident_type])
+            yield (
+                student[0],
+                day,
+                incident_type,
+                category,
+                f"{category} noted during class",
+                "",
+                "benchmark",
+            )
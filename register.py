@@ -1,11 +1,37 @@
 ﻿import streamlit as st
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.errors import (DatabaseError, IntegrityError, InterfaceError,
+                                    OperationalError, PoolError)
 import pandas as pd
-from datetime import datetime, date
+import numpy as np
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import csv
+import io
+import itertools
+import os
+import tempfile
+import threading
+import time
 import json
+import logging
+import re
+import sqlite3
+import sys
+import zipfile
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
 
 # Database configuration
+# Storage backend: 'mysql' uses DB_CONFIG, 'sqlite' keeps everything in SQLITE_PATH
+# (no database server needed; ':memory:' for throwaway runs)
+DB_BACKEND = 'mysql'
+SQLITE_PATH = 'northlea_high.db'
+
 DB_CONFIG = {
     'host': 'localhost',
     'user': 'root',
@@ -13,547 +39,4189 @@ DB_CONFIG = {
     'database': 'northlea_high'
 }
 
-class SchoolRegisterSystem:
-    def __init__(self):
-        self.connection = None
-        self.cursor = None
+# Connection pool configuration
+POOL_CONFIG = {
+    'pool_size': 10,            # maximum open connections per process
+    'checkout_timeout': 10,     # seconds to wait for a free connection
+    'ping_after_idle': 30,      # ping connections idle longer than this (seconds)
+    'recycle_after': 3600       # replace connections older than this (seconds)
+}
+
+# Attendance and participation choices (ENUM order in the database)
+ATTENDANCE_STATUSES = ['Present', 'Absent', 'Late', 'Excused']
+PARTICIPATION_LEVELS = ['Excellent', 'Good', 'Fair', 'Poor']
+INCIDENT_TYPES = ['Positive', 'Negative', 'Neutral']
+
+# Categories for ENUM columns in column-oriented (DataFrame) results
+ENUM_CATEGORIES = {
+    'morning_status': ATTENDANCE_STATUSES,
+    'afternoon_status': ATTENDANCE_STATUSES,
+    'participation_level': PARTICIPATION_LEVELS,
+    'average_participation': PARTICIPATION_LEVELS,
+    'incident_type': INCIDENT_TYPES
+}
+
+# Widget index for each choice, so pre-filling a form needs no list scans
+STATUS_INDEX = {status: i for i, status in enumerate(ATTENDANCE_STATUSES)}
+PARTICIPATION_INDEX = {level: i for i, level in enumerate(PARTICIPATION_LEVELS)}
+
+# Day counts kept on monthly_attendance_summary so writes can apply deltas
+SUMMARY_COUNTERS = ('total_days', 'days_present', 'days_absent', 'days_late', 'days_excused',
+                    'homework_days', 'uniform_days', 'books_days',
+                    'participation_excellent', 'participation_good',
+                    'participation_fair', 'participation_poor')
+
+# Every value column a full recomputation writes
+SUMMARY_COLUMNS = ('total_days', 'days_present', 'days_absent', 'days_late', 'days_excused',
+                   'attendance_percentage', 'homework_completion_rate', 'uniform_compliance_rate',
+                   'books_brought_rate', 'average_participation', 'comments',
+                   'homework_days', 'uniform_days', 'books_days',
+                   'participation_excellent', 'participation_good',
+                   'participation_fair', 'participation_poor')
+
+# Per class and day counts kept on class_daily_stats; full_day, absent, late and
+# half_day split the students recorded the same way day_status does
+CLASS_DAY_COUNTERS = ('students_recorded', 'present', 'absent', 'late', 'excused',
+                      'full_day', 'half_day', 'homework_completed', 'uniform_compliant',
+                      'books_brought')
+
+# Attendance rows sent per multi-row upsert
+ATTENDANCE_BATCH_SIZE = 200
+
+# Fields a teacher marks; a resubmitted row is only written when one of them changed
+ATTENDANCE_MARK_FIELDS = ('morning_status', 'afternoon_status', 'completed_homework', 'uniform_proper',
+                          'books_brought', 'participation_level', 'teacher_notes')
+
+# Incidents shown per page in the incidents log
+INCIDENTS_PAGE_SIZE = 25
+
+# Full export: tables written to the zip, and rows fetched per round trip
+EXPORT_TABLES = ['students', 'daily_attendance', 'monthly_attendance_summary',
+                 'class_daily_stats', 'term_attendance_summary', 'class_term_summary',
+                 'student_incidents', 'class_register']
+EXPORT_CHUNK_SIZE = 5000
+
+# Shared cache for classes, rosters and class registers
+CACHE_CONFIG = {
+    'ttl': 600,                 # seconds before an entry is read again from the database
+    'max_entries': 512          # least recently used entries are evicted beyond this
+}
+
+# Per-student history cache (attendance, incidents and summaries)
+HISTORY_CACHE_CONFIG = {
+    'ttl': 300,
+    'max_entries': 200
+}
+
+# Background monthly summary jobs
+JOB_CONFIG = {
+    'poll_seconds': 5,          # how often the runner looks for queued jobs
+    'stale_after': 120,         # a running job without a heartbeat this long is resumed
+    'ui_refresh_seconds': 1     # how often the reports page re-reads a running job
+}
+JOB_ACTIVE_STATUSES = ('Queued', 'Running')
+
+# Classes recomputed at once by a summary run (each holds one pooled connection)
+SUMMARY_WORKERS = 4
+
+# Local write-ahead queue for attendance submissions
+ATTENDANCE_QUEUE_CONFIG = {
+    'path': 'attendance_queue.db',
+    'batch_rows': 1000,         # rows replayed into the database per transaction
+    'poll_seconds': 2,          # how often the replayer looks for new submissions
+    'retry_seconds': 10         # wait after a connection failure before trying again
+}
+
+# Archival: closed academic years move out of daily_attendance into compressed per-year files
+ACADEMIC_YEAR_START_MONTH = 9   # academic years run September to August and are labelled "2024-2025"
+# Terms of the academic year by calendar month; every month belongs to exactly one term.
+# Term and year summaries use term 0 for the whole academic year.
+TERM_MONTHS = {1: (9, 10, 11, 12), 2: (1, 2, 3, 4), 3: (5, 6, 7, 8)}
+
+ARCHIVE_CONFIG = {
+    'directory': 'attendance_archive',
+    'delete_chunk_rows': 5000   # archived rows deleted from daily_attendance per transaction
+}
+
+# daily_attendance columns as stored in an archive file: a numpy dtype, or the
+# choices of an ENUM column stored as small integer codes
+ARCHIVE_COLUMNS = {
+    'attendance_id': 'int64',
+    'student_id': 'int64',
+    'admission_number': 'U',
+    'attendance_date': 'datetime64[D]',
+    'form': 'int64',
+    'class_name': 'U',
+    'morning_status': ATTENDANCE_STATUSES,
+    'afternoon_status': ATTENDANCE_STATUSES,
+    'completed_homework': 'bool',
+    'uniform_proper': 'bool',
+    'books_brought': 'bool',
+    'participation_level': PARTICIPATION_LEVELS,
+    'teacher_notes': 'U',
+    'recorded_by': 'U',
+    'recorded_at': 'datetime64[s]'
+}
+
+# Bulk CSV import: files are streamed, validated row by row and written in chunks
+IMPORT_CONFIG = {
+    'chunk_rows': 5000,         # validated rows written per transaction
+    'statement_rows': 500,      # rows per multi-row INSERT
+    'rejections_kept': 1000     # rejected rows listed in the report; every one is counted
+}
+
+# Marks an import column that may not be left blank
+_REQUIRED = object()
+
+# What each import file may hold. `key` is the unique key a re-imported row updates
+# (incidents have none and are appended). Columns map to (domain, default): the choices
+# of an ENUM column, the maximum length of a text column (None: unlimited), or 'int',
+# 'date' or 'flag'; blank cells take the default. Attendance and incident rows name their
+# student by student_id or admission_number, and attendance defaults to the student's class.
+IMPORT_TABLES = {
+    'students': {
+        'key': ('admission_number',),
+        'columns': {
+            'student_id': ('int', None),
+            'admission_number': (20, _REQUIRED),
+            'first_name': (50, _REQUIRED),
+            'last_name': (50, _REQUIRED),
+            'gender': (10, None),
+            'date_of_birth': ('date', None),
+            'guardian_name': (100, None),
+            'guardian_phone': (20, None),
+            'stream': (50, None),
+            'suburb': (100, None),
+            'form': ('int', None),
+            'class_name': (50, None)
+        }
+    },
+    'daily_attendance': {
+        'key': ('student_id', 'attendance_date'),
+        'columns': {
+            'student_id': ('int', None),
+            'admission_number': (20, None),
+            'attendance_date': ('date', _REQUIRED),
+            'form': ('int', None),
+            'class_name': (50, None),
+            'morning_status': (ATTENDANCE_STATUSES, 'Present'),
+            'afternoon_status': (ATTENDANCE_STATUSES, 'Present'),
+            'completed_homework': ('flag', 1),
+            'uniform_proper': ('flag', 1),
+            'books_brought': ('flag', 1),
+            'participation_level': (PARTICIPATION_LEVELS, 'Good'),
+            'teacher_notes': (None, ''),
+            'recorded_by': (100, 'import')
+        }
+    },
+    'student_incidents': {
+        'key': None,
+        'columns': {
+            'student_id': ('int', None),
+            'incident_date': ('date', _REQUIRED),
+            'incident_type': (INCIDENT_TYPES, _REQUIRED),
+            'incident_category': (100, ''),
+            'description': (None, _REQUIRED),
+            'action_taken': (None, ''),
+            'recorded_by': (100, 'import')
+        }
+    }
+}
+
+# Query tracing: recent statements kept in memory, slow ones optionally logged to a file
+TRACE_CONFIG = {
+    'buffer_size': 5000,        # most recent executions kept for the Settings panel
+    'slow_query_ms': 500,       # executions at least this slow go to the slow-query log
+    'slow_log_path': None       # e.g. 'slow_queries.log'; None disables the file
+}
+
+# Shared helpers that run statements on behalf of their callers; a trace names the
+# method that called the helper instead
+TRACE_HELPERS = frozenset({'_fetch_all', '_fetch_frame', '_insert_import_rows', 'insert_rows', 'load_rows',
+                           'table_columns', 'table_indexes', 'add_columns', 'acquire_lock', 'release_lock',
+                           'acquire_migration_lock', 'release_migration_lock'})
+
+def month_bounds(month_year):
+    """First day of a YYYY-MM month and first day of the following month"""
+    month_start = datetime.strptime(month_year, "%Y-%m").date()
+    if month_start.month == 12:
+        month_end = month_start.replace(year=month_start.year + 1, month=1)
+    else:
+        month_end = month_start.replace(month=month_start.month + 1)
+    return month_start, month_end
+
+def academic_year_of(day):
+    """Label of the academic year a date falls in, e.g. 2024-2025"""
+    start = day.year if day.month >= ACADEMIC_YEAR_START_MONTH else day.year - 1
+    return f"{start}-{start + 1}"
+
+def academic_year_bounds(academic_year):
+    """First day of a "YYYY-YYYY" academic year and first day of the next"""
+    start = int(academic_year[:4])
+    if academic_year != f"{start}-{start + 1}":
+        raise ValueError(academic_year)
+    return date(start, ACADEMIC_YEAR_START_MONTH, 1), date(start + 1, ACADEMIC_YEAR_START_MONTH, 1)
+
+def term_months(academic_year, term):
+    """YYYY-MM months of a term of an academic year; term 0 is the whole year"""
+    if term != 0 and term not in TERM_MONTHS:
+        raise ValueError(term)
+    start_date, end_date = academic_year_bounds(academic_year)
+    months = []
+    month = start_date
+    while month < end_date:
+        if term == 0 or month.month in TERM_MONTHS[term]:
+            months.append(month.strftime("%Y-%m"))
+        month = month_bounds(month.strftime("%Y-%m"))[1]
+    return months
+
+def term_of(day):
+    """Academic year and term a date falls in"""
+    return academic_year_of(day), next(term for term, months in TERM_MONTHS.items() if day.month in months)
+
+def parse_import_value(value, domain):
+    """A non-blank CSV cell converted for an IMPORT_TABLES column; ValueError says why it does not fit"""
+    if isinstance(domain, list):
+        for choice in domain:
+            if value.lower() == choice.lower():
+                return choice
+        raise ValueError(f"must be one of {', '.join(domain)}")
+    if domain == 'int':
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError("must be a whole number") from None
+    if domain == 'date':
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise ValueError("must be a date (YYYY-MM-DD)") from None
+    if domain == 'flag':
+        if value.lower() in ('1', 'true', 'yes', 'y'):
+            return 1
+        if value.lower() in ('0', 'false', 'no', 'n'):
+            return 0
+        raise ValueError("must be yes/no, true/false or 1/0")
+    if domain is not None and len(value) > domain:
+        raise ValueError(f"is longer than {domain} characters")
+    return value
+
+def day_status(morning, afternoon, labels=('✅ Full Day', '❌ Absent', '⚠️ Late', '⏰ Half Day')):
+    """Classify whole columns of morning/afternoon statuses as full day, absent, late or half day"""
+    return np.select(
+        [(morning == 'Present') & (afternoon == 'Present'),
+         (morning == 'Absent') & (afternoon == 'Absent'),
+         (morning == 'Late') | (afternoon == 'Late')],
+        labels[:3],
+        default=labels[3]
+    )
+
+def class_day_counts(record):
+    """CLASS_DAY_COUNTERS contributed by one daily_attendance row"""
+    morning = record['morning_status']
+    afternoon = record['afternoon_status']
+    full_day = morning == 'Present' and afternoon == 'Present'
+    absent = morning == 'Absent' and afternoon == 'Absent'
+    late = morning == 'Late' or afternoon == 'Late'
+    return (
+        1,
+        int(morning == 'Present' or afternoon == 'Present'),
+        int(absent),
+        int(late),
+        int(morning == 'Excused' or afternoon == 'Excused'),
+        int(full_day),
+        int(not (full_day or absent or late)),
+        int(bool(record['completed_homework'])),
+        int(bool(record['uniform_proper'])),
+        int(bool(record['books_brought']))
+    )
+
+def summary_counts(record):
+    """SUMMARY_COUNTERS contributed by one daily_attendance row"""
+    morning = record['morning_status']
+    afternoon = record['afternoon_status']
+    participation = record['participation_level']
+    return (
+        1,
+        int(morning == 'Present' or afternoon == 'Present'),
+        int(morning == 'Absent' and afternoon == 'Absent'),
+        int(morning == 'Late' or afternoon == 'Late'),
+        int(morning == 'Excused' or afternoon == 'Excused'),
+        int(bool(record['completed_homework'])),
+        int(bool(record['uniform_proper'])),
+        int(bool(record['books_brought'])),
+        int(participation == 'Excellent'),
+        int(participation == 'Good'),
+        int(participation == 'Fair'),
+        int(participation == 'Poor')
+    )
+
+def attendance_marks(record):
+    """ATTENDANCE_MARK_FIELDS of an attendance row, normalised so saved and submitted rows compare equal"""
+    return (
+        record['morning_status'],
+        record['afternoon_status'],
+        bool(record['completed_homework']),
+        bool(record['uniform_proper']),
+        bool(record['books_brought']),
+        record['participation_level'],
+        record.get('teacher_notes') or ''
+    )
+
+def attendance_changes(attendance_data, existing_attendance):
+    """Submitted rows that are new or differ from existing_attendance (keyed by student_id)
     
-    def connect_db(self):
-        """Connect to MySQL database"""
+    Returns (rows to write, {'new', 'changed', 'unchanged'} counts); a different
+    recorded_by alone is not a change.
+    """
+    rows = []
+    counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+    for record in attendance_data:
+        existing = existing_attendance.get(record['student_id'])
+        if existing is None:
+            counts['new'] += 1
+        elif attendance_marks(existing) != attendance_marks(record):
+            counts['changed'] += 1
+        else:
+            counts['unchanged'] += 1
+            continue
+        rows.append(record)
+    return rows, counts
+
+# Versioned schema migrations, applied in order and recorded in schema_migrations.
+# Each step is SQL text or the name of a SchoolRegisterSystem method taking a cursor.
+# Never edit a released migration; append a new one instead, to MYSQL_MIGRATIONS
+# and SQLITE_MIGRATIONS alike.
+MYSQL_MIGRATIONS = [
+    # Version 0 runs first on new databases because every other table references
+    # students; databases that already have the table just record it.
+    (0, "Create students table", [
+        """
+        CREATE TABLE IF NOT EXISTS students (
+            student_id INT PRIMARY KEY AUTO_INCREMENT,
+            admission_number VARCHAR(20) NOT NULL,
+            first_name VARCHAR(50) NOT NULL,
+            last_name VARCHAR(50) NOT NULL,
+            gender VARCHAR(10),
+            date_of_birth DATE,
+            guardian_name VARCHAR(100),
+            guardian_phone VARCHAR(20),
+            stream VARCHAR(50),
+            suburb VARCHAR(100),
+            form INT,
+            class_name VARCHAR(50)
+        )
+        """
+    ]),
+    (1, "Create attendance, summary, incident and register tables", [
+        """
+        CREATE TABLE IF NOT EXISTS daily_attendance (
+            attendance_id INT PRIMARY KEY AUTO_INCREMENT,
+            student_id INT NOT NULL,
+            admission_number VARCHAR(20) NOT NULL,
+            attendance_date DATE NOT NULL,
+            form INT NOT NULL,
+            class_name VARCHAR(50) NOT NULL,
+            
+            -- Attendance status
+            morning_status ENUM('Present', 'Absent', 'Late', 'Excused') DEFAULT 'Present',
+            afternoon_status ENUM('Present', 'Absent', 'Late', 'Excused') DEFAULT 'Present',
+            
+            -- Daily performance
+            completed_homework BOOLEAN DEFAULT TRUE,
+            uniform_proper BOOLEAN DEFAULT TRUE,
+            books_brought BOOLEAN DEFAULT TRUE,
+            participation_level ENUM('Excellent', 'Good', 'Fair', 'Poor') DEFAULT 'Good',
+            
+            -- Teacher notes
+            teacher_notes TEXT,
+            recorded_by VARCHAR(100),
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            
+            -- Foreign key
+            FOREIGN KEY (student_id) REFERENCES students(student_id),
+            UNIQUE KEY unique_student_date (student_id, attendance_date)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS monthly_attendance_summary (
+            summary_id INT PRIMARY KEY AUTO_INCREMENT,
+            student_id INT NOT NULL,
+            admission_number VARCHAR(20) NOT NULL,
+            month_year VARCHAR(7) NOT NULL, -- Format: YYYY-MM
+            form INT NOT NULL,
+            class_name VARCHAR(50) NOT NULL,
+            
+            -- Attendance counts
+            total_days INT DEFAULT 0,
+            days_present INT DEFAULT 0,
+            days_absent INT DEFAULT 0,
+            days_late INT DEFAULT 0,
+            days_excused INT DEFAULT 0,
+            
+            -- Percentage
+            attendance_percentage DECIMAL(5,2) DEFAULT 0,
+            
+            -- Performance
+            homework_completion_rate DECIMAL(5,2) DEFAULT 0,
+            uniform_compliance_rate DECIMAL(5,2) DEFAULT 0,
+            books_brought_rate DECIMAL(5,2) DEFAULT 0,
+            average_participation VARCHAR(20),
+            
+            -- Notes
+            comments TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            
+            -- Foreign key
+            FOREIGN KEY (student_id) REFERENCES students(student_id),
+            UNIQUE KEY unique_student_month (student_id, month_year)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS student_incidents (
+            incident_id INT PRIMARY KEY AUTO_INCREMENT,
+            student_id INT NOT NULL,
+            incident_date DATE NOT NULL,
+            incident_type ENUM('Positive', 'Negative', 'Neutral') NOT NULL,
+            incident_category VARCHAR(100),
+            description TEXT NOT NULL,
+            action_taken TEXT,
+            recorded_by VARCHAR(100),
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            
+            FOREIGN KEY (student_id) REFERENCES students(student_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS class_register (
+            register_id INT PRIMARY KEY AUTO_INCREMENT,
+            form INT NOT NULL,
+            class_name VARCHAR(50) NOT NULL,
+            academic_year VARCHAR(9) NOT NULL, -- Format: YYYY-YYYY
+            term INT NOT NULL,
+            
+            -- Register details
+            total_students INT DEFAULT 0,
+            class_teacher VARCHAR(100),
+            class_prefect VARCHAR(100),
+            assistant_prefect VARCHAR(100),
+            
+            -- Class performance
+            average_attendance DECIMAL(5,2) DEFAULT 0,
+            top_performer VARCHAR(100),
+            most_improved VARCHAR(100),
+            
+            -- Notes
+            class_goals TEXT,
+            special_notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            
+            UNIQUE KEY unique_class_term (form, class_name, academic_year, term)
+        )
+        """
+    ]),
+    (2, "Add day-count columns to monthly_attendance_summary", [
+        "_migrate_summary_counters"
+    ]),
+    (3, "Index daily_attendance by date and class", [
+        """
+        CREATE INDEX idx_attendance_date_class
+        ON daily_attendance (attendance_date, form, class_name, morning_status, afternoon_status)
+        """
+    ]),
+    (4, "Index monthly_attendance_summary by month and class", [
+        """
+        CREATE INDEX idx_summary_month_class
+        ON monthly_attendance_summary (month_year, form, class_name, attendance_percentage)
+        """
+    ]),
+    (5, "Index student_incidents by student and date", [
+        """
+        CREATE INDEX idx_incidents_student_date
+        ON student_incidents (student_id, incident_date, incident_id)
+        """,
+        """
+        CREATE INDEX idx_incidents_date
+        ON student_incidents (incident_date, incident_id)
+        """
+    ]),
+    (6, "Create summary job tables", [
+        """
+        CREATE TABLE IF NOT EXISTS summary_jobs (
+            job_id INT PRIMARY KEY AUTO_INCREMENT,
+            month_year VARCHAR(7) NOT NULL,
+            status ENUM('Queued', 'Running', 'Completed', 'Failed') NOT NULL DEFAULT 'Queued',
+            students_total INT DEFAULT 0,
+            students_processed INT DEFAULT 0,
+            classes_total INT DEFAULT 0,
+            classes_processed INT DEFAULT 0,
+            students_updated INT DEFAULT 0,
+            requested_by VARCHAR(100),
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME NULL,
+            heartbeat_at DATETIME NULL,
+            finished_at DATETIME NULL,
+            duration_seconds DECIMAL(10,2),
+            INDEX idx_jobs_month_status (month_year, status),
+            INDEX idx_jobs_status (status, job_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS summary_job_partitions (
+            job_id INT NOT NULL,
+            form INT NOT NULL,
+            class_name VARCHAR(50) NOT NULL,
+            students INT DEFAULT 0,
+            students_updated INT DEFAULT 0,
+            completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (job_id, form, class_name),
+            FOREIGN KEY (job_id) REFERENCES summary_jobs(job_id) ON DELETE CASCADE
+        )
+        """
+    ]),
+    (7, "Add students admission-number key and class index", [
+        "_migrate_student_keys"
+    ]),
+    (8, "Create attendance archive table", [
+        """
+        CREATE TABLE IF NOT EXISTS attendance_archives (
+            academic_year VARCHAR(9) PRIMARY KEY,
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            status ENUM('Archiving', 'Archived') NOT NULL DEFAULT 'Archiving',
+            row_count INT DEFAULT 0,
+            file_path VARCHAR(255),
+            file_bytes BIGINT DEFAULT 0,
+            archived_at DATETIME NULL
+        )
+        """
+    ]),
+    # Databases whose version-2 backfill failed after its columns were added
+    (9, "Backfill unpopulated summary day counts", [
+        "_backfill_summary_counters"
+    ]),
+    (10, "Create class_daily_stats rollup", [
+        """
+        CREATE TABLE IF NOT EXISTS class_daily_stats (
+            attendance_date DATE NOT NULL,
+            form INT NOT NULL,
+            class_name VARCHAR(50) NOT NULL,
+            students_recorded INT DEFAULT 0,
+            present INT DEFAULT 0,
+            absent INT DEFAULT 0,
+            late INT DEFAULT 0,
+            excused INT DEFAULT 0,
+            full_day INT DEFAULT 0,
+            half_day INT DEFAULT 0,
+            homework_completed INT DEFAULT 0,
+            uniform_compliant INT DEFAULT 0,
+            books_brought INT DEFAULT 0,
+            PRIMARY KEY (attendance_date, form, class_name)
+        )
+        """,
+        "_rebuild_class_daily_stats"
+    ]),
+    (11, "Create term and academic-year summary tables", [
+        """
+        CREATE TABLE IF NOT EXISTS term_attendance_summary (
+            student_id INT NOT NULL,
+            admission_number VARCHAR(20) NOT NULL,
+            academic_year VARCHAR(9) NOT NULL,
+            term INT NOT NULL,
+            form INT NOT NULL,
+            class_name VARCHAR(50) NOT NULL,
+            months INT DEFAULT 0,
+            total_days INT DEFAULT 0,
+            days_present INT DEFAULT 0,
+            days_absent INT DEFAULT 0,
+            days_late INT DEFAULT 0,
+            days_excused INT DEFAULT 0,
+            homework_days INT DEFAULT 0,
+            uniform_days INT DEFAULT 0,
+            books_days INT DEFAULT 0,
+            attendance_percentage DECIMAL(5,2) DEFAULT 0,
+            homework_completion_rate DECIMAL(5,2) DEFAULT 0,
+            uniform_compliance_rate DECIMAL(5,2) DEFAULT 0,
+            books_brought_rate DECIMAL(5,2) DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (student_id, academic_year, term),
+            INDEX idx_term_summary_class (academic_year, term, form, class_name)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS class_term_summary (
+            academic_year VARCHAR(9) NOT NULL,
+            term INT NOT NULL,
+            form INT NOT NULL,
+            class_name VARCHAR(50) NOT NULL,
+            students INT DEFAULT 0,
+            total_days INT DEFAULT 0,
+            days_present INT DEFAULT 0,
+            days_absent INT DEFAULT 0,
+            days_late INT DEFAULT 0,
+            days_excused INT DEFAULT 0,
+            attendance_percentage DECIMAL(5,2) DEFAULT 0,
+            homework_completion_rate DECIMAL(5,2) DEFAULT 0,
+            uniform_compliance_rate DECIMAL(5,2) DEFAULT 0,
+            books_brought_rate DECIMAL(5,2) DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (academic_year, term, form, class_name)
+        )
+        """,
+        "_migrate_register_targets"
+    ]),
+    (12, "Record when summary jobs were last resumed", [
+        "_migrate_summary_job_resumes"
+    ])
+]
+
+# The same versions in SQLite's dialect: CHECK constraints stand in for ENUMs and
+# indexes are created separately
+SQLITE_MIGRATIONS = [
+    (0, "Create students table", [
+        """
+        CREATE TABLE IF NOT EXISTS students (
+            student_id INTEGER PRIMARY KEY,
+            admission_number VARCHAR(20) NOT NULL,
+            first_name VARCHAR(50) NOT NULL,
+            last_name VARCHAR(50) NOT NULL,
+            gender VARCHAR(10),
+            date_of_birth DATE,
+            guardian_name VARCHAR(100),
+            guardian_phone VARCHAR(20),
+            stream VARCHAR(50),
+            suburb VARCHAR(100),
+            form INT,
+            class_name VARCHAR(50)
+        )
+        """
+    ]),
+    (1, "Create attendance, summary, incident and register tables", [
+        """
+        CREATE TABLE IF NOT EXISTS daily_attendance (
+            attendance_id INTEGER PRIMARY KEY,
+            student_id INT NOT NULL REFERENCES students(student_id),
+            admission_number VARCHAR(20) NOT NULL,
+            attendance_date DATE NOT NULL,
+            form INT NOT NULL,
+            class_name VARCHAR(50) NOT NULL,
+            morning_status VARCHAR(10) DEFAULT 'Present'
+                CHECK (morning_status IN ('Present', 'Absent', 'Late', 'Excused')),
+            afternoon_status VARCHAR(10) DEFAULT 'Present'
+                CHECK (afternoon_status IN ('Present', 'Absent', 'Late', 'Excused')),
+            completed_homework BOOLEAN DEFAULT 1,
+            uniform_proper BOOLEAN DEFAULT 1,
+            books_brought BOOLEAN DEFAULT 1,
+            participation_level VARCHAR(10) DEFAULT 'Good'
+                CHECK (participation_level IN ('Excellent', 'Good', 'Fair', 'Poor')),
+            teacher_notes TEXT,
+            recorded_by VARCHAR(100),
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (student_id, attendance_date)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS monthly_attendance_summary (
+            summary_id INTEGER PRIMARY KEY,
+            student_id INT NOT NULL REFERENCES students(student_id),
+            admission_number VARCHAR(20) NOT NULL,
+            month_year VARCHAR(7) NOT NULL,
+            form INT NOT NULL,
+            class_name VARCHAR(50) NOT NULL,
+            total_days INT DEFAULT 0,
+            days_present INT DEFAULT 0,
+            days_absent INT DEFAULT 0,
+            days_late INT DEFAULT 0,
+            days_excused INT DEFAULT 0,
+            attendance_percentage DECIMAL(5,2) DEFAULT 0,
+            homework_completion_rate DECIMAL(5,2) DEFAULT 0,
+            uniform_compliance_rate DECIMAL(5,2) DEFAULT 0,
+            books_brought_rate DECIMAL(5,2) DEFAULT 0,
+            average_participation VARCHAR(20),
+            comments TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (student_id, month_year)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS student_incidents (
+            incident_id INTEGER PRIMARY KEY,
+            student_id INT NOT NULL REFERENCES students(student_id),
+            incident_date DATE NOT NULL,
+            incident_type VARCHAR(10) NOT NULL
+                CHECK (incident_type IN ('Positive', 'Negative', 'Neutral')),
+            incident_category VARCHAR(100),
+            description TEXT NOT NULL,
+            action_taken TEXT,
+            recorded_by VARCHAR(100),
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS class_register (
+            register_id INTEGER PRIMARY KEY,
+            form INT NOT NULL,
+            class_name VARCHAR(50) NOT NULL,
+            academic_year VARCHAR(9) NOT NULL,
+            term INT NOT NULL,
+            total_students INT DEFAULT 0,
+            class_teacher VARCHAR(100),
+            class_prefect VARCHAR(100),
+            assistant_prefect VARCHAR(100),
+            average_attendance DECIMAL(5,2) DEFAULT 0,
+            top_performer VARCHAR(100),
+            most_improved VARCHAR(100),
+            class_goals TEXT,
+            special_notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (form, class_name, academic_year, term)
+        )
+        """
+    ]),
+    (2, "Add day-count columns to monthly_attendance_summary", [
+        "_migrate_summary_counters"
+    ]),
+    (3, "Index daily_attendance by date and class", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_attendance_date_class
+        ON daily_attendance (attendance_date, form, class_name, morning_status, afternoon_status)
+        """
+    ]),
+    (4, "Index monthly_attendance_summary by month and class", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_summary_month_class
+        ON monthly_attendance_summary (month_year, form, class_name, attendance_percentage)
+        """
+    ]),
+    (5, "Index student_incidents by student and date", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_incidents_student_date
+        ON student_incidents (student_id, incident_date, incident_id)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_incidents_date
+        ON student_incidents (incident_date, incident_id)
+        """
+    ]),
+    (6, "Create summary job tables", [
+        """
+        CREATE TABLE IF NOT EXISTS summary_jobs (
+            job_id INTEGER PRIMARY KEY,
+            month_year VARCHAR(7) NOT NULL,
+            status VARCHAR(10) NOT NULL DEFAULT 'Queued'
+                CHECK (status IN ('Queued', 'Running', 'Completed', 'Failed')),
+            students_total INT DEFAULT 0,
+            students_processed INT DEFAULT 0,
+            classes_total INT DEFAULT 0,
+            classes_processed INT DEFAULT 0,
+            students_updated INT DEFAULT 0,
+            requested_by VARCHAR(100),
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME NULL,
+            heartbeat_at DATETIME NULL,
+            finished_at DATETIME NULL,
+            duration_seconds DECIMAL(10,2)
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_jobs_month_status ON summary_jobs (month_year, status)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON summary_jobs (status, job_id)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS summary_job_partitions (
+            job_id INT NOT NULL REFERENCES summary_jobs(job_id) ON DELETE CASCADE,
+            form INT NOT NULL,
+            class_name VARCHAR(50) NOT NULL,
+            students INT DEFAULT 0,
+            students_updated INT DEFAULT 0,
+            completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (job_id, form, class_name)
+        )
+        """
+    ]),
+    (7, "Add students admission-number key and class index", [
+        "_migrate_student_keys"
+    ]),
+    (8, "Create attendance archive table", [
+        """
+        CREATE TABLE IF NOT EXISTS attendance_archives (
+            academic_year VARCHAR(9) PRIMARY KEY,
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            status VARCHAR(10) NOT NULL DEFAULT 'Archiving'
+                CHECK (status IN ('Archiving', 'Archived')),
+            row_count INT DEFAULT 0,
+            file_path VARCHAR(255),
+            file_bytes BIGINT DEFAULT 0,
+            archived_at DATETIME NULL
+        )
+        """
+    ]),
+    # Databases whose version-2 backfill failed after its columns were added
+    (9, "Backfill unpopulated summary day counts", [
+        "_backfill_summary_counters"
+    ]),
+    (10, "Create class_daily_stats rollup", [
+        """
+        CREATE TABLE IF NOT EXISTS class_daily_stats (
+            attendance_date DATE NOT NULL,
+            form INT NOT NULL,
+            class_name VARCHAR(50) NOT NULL,
+            students_recorded INT DEFAULT 0,
+            present INT DEFAULT 0,
+            absent INT DEFAULT 0,
+            late INT DEFAULT 0,
+            excused INT DEFAULT 0,
+            full_day INT DEFAULT 0,
+            half_day INT DEFAULT 0,
+            homework_completed INT DEFAULT 0,
+            uniform_compliant INT DEFAULT 0,
+            books_brought INT DEFAULT 0,
+            PRIMARY KEY (attendance_date, form, class_name)
+        )
+        """,
+        "_rebuild_class_daily_stats"
+    ]),
+    (11, "Create term and academic-year summary tables", [
+        """
+        CREATE TABLE IF NOT EXISTS term_attendance_summary (
+            student_id INT NOT NULL REFERENCES students(student_id),
+            admission_number VARCHAR(20) NOT NULL,
+            academic_year VARCHAR(9) NOT NULL,
+            term INT NOT NULL,
+            form INT NOT NULL,
+            class_name VARCHAR(50) NOT NULL,
+            months INT DEFAULT 0,
+            total_days INT DEFAULT 0,
+            days_present INT DEFAULT 0,
+            days_absent INT DEFAULT 0,
+            days_late INT DEFAULT 0,
+            days_excused INT DEFAULT 0,
+            homework_days INT DEFAULT 0,
+            uniform_days INT DEFAULT 0,
+            books_days INT DEFAULT 0,
+            attendance_percentage DECIMAL(5,2) DEFAULT 0,
+            homework_completion_rate DECIMAL(5,2) DEFAULT 0,
+            uniform_compliance_rate DECIMAL(5,2) DEFAULT 0,
+            books_brought_rate DECIMAL(5,2) DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (student_id, academic_year, term)
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_term_summary_class
+        ON term_attendance_summary (academic_year, term, form, class_name)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS class_term_summary (
+            academic_year VARCHAR(9) NOT NULL,
+            term INT NOT NULL,
+            form INT NOT NULL,
+            class_name VARCHAR(50) NOT NULL,
+            students INT DEFAULT 0,
+            total_days INT DEFAULT 0,
+            days_present INT DEFAULT 0,
+            days_absent INT DEFAULT 0,
+            days_late INT DEFAULT 0,
+            days_excused INT DEFAULT 0,
+            attendance_percentage DECIMAL(5,2) DEFAULT 0,
+            homework_completion_rate DECIMAL(5,2) DEFAULT 0,
+            uniform_compliance_rate DECIMAL(5,2) DEFAULT 0,
+            books_brought_rate DECIMAL(5,2) DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (academic_year, term, form, class_name)
+        )
+        """,
+        "_migrate_register_targets"
+    ]),
+    (12, "Record when summary jobs were last resumed", [
+        "_migrate_summary_job_resumes"
+    ])
+]
+
+# SQLite stores dates as ISO text; convert them back for columns declared DATE/DATETIME/TIMESTAMP
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+
+class StorageBackend:
+    """SQL dialect and connection factory for one kind of database
+    
+    SchoolRegisterSystem writes portable SQL and asks its backend for the parts that differ.
+    """
+    name = None
+    migrations = []
+    for_update = ""                 # row-locking suffix for SELECTs inside write transactions
+    for_update_skip_locked = ""     # the same, skipping rows another worker holds
+    greatest = "GREATEST"           # largest of several values in one row
+    max_writers = None              # concurrent write transactions worth running (None: no limit)
+    bulk_load = False               # load_rows can bulk-load a file instead of running INSERTs
+    
+    def connect(self):
+        raise NotImplementedError
+    
+    def new_value(self, column):
+        """The value an upsert tried to insert into a column"""
+        raise NotImplementedError
+    
+    def upsert(self, key_columns, assignments):
+        """Clause turning an INSERT into an upsert on key_columns; assignments maps column -> SQL"""
+        raise NotImplementedError
+    
+    def new_values(self, columns):
+        """Upsert assignments copying the new row's value into each column"""
+        return {column: self.new_value(column) for column in columns}
+    
+    def row_in(self, columns, count):
+        """(a, b) IN (...) with `count` rows of placeholders"""
+        row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        return f"({', '.join(columns)}) IN ({', '.join([row] * count)})"
+    
+    def acquire_migration_lock(self, cursor):
+        return True
+    
+    def release_migration_lock(self, cursor):
+        pass
+    
+    def acquire_lock(self, cursor, name, timeout=10):
+        """Take a named lock held until release_lock, across transactions and app processes"""
+        return True
+    
+    def release_lock(self, cursor, name):
+        pass
+    
+    def table_columns(self, cursor, table):
+        raise NotImplementedError
+    
+    def table_indexes(self, cursor, table):
+        """{index name: (unique, columns)} for a table's indexes"""
+        raise NotImplementedError
+    
+    def add_columns(self, cursor, table, definitions):
+        for definition in definitions:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+    
+    def insert_rows(self, cursor, table, columns, rows, key_columns=None, update_columns=()):
+        """Multi-row INSERTs of value tuples; with key_columns, update_columns of existing rows are overwritten"""
+        clause = self.upsert(key_columns, self.new_values(update_columns)) if key_columns else ""
+        row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        statement_rows = IMPORT_CONFIG['statement_rows']
+        for start in range(0, len(rows), statement_rows):
+            batch = rows[start:start + statement_rows]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row] * len(batch))} {clause}",
+                [value for values in batch for value in values]
+            )
+    
+    def load_rows(self, cursor, table, columns, rows, replace=False):
+        """Bulk-load value tuples from a file; with replace, rows with the same unique key are replaced"""
+        raise NotImplementedError
+
+class MySQLBackend(StorageBackend):
+    """MySQL 8 server"""
+    name = 'mysql'
+    migrations = MYSQL_MIGRATIONS
+    for_update = "FOR UPDATE"
+    for_update_skip_locked = "FOR UPDATE SKIP LOCKED"
+    greatest = "GREATEST"
+    
+    def __init__(self, db_config):
+        self.db_config = dict(db_config)
+        # LOAD DATA LOCAL INFILE needs the client option here and local_infile=ON on the server
+        self.bulk_load = bool(self.db_config.get('allow_local_infile'))
+    
+    def connect(self):
+        return mysql.connector.connect(**self.db_config)
+    
+    def new_value(self, column):
+        return f"VALUES({column})"
+    
+    def upsert(self, key_columns, assignments):
+        return "ON DUPLICATE KEY UPDATE " + ", ".join(
+            f"{column} = {expression}" for column, expression in assignments.items())
+    
+    def acquire_migration_lock(self, cursor):
+        # Serialise migrations across app processes
+        return self.acquire_lock(cursor, 'register_schema_migrations', 60)
+    
+    def release_migration_lock(self, cursor):
+        self.release_lock(cursor, 'register_schema_migrations')
+    
+    def acquire_lock(self, cursor, name, timeout=10):
+        cursor.execute("SELECT GET_LOCK(%s, %s) AS acquired", (name, timeout))
+        return cursor.fetchone()['acquired'] == 1
+    
+    def release_lock(self, cursor, name):
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+        cursor.fetchall()
+    
+    def table_columns(self, cursor, table):
+        cursor.execute("""
+            SELECT COLUMN_NAME AS column_name
+            FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """, (table,))
+        return {row['column_name'] for row in cursor.fetchall()}
+    
+    def table_indexes(self, cursor, table):
+        cursor.execute("""
+            SELECT INDEX_NAME AS index_name, NON_UNIQUE AS non_unique, COLUMN_NAME AS column_name
+            FROM INFORMATION_SCHEMA.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            ORDER BY INDEX_NAME, SEQ_IN_INDEX
+        """, (table,))
+        indexes = {}
+        for row in cursor.fetchall():
+            unique, columns = indexes.get(row['index_name'], (not row['non_unique'], ()))
+            indexes[row['index_name']] = (unique, columns + (row['column_name'],))
+        return indexes
+    
+    def add_columns(self, cursor, table, definitions):
+        cursor.execute(f"ALTER TABLE {table} " + ", ".join(f"ADD COLUMN {d}" for d in definitions))
+    
+    def load_rows(self, cursor, table, columns, rows, replace=False):
+        # Tab-separated with LOAD DATA's default escaping: \N is NULL
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='\n', suffix='.tsv',
+                                         delete=False) as data_file:
+            for values in rows:
+                data_file.write("\t".join(
+                    "\\N" if value is None else
+                    str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+                    for value in values) + "\n")
+        try:
+            cursor.execute(f"""
+                LOAD DATA LOCAL INFILE %s {'REPLACE' if replace else ''} INTO TABLE {table}
+                CHARACTER SET utf8mb4 ({', '.join(columns)})
+            """, (data_file.name,))
+        finally:
+            os.remove(data_file.name)
+
+class SQLiteBackend(StorageBackend):
+    """Embedded SQLite database file; writers are serialised by SQLite itself"""
+    name = 'sqlite'
+    migrations = SQLITE_MIGRATIONS
+    greatest = "MAX"
+    max_writers = 1
+    # Names in-memory databases; an id() can be reused while an old database is still open
+    _memory_names = itertools.count()
+    
+    def __init__(self, path):
+        self.path = path
+        self._migration_lock = threading.Lock()
+        self._keep_alive = None
+        if path == ':memory:':
+            # Pooled connections share one in-memory database, which lives while any is open
+            self._target = f"file:register-{os.getpid()}-{next(self._memory_names)}?mode=memory&cache=shared"
+            self._keep_alive = self.connect()
+        else:
+            self._target = path
+    
+    def connect(self):
+        try:
+            connection = sqlite3.connect(self._target, uri=self._target.startswith("file:"),
+                                         timeout=30, detect_types=sqlite3.PARSE_DECLTYPES,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA foreign_keys = ON")
+            if self.path != ':memory:':
+                connection.execute("PRAGMA journal_mode = WAL")
+        except sqlite3.Error as e:
+            raise sqlite_error(e) from e
+        return SQLiteConnection(connection)
+    
+    def new_value(self, column):
+        return f"excluded.{column}"
+    
+    def upsert(self, key_columns, assignments):
+        return f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET " + ", ".join(
+            f"{column} = {expression}" for column, expression in assignments.items())
+    
+    def row_in(self, columns, count):
+        row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        return f"({', '.join(columns)}) IN (VALUES {', '.join([row] * count)})"
+    
+    def acquire_migration_lock(self, cursor):
+        return self._migration_lock.acquire(timeout=60)
+    
+    def release_migration_lock(self, cursor):
+        self._migration_lock.release()
+    
+    # Named locks are not needed: write transactions (BEGIN IMMEDIATE) already run one at a time
+    
+    def table_columns(self, cursor, table):
+        cursor.execute(f"PRAGMA table_info({table})")
+        return {row['name'] for row in cursor.fetchall()}
+    
+    def table_indexes(self, cursor, table):
+        cursor.execute(f"PRAGMA index_list({table})")
+        indexes = {}
+        for index in cursor.fetchall():
+            cursor.execute(f"PRAGMA index_info({index['name']})")
+            columns = tuple(row['name'] for row in sorted(cursor.fetchall(), key=lambda row: row['seqno']))
+            indexes[index['name']] = (bool(index['unique']), columns)
+        return indexes
+
+class SQLiteConnection:
+    """sqlite3 connection with the mysql.connector methods SchoolRegisterSystem uses
+    
+    Errors are raised as mysql.connector Errors so callers handle both backends alike.
+    """
+    
+    def __init__(self, connection):
+        self._connection = connection
+    
+    def cursor(self, dictionary=False):
+        return SQLiteCursor(self._connection.cursor(), dictionary)
+    
+    def start_transaction(self, consistent_snapshot=False, readonly=False):
+        # Writers take SQLite's write lock up front, standing in for row locks
+        self._call(self._connection.execute, "BEGIN" if readonly else "BEGIN IMMEDIATE")
+    
+    @property
+    def in_transaction(self):
+        return self._connection.in_transaction
+    
+    def is_connected(self):
         try:
-            self.connection = mysql.connector.connect(**DB_CONFIG)
-            self.cursor = self.connection.cursor(dictionary=True)
+            self._connection.execute("SELECT 1")
             return True
-        except Error as e:
-            st.error(f"Database connection error: {e}")
+        except sqlite3.Error:
             return False
     
-    def close_db(self):
-        """Close database connection"""
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
+    def commit(self):
+        self._call(self._connection.commit)
     
-    def setup_database(self):
-        """Create attendance and register tables"""
-        if not self.connect_db():
-            return False
+    def rollback(self):
+        self._call(self._connection.rollback)
+    
+    def close(self):
+        self._call(self._connection.close)
+    
+    @staticmethod
+    def _call(method, *args):
+        try:
+            return method(*args)
+        except sqlite3.Error as e:
+            raise sqlite_error(e) from e
+
+def sqlite_error(error):
+    """The mysql.connector error class matching a sqlite3 error"""
+    if isinstance(error, sqlite3.OperationalError):
+        return OperationalError(msg=str(error))
+    if isinstance(error, sqlite3.IntegrityError):
+        return IntegrityError(msg=str(error))
+    return DatabaseError(msg=str(error))
+
+def is_connectivity_error(error):
+    """Errors worth retrying later: the database is unreachable, saturated or locked"""
+    # 1205 lock wait timeout, 1213 deadlock
+    return (isinstance(error, (PoolError, InterfaceError, OperationalError))
+            or getattr(error, 'errno', None) in (1205, 1213))
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+class SQLiteCursor:
+    """sqlite3 cursor accepting %s placeholders and optionally returning dict rows"""
+    
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        if dictionary:
+            self._cursor.row_factory = _dict_row
+    
+    def execute(self, statement, params=None):
+        SQLiteConnection._call(self._cursor.execute, statement.replace("%s", "?"), params or ())
+    
+    def executemany(self, statement, rows):
+        SQLiteConnection._call(self._cursor.executemany, statement.replace("%s", "?"), rows)
+    
+    def fetchone(self):
+        return SQLiteConnection._call(self._cursor.fetchone)
+    
+    def fetchall(self):
+        return SQLiteConnection._call(self._cursor.fetchall)
+    
+    def fetchmany(self, size=1):
+        return SQLiteConnection._call(self._cursor.fetchmany, size)
+    
+    @property
+    def description(self):
+        return self._cursor.description
+    
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+    
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+    
+    def close(self):
+        self._cursor.close()
+
+def create_backend(name=None):
+    """The storage backend selected by DB_BACKEND"""
+    name = name or DB_BACKEND
+    if name == 'mysql':
+        return MySQLBackend(DB_CONFIG)
+    if name == 'sqlite':
+        return SQLiteBackend(SQLITE_PATH)
+    raise ValueError(f"Unknown DB_BACKEND '{name}', expected 'mysql' or 'sqlite'")
+
+class ConnectionPool:
+    """Thread-safe pool of database connections shared by all sessions"""
+    
+    def __init__(self, backend, pool_size=10, checkout_timeout=10,
+                 ping_after_idle=30, recycle_after=3600):
+        self.backend = backend
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self.ping_after_idle = ping_after_idle
+        self.recycle_after = recycle_after
+        
+        self._lock = threading.Condition()
+        self._idle = deque()        # (connection, created_at, last_used)
+        self._created = {}          # id(connection) -> created_at, for checked-out connections
+        self._open = 0
+        self._closed = False
+    
+    def acquire(self):
+        """Check out a healthy connection, opening a new one if needed"""
+        deadline = time.monotonic() + self.checkout_timeout
+        
+        with self._lock:
+            if self._closed:
+                raise PoolError("The connection pool has been closed")
+            while not self._idle and self._open >= self.pool_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(f"No free database connection after {self.checkout_timeout}s "
+                                    f"(pool size {self.pool_size})")
+                self._lock.wait(remaining)
+            
+            if self._idle:
+                connection, created_at, last_used = self._idle.pop()
+            else:
+                connection, created_at, last_used = None, None, None
+                self._open += 1
         
         try:
-            # Create daily_attendance table
-            create_attendance_table = '''
-            CREATE TABLE IF NOT EXISTS daily_attendance (
-                attendance_id INT PRIMARY KEY AUTO_INCREMENT,
-                student_id INT NOT NULL,
-                admission_number VARCHAR(20) NOT NULL,
-                attendance_date DATE NOT NULL,
-                form INT NOT NULL,
-                class_name VARCHAR(50) NOT NULL,
-                
-                -- Attendance status
-                morning_status ENUM('Present', 'Absent', 'Late', 'Excused') DEFAULT 'Present',
-                afternoon_status ENUM('Present', 'Absent', 'Late', 'Excused') DEFAULT 'Present',
-                
-                -- Daily performance
-                completed_homework BOOLEAN DEFAULT TRUE,
-                uniform_proper BOOLEAN DEFAULT TRUE,
-                books_brought BOOLEAN DEFAULT TRUE,
-                participation_level ENUM('Excellent', 'Good', 'Fair', 'Poor') DEFAULT 'Good',
-                
-                -- Teacher notes
-                teacher_notes TEXT,
-                recorded_by VARCHAR(100),
-                recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                
-                -- Foreign key
-                FOREIGN KEY (student_id) REFERENCES students(student_id),
-                UNIQUE KEY unique_student_date (student_id, attendance_date)
+            now = time.monotonic()
+            if connection is not None:
+                if now - created_at > self.recycle_after:
+                    self._close_quietly(connection)
+                    connection = None
+                elif now - last_used > self.ping_after_idle and not connection.is_connected():
+                    self._close_quietly(connection)
+                    connection = None
+            
+            if connection is None:
+                connection = self.backend.connect()
+                created_at = now
+        except Error:
+            self._discard()
+            raise
+        
+        self._created[id(connection)] = created_at
+        return connection
+    
+    def release(self, connection):
+        """Return a connection to the pool, discarding it if it is broken or the pool is closed
+        
+        A connection counts as healthy if it can roll back and still answers is_connected(),
+        which pings the server; connections lost while idle are caught by acquire.
+        """
+        created_at = self._created.pop(id(connection), time.monotonic())
+        
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+            healthy = not self._closed and connection.is_connected()
+        except Error:
+            healthy = False
+        
+        if not healthy:
+            self._close_quietly(connection)
+            self._discard()
+            return
+        
+        with self._lock:
+            self._idle.append((connection, created_at, time.monotonic()))
+            self._lock.notify()
+    
+    def close_all(self):
+        """Close every idle connection and the pool; checked-out connections close on release"""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                connection, _, _ = self._idle.pop()
+                self._close_quietly(connection)
+                self._open -= 1
+            self._lock.notify_all()
+    
+    def stats(self):
+        """Current pool usage"""
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle)
+            }
+    
+    def _discard(self):
+        with self._lock:
+            self._open -= 1
+            self._lock.notify()
+    
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+
+@st.cache_resource
+def get_connection_pool():
+    """Process-wide connection pool, shared across Streamlit sessions"""
+    return ConnectionPool(create_backend(), **POOL_CONFIG)
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a fixed time"""
+    
+    def __init__(self, ttl=600, max_entries=512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def generation(self):
+        """Read before loading a value and pass to set() so stale loads are dropped"""
+        return self._generation
+    
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, key, value, generation=None):
+        with self._lock:
+            # An invalidation happened while the value was being loaded
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+    
+    def invalidate_prefix(self, *prefix):
+        """Drop every tuple key starting with the given elements"""
+        with self._lock:
+            self._generation += 1
+            for key in [k for k in self._entries if k[:len(prefix)] == prefix]:
+                del self._entries[key]
+    
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+    
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+@lru_cache(maxsize=1024)
+def query_fingerprint(statement):
+    """Statement text with literals and placeholder lists collapsed, so repeats group together"""
+    fingerprint = " ".join(statement.split())
+    fingerprint = re.sub(r"'(?:[^'\\]|\\.|'')*'", "?", fingerprint)
+    fingerprint = re.sub(r"\b\d+(?:\.\d+)?\b", "?", fingerprint)
+    fingerprint = fingerprint.replace("%s", "?")
+    # Multi-row VALUES and IN lists differ only in length
+    fingerprint = re.sub(r"\?(?:\s*,\s*\?)+", "?, ...", fingerprint)
+    fingerprint = re.sub(r"\(\?(?:, \.\.\.)?\)(?:\s*,\s*\(\?(?:, \.\.\.)?\))+", "(?, ...), ...", fingerprint)
+    return fingerprint
+
+class QueryTracer:
+    """Bounded in-memory record of executed statements, shared by every session in the process"""
+    
+    def __init__(self, buffer_size=5000, slow_query_ms=500, slow_log_path=None):
+        self.buffer_size = buffer_size
+        self.slow_query_ms = slow_query_ms
+        self.slow_log_path = slow_log_path
+        self._entries = deque(maxlen=buffer_size)
+        self._log_lock = threading.Lock()
+    
+    def record(self, statement, param_count, caller):
+        """Start an entry for one execution; the cursor fills in its rows and time"""
+        entry = {
+            'at': datetime.now(),
+            'fingerprint': query_fingerprint(statement),
+            'params': param_count,
+            'rows': 0,
+            'ms': 0.0,
+            'caller': caller
+        }
+        self._entries.append(entry)
+        return entry
+    
+    def finish(self, entry):
+        """Called once an execution and its fetches are done"""
+        if self.slow_log_path and entry['ms'] >= self.slow_query_ms:
+            line = json.dumps(dict(entry, at=entry['at'].isoformat(timespec='milliseconds'),
+                                   ms=round(entry['ms'], 3)))
+            with self._log_lock:
+                with open(self.slow_log_path, 'a', encoding='utf-8') as log_file:
+                    log_file.write(line + "\n")
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def summary(self):
+        """Per-statement count, total/mean/p95/max time and rows for the buffered executions"""
+        frame = pd.DataFrame(list(self._entries))
+        if frame.empty:
+            return frame
+        
+        grouped = frame.groupby('fingerprint')
+        summary = grouped.agg(
+            count=('ms', 'size'),
+            total_ms=('ms', 'sum'),
+            mean_ms=('ms', 'mean'),
+            max_ms=('ms', 'max'),
+            rows=('rows', 'sum'),
+            callers=('caller', lambda callers: ", ".join(sorted(set(callers))))
+        )
+        summary['p95_ms'] = grouped['ms'].quantile(0.95)
+        return summary.reset_index()
+
+def trace_caller(frame):
+    """Name of the function a statement is traced to: the first frame up from `frame`
+    that is neither a TRACE_HELPERS helper nor a comprehension"""
+    while frame.f_back is not None and (frame.f_code.co_name in TRACE_HELPERS
+                                        or frame.f_code.co_name.startswith('<')):
+        frame = frame.f_back
+    return frame.f_code.co_name
+
+class TracedCursor:
+    """Cursor wrapper that times each execute and counts the rows fetched from it"""
+    
+    def __init__(self, cursor, tracer):
+        self._cursor = cursor
+        self._tracer = tracer
+        self._entry = None
+    
+    def execute(self, statement, params=None):
+        self._finish()
+        caller = trace_caller(sys._getframe(1))
+        self._entry = self._tracer.record(statement, len(params) if params else 0, caller)
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(statement, params)
+        finally:
+            self._entry['ms'] += (time.perf_counter() - started) * 1000
+            if self._cursor.description is None:
+                self._entry['rows'] = max(self._cursor.rowcount, 0)
+    
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        try:
+            result = method(*args)
+        finally:
+            if self._entry is not None:
+                self._entry['ms'] += (time.perf_counter() - started) * 1000
+        if self._entry is not None and result is not None:
+            self._entry['rows'] += len(result) if isinstance(result, list) else 1
+        return result
+    
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+    
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+    
+    def fetchmany(self, size=1):
+        return self._fetch(self._cursor.fetchmany, size)
+    
+    def _finish(self):
+        if self._entry is not None:
+            self._tracer.finish(self._entry)
+            self._entry = None
+    
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+    
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+@st.cache_resource
+def get_query_tracer():
+    """Process-wide query trace buffer"""
+    return QueryTracer(**TRACE_CONFIG)
+
+@st.cache_resource
+def get_reference_cache():
+    """Process-wide cache of classes, rosters and registers"""
+    return TTLCache(**CACHE_CONFIG)
+
+@st.cache_resource
+def get_history_cache():
+    """Process-wide cache of per-student history"""
+    return TTLCache(**HISTORY_CACHE_CONFIG)
+
+@st.cache_resource
+def get_query_executor():
+    """Threads for running independent reads concurrently, each on its own pooled connection"""
+    return ThreadPoolExecutor(max_workers=POOL_CONFIG['pool_size'], thread_name_prefix="register-query")
+
+class SummaryJobRunner:
+    """Worker thread that runs queued monthly summary jobs one at a time"""
+    
+    def __init__(self, register, poll_seconds):
+        self.register = register
+        self.poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="summary-job-runner", daemon=True)
+    
+    def start(self):
+        self._thread.start()
+        return self
+    
+    def wake(self):
+        """Look for queued jobs now instead of at the next poll"""
+        self._wake.set()
+    
+    def _run(self):
+        while True:
+            job_id = None
+            try:
+                job_id = self.register.claim_summary_job()
+                if job_id is not None:
+                    self.register.run_summary_job(job_id)
+                    continue
+            except Exception as e:
+                # A bug in one job must not end the thread; fail that job and keep polling
+                logger.exception("Summary job %s failed", job_id)
+                if job_id is not None:
+                    self.register.fail_summary_job(job_id, f"Unexpected error: {e!r}")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+@st.cache_resource
+def get_job_runner():
+    """Process-wide summary job runner; also resumes jobs left running by a previous process"""
+    return SummaryJobRunner(SchoolRegisterSystem(), JOB_CONFIG['poll_seconds']).start()
+
+def _queue_value(value):
+    """JSON-safe form of a submitted attendance value"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+class AttendanceQueue:
+    """Durable local queue of attendance submissions waiting to be written to the database
+    
+    Each submission is committed to a local SQLite file before the teacher sees it
+    acknowledged, and stays there until the replayer has written it.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.row_factory = _dict_row
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = FULL")
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS queued_submissions (
+                submission_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                queued_at TEXT NOT NULL,
+                row_count INTEGER NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                dead INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS queued_attendance (
+                submission_id INTEGER NOT NULL REFERENCES queued_submissions(submission_id),
+                student_id INTEGER NOT NULL,
+                attendance_date TEXT NOT NULL,
+                form INTEGER,
+                class_name TEXT,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (submission_id, student_id, attendance_date)
+            );
+            CREATE INDEX IF NOT EXISTS idx_queued_class_date
+            ON queued_attendance (form, class_name, attendance_date);
+        """)
+    
+    def append(self, attendance_data):
+        """Store one class submission durably; returns its submission id"""
+        rows = [{key: _queue_value(value) for key, value in row.items()} for row in attendance_data]
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO queued_submissions (queued_at, row_count) VALUES (?, ?)",
+                (datetime.now().isoformat(" ", timespec="seconds"), len(rows))
             )
-            '''
-            self.cursor.execute(create_attendance_table)
-            
-            # Create monthly_summary table
-            create_summary_table = '''
-            CREATE TABLE IF NOT EXISTS monthly_attendance_summary (
-                summary_id INT PRIMARY KEY AUTO_INCREMENT,
-                student_id INT NOT NULL,
-                admission_number VARCHAR(20) NOT NULL,
-                month_year VARCHAR(7) NOT NULL, -- Format: YYYY-MM
-                form INT NOT NULL,
-                class_name VARCHAR(50) NOT NULL,
-                
-                -- Attendance counts
-                total_days INT DEFAULT 0,
-                days_present INT DEFAULT 0,
-                days_absent INT DEFAULT 0,
-                days_late INT DEFAULT 0,
-                days_excused INT DEFAULT 0,
-                
-                -- Percentage
-                attendance_percentage DECIMAL(5,2) DEFAULT 0,
-                
-                -- Performance
-                homework_completion_rate DECIMAL(5,2) DEFAULT 0,
-                uniform_compliance_rate DECIMAL(5,2) DEFAULT 0,
-                books_brought_rate DECIMAL(5,2) DEFAULT 0,
-                average_participation VARCHAR(20),
+            submission_id = cursor.lastrowid
+            self._connection.executemany("""
+                INSERT OR REPLACE INTO queued_attendance
+                (submission_id, student_id, attendance_date, form, class_name, payload)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(submission_id, row['student_id'], str(row['attendance_date'])[:10],
+                   row['form'], row['class_name'], json.dumps(row)) for row in rows])
+        return submission_id
+    
+    def next_batch(self, max_rows):
+        """Oldest live submissions, whole, up to about max_rows rows: [(submission_id, rows)]"""
+        with self._lock:
+            submissions = self._connection.execute(
+                "SELECT submission_id, row_count FROM queued_submissions WHERE dead = 0 ORDER BY submission_id"
+            ).fetchall()
+            
+            chosen = []
+            total = 0
+            for submission in submissions:
+                if chosen and total + submission['row_count'] > max_rows:
+                    break
+                chosen.append(submission['submission_id'])
+                total += submission['row_count']
+            
+            batch = []
+            for submission_id in chosen:
+                payloads = self._connection.execute(
+                    "SELECT payload FROM queued_attendance WHERE submission_id = ?", (submission_id,)
+                ).fetchall()
+                batch.append((submission_id, [json.loads(row['payload']) for row in payloads]))
+            return batch
+    
+    def remove(self, submission_ids):
+        """Forget submissions that have been written to the database"""
+        marks = ", ".join("?" * len(submission_ids))
+        with self._lock, self._connection:
+            self._connection.execute(f"DELETE FROM queued_attendance WHERE submission_id IN ({marks})", submission_ids)
+            self._connection.execute(f"DELETE FROM queued_submissions WHERE submission_id IN ({marks})", submission_ids)
+    
+    def record_failure(self, submission_ids, error, dead=False):
+        """Note a failed replay; dead submissions are kept but no longer retried"""
+        marks = ", ".join("?" * len(submission_ids))
+        with self._lock, self._connection:
+            self._connection.execute(f"""
+                UPDATE queued_submissions
+                SET attempts = attempts + 1, last_error = ?, dead = ?
+                WHERE submission_id IN ({marks})
+            """, [error, int(dead)] + list(submission_ids))
+    
+    def requeue_dead(self):
+        """Retry every dead submission; returns how many were requeued"""
+        with self._lock, self._connection:
+            return self._connection.execute(
+                "UPDATE queued_submissions SET dead = 0 WHERE dead = 1"
+            ).rowcount
+    
+    def pending(self, form, class_name, attendance_date):
+        """Queued rows for one class and day, latest submission winning: {student_id: row}"""
+        with self._lock:
+            rows = self._connection.execute("""
+                SELECT qa.payload
+                FROM queued_attendance qa
+                JOIN queued_submissions qs ON qs.submission_id = qa.submission_id
+                WHERE qa.form = ? AND qa.class_name = ? AND qa.attendance_date = ? AND qs.dead = 0
+                ORDER BY qa.submission_id
+            """, (form, class_name, str(attendance_date)[:10])).fetchall()
+        pending = {}
+        for row in rows:
+            record = json.loads(row['payload'])
+            pending[record['student_id']] = record
+        return pending
+    
+    def depth(self):
+        """Waiting and dead submissions and rows, and when the oldest waiting one arrived"""
+        with self._lock:
+            return self._connection.execute("""
+                SELECT COALESCE(SUM(dead = 0), 0) AS submissions,
+                       COALESCE(SUM(CASE WHEN dead = 0 THEN row_count ELSE 0 END), 0) AS rows,
+                       COALESCE(SUM(dead), 0) AS dead,
+                       MIN(CASE WHEN dead = 0 THEN queued_at END) AS oldest
+                FROM queued_submissions
+            """).fetchone()
+    
+    def dead_letters(self):
+        """Submissions that could not be written, with their last error"""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT * FROM queued_submissions WHERE dead = 1 ORDER BY submission_id"
+            ).fetchall()
+
+class AttendanceReplayer:
+    """Worker thread that drains the attendance queue into the database in batches"""
+    
+    def __init__(self, queue, register, batch_rows, poll_seconds, retry_seconds):
+        self.queue = queue
+        self.register = register
+        self.batch_rows = batch_rows
+        self.poll_seconds = poll_seconds
+        self.retry_seconds = retry_seconds
+        self.last_replayed_at = None
+        self.last_error = None
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="attendance-replayer", daemon=True)
+    
+    def start(self):
+        self._thread.start()
+        return self
+    
+    def wake(self):
+        """Replay new submissions now instead of at the next poll"""
+        self._wake.set()
+    
+    def is_alive(self):
+        return self._thread.is_alive()
+    
+    def _run(self):
+        while True:
+            try:
+                batch = self.queue.next_batch(self.batch_rows)
+                if batch and self._replay(batch):
+                    self.last_replayed_at = datetime.now()
+                    continue
+                # Nothing to do, or the database is unreachable: wait before trying again
+                wait_seconds = self.poll_seconds if not batch else self.retry_seconds
+            except Exception as e:
+                # A queue file error or a bug must not end the thread; the batch stays queued
+                logger.exception("Attendance replay failed")
+                self.last_error = f"{datetime.now():%Y-%m-%d %H:%M:%S} {e!r}"
+                wait_seconds = self.retry_seconds
+            self._wake.wait(wait_seconds)
+            self._wake.clear()
+    
+    def _replay(self, batch):
+        """Write a batch of submissions; returns False if the database could not be reached"""
+        submission_ids = [submission_id for submission_id, _ in batch]
+        try:
+            # Upserts keyed on (student_id, attendance_date) make a repeated replay harmless
+            self.register.apply_attendance([row for _, rows in batch for row in rows])
+        except (Error, KeyError, TypeError, ValueError) as e:
+            if isinstance(e, Error) and is_connectivity_error(e):
+                self.queue.record_failure(submission_ids, str(e))
+                return False
+            if len(batch) > 1:
+                # Find the submission(s) that cannot be written and replay the rest
+                return all([self._replay([submission]) for submission in batch])
+            error = str(e) if isinstance(e, Error) else f"Invalid submission: {e!r}"
+            self.queue.record_failure(submission_ids, error, dead=True)
+            return True
+        
+        self.queue.remove(submission_ids)
+        return True
+
+@st.cache_resource
+def get_attendance_queue():
+    """Process-wide local attendance queue"""
+    return AttendanceQueue(ATTENDANCE_QUEUE_CONFIG['path'])
+
+@st.cache_resource
+def get_attendance_replayer():
+    """Process-wide replayer; also writes submissions queued before a restart"""
+    return AttendanceReplayer(get_attendance_queue(), SchoolRegisterSystem(),
+                              ATTENDANCE_QUEUE_CONFIG['batch_rows'],
+                              ATTENDANCE_QUEUE_CONFIG['poll_seconds'],
+                              ATTENDANCE_QUEUE_CONFIG['retry_seconds']).start()
+
+# Marks a cache miss where None is a valid cached value
+_MISSING = object()
+
+def encode_archive_rows(rows):
+    """Column arrays for daily_attendance rows given as tuples in ARCHIVE_COLUMNS order"""
+    columns = dict(zip(ARCHIVE_COLUMNS, zip(*rows))) if rows else {column: () for column in ARCHIVE_COLUMNS}
+    arrays = {}
+    for column, kind in ARCHIVE_COLUMNS.items():
+        values = columns[column]
+        if isinstance(kind, list):
+            codes = {choice: i for i, choice in enumerate(kind)}
+            arrays[column] = np.array([codes.get(value, -1) for value in values], dtype=np.int8)
+        elif kind == 'U':
+            arrays[column] = np.array(["" if value is None else str(value) for value in values], dtype=str)
+        else:
+            # None becomes NaT in the date columns
+            arrays[column] = np.array(values, dtype=kind)
+    return arrays
+
+def write_archive_file(path, arrays):
+    """Write column arrays to a compressed .npz file, replacing any previous file atomically"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial_path = path + ".partial"
+    with open(partial_path, "wb") as archive_file:
+        np.savez_compressed(archive_file, **arrays)
+        archive_file.flush()
+        os.fsync(archive_file.fileno())
+    os.replace(partial_path, path)
+    return os.path.getsize(path)
+
+@lru_cache(maxsize=4)
+def _load_archive_file(path, modified):
+    with np.load(path) as archive:
+        return {column: archive[column] for column in ARCHIVE_COLUMNS}
+
+def load_archive_file(path):
+    """Column arrays of an archive file, kept in memory while it is unchanged"""
+    return _load_archive_file(path, os.path.getmtime(path))
+
+def archive_records(arrays, selection):
+    """daily_attendance rows (dicts, as the database returns them) for the selected archive positions"""
+    values = []
+    for column, kind in ARCHIVE_COLUMNS.items():
+        array = arrays[column][selection]
+        if isinstance(kind, list):
+            # Code -1 (the last entry) is a NULL
+            values.append(np.array(kind + [None], dtype=object)[array].tolist())
+        elif kind == 'bool':
+            values.append(array.astype(np.int64).tolist())
+        else:
+            values.append(array.tolist())
+    return [dict(zip(ARCHIVE_COLUMNS, row)) for row in zip(*values)]
+
+class SchoolRegisterSystem:
+    def __init__(self, pool=None, cache=None, history_cache=None, tracer=None):
+        self.pool = pool if pool is not None else get_connection_pool()
+        self.cache = cache if cache is not None else get_reference_cache()
+        self.history_cache = history_cache if history_cache is not None else get_history_cache()
+        self.tracer = tracer if tracer is not None else get_query_tracer()
+        self.backend = self.pool.backend
+        self.connection = None
+        self.cursor = None
+    
+    def connect_db(self):
+        """Borrow a connection from the shared pool"""
+        try:
+            self.connection = self.pool.acquire()
+            self.cursor = self._new_cursor(self.connection, dictionary=True)
+            return True
+        except Error as e:
+            st.error(f"Database connection error: {e}")
+            self.close_db()
+            return False
+    
+    def _new_cursor(self, connection, **options):
+        """Open a cursor whose executions are recorded by the query tracer"""
+        return TracedCursor(connection.cursor(**options), self.tracer)
+    
+    def close_db(self):
+        """Return the borrowed connection to the pool"""
+        if self.cursor:
+            self.cursor.close()
+            self.cursor = None
+        if self.connection:
+            self.pool.release(self.connection)
+            self.connection = None
+    
+    def setup_database(self):
+        """Bring the database schema up to date"""
+        applied = self.run_migrations()
+        if applied is None:
+            return False
+        
+        if applied:
+            st.success(f"✅ Database schema updated ({len(applied)} migrations applied)")
+        return True
+    
+    def run_migrations(self):
+        """Apply the backend's pending migrations in order; returns the versions applied, or None on error"""
+        if not self.connect_db():
+            return None
+        
+        lock_acquired = False
+        try:
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(200) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            lock_acquired = self.backend.acquire_migration_lock(self.cursor)
+            if not lock_acquired:
+                st.error("Database setup error: timed out waiting for another migration to finish")
+                return None
+            
+            self.cursor.execute("SELECT version FROM schema_migrations")
+            applied_versions = {row['version'] for row in self.cursor.fetchall()}
+            
+            applied = []
+            for version, description, steps in self.backend.migrations:
+                if version in applied_versions:
+                    continue
                 
-                -- Notes
-                comments TEXT,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                # DDL commits implicitly, so each migration is recorded as soon as it finishes
+                for step in steps:
+                    if step.startswith('_'):
+                        getattr(self, step)(self.cursor)
+                    else:
+                        self.cursor.execute(step)
                 
-                -- Foreign key
-                FOREIGN KEY (student_id) REFERENCES students(student_id),
-                UNIQUE KEY unique_student_month (student_id, month_year)
-            )
-            '''
-            self.cursor.execute(create_summary_table)
-            
-            # Create incidents table for special cases
-            create_incidents_table = '''
-            CREATE TABLE IF NOT EXISTS student_incidents (
-                incident_id INT PRIMARY KEY AUTO_INCREMENT,
-                student_id INT NOT NULL,
-                incident_date DATE NOT NULL,
-                incident_type ENUM('Positive', 'Negative', 'Neutral') NOT NULL,
-                incident_category VARCHAR(100),
-                description TEXT NOT NULL,
-                action_taken TEXT,
-                recorded_by VARCHAR(100),
-                recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                self.cursor.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                self.connection.commit()
+                applied.append(version)
+            
+            return applied
+            
+        except Error as e:
+            st.error(f"Database setup error: {e}")
+            self.connection.rollback()
+            return None
+        finally:
+            if lock_acquired:
+                self.backend.release_migration_lock(self.cursor)
+            self.close_db()
+    
+    def _migrate_summary_counters(self, cursor):
+        """Add the summary day-count columns to older tables and backfill them"""
+        existing_columns = self.backend.table_columns(cursor, 'monthly_attendance_summary')
+        missing_columns = [c for c in SUMMARY_COUNTERS if c not in existing_columns]
+        
+        if missing_columns:
+            self.backend.add_columns(cursor, 'monthly_attendance_summary',
+                                     [f"{column} INT DEFAULT 0" for column in missing_columns])
+        # A failed backfill leaves the columns behind, so a retry checks the rows as well
+        self._backfill_summary_counters(cursor, force=bool(missing_columns))
+    
+    def _backfill_summary_counters(self, cursor, force=False):
+        """Recompute every month once if any summary row's day counts were never filled in
+        
+        Runs from migrations, so it may only use tables that exist by migration 2.
+        """
+        if not force:
+            cursor.execute(f"""
+                SELECT summary_id FROM monthly_attendance_summary
+                WHERE total_days > 0 AND {' + '.join(SUMMARY_COUNTERS[5:])} = 0
+                LIMIT 1
+            """)
+            if not cursor.fetchall():
+                return
+        
+        # Deltas are only correct on top of exact rows, so recompute every month once
+        cursor.execute("SELECT MIN(attendance_date) AS first_day, MAX(attendance_date) AS last_day FROM daily_attendance")
+        span = cursor.fetchone()
+        if span['first_day'] is None:
+            return
+        month = str(span['first_day'])[:7]
+        last_month = str(span['last_day'])[:7]
+        while month <= last_month:
+            self._run_summary_engine(cursor, month)
+            month = month_bounds(month)[1].strftime("%Y-%m")
+    
+    def _migrate_student_keys(self, cursor):
+        """Merge students sharing an admission number, then add its unique key and the class index
+        
+        Databases whose students table predates the migrations have neither.
+        """
+        cursor.execute("""
+            SELECT admission_number, MIN(student_id) AS student_id FROM students
+            WHERE admission_number IS NOT NULL
+            GROUP BY admission_number
+            HAVING COUNT(*) > 1
+        """)
+        for kept in cursor.fetchall():
+            self._merge_students(cursor, kept['student_id'], kept['admission_number'])
+        
+        indexes = self.backend.table_indexes(cursor, 'students')
+        if (True, ('admission_number',)) not in indexes.values():
+            cursor.execute("CREATE UNIQUE INDEX unique_admission_number ON students (admission_number)")
+        if 'idx_students_class' not in indexes:
+            cursor.execute("CREATE INDEX idx_students_class ON students (form, class_name, last_name, first_name)")
+    
+    def _merge_students(self, cursor, student_id, admission_number):
+        """Move other students' rows with this admission number onto student_id and delete them
+        
+        Where both have attendance for a day, student_id's row is kept.
+        """
+        cursor.execute("SELECT attendance_date FROM daily_attendance WHERE student_id = %s", (student_id,))
+        days = {str(row['attendance_date'])[:10] for row in cursor.fetchall()}
+        cursor.execute("SELECT student_id FROM students WHERE admission_number = %s AND student_id <> %s",
+                       (admission_number, student_id))
+        duplicate_ids = [row['student_id'] for row in cursor.fetchall()]
+        
+        moved_months = set()
+        for duplicate_id in duplicate_ids:
+            cursor.execute("SELECT attendance_id, attendance_date FROM daily_attendance WHERE student_id = %s",
+                           (duplicate_id,))
+            dropped = []
+            for row in cursor.fetchall():
+                day = str(row['attendance_date'])[:10]
+                if day in days:
+                    dropped.append(row['attendance_id'])
+                else:
+                    days.add(day)
+                    moved_months.add(day[:7])
+            if dropped:
+                cursor.execute(f"DELETE FROM daily_attendance WHERE attendance_id IN ({', '.join(['%s'] * len(dropped))})",
+                               dropped)
+            for table in ('daily_attendance', 'student_incidents'):
+                cursor.execute(f"UPDATE {table} SET student_id = %s WHERE student_id = %s", (student_id, duplicate_id))
+            # Summaries are recomputed below or by the next summary run
+            cursor.execute("DELETE FROM monthly_attendance_summary WHERE student_id = %s", (duplicate_id,))
+            cursor.execute("DELETE FROM students WHERE student_id = %s", (duplicate_id,))
+        
+        for month_year in sorted(moved_months):
+            self._run_summary_engine(cursor, month_year)
+    
+    def _migrate_register_targets(self, cursor):
+        """Keep the hand-entered class targets in target_attendance; average_attendance is now computed"""
+        if 'target_attendance' in self.backend.table_columns(cursor, 'class_register'):
+            return
+        self.backend.add_columns(cursor, 'class_register', ["target_attendance DECIMAL(5,2) DEFAULT 95"])
+        cursor.execute("UPDATE class_register SET target_attendance = average_attendance, average_attendance = 0")
+    
+    def _migrate_summary_job_resumes(self, cursor):
+        """Add resumed_at, the time a job was last claimed; its duration is measured from there"""
+        if 'resumed_at' not in self.backend.table_columns(cursor, 'summary_jobs'):
+            self.backend.add_columns(cursor, 'summary_jobs', ["resumed_at DATETIME NULL"])
+    
+    def invalidate_students(self, form=None, class_name=None):
+        """Drop cached classes and rosters after students are added, moved or removed"""
+        if form is not None and class_name is not None:
+            self.cache.invalidate(('classes',), ('roster', form, class_name))
+        else:
+            self.cache.invalidate(('classes',))
+            self.cache.invalidate_prefix('roster')
+    
+    def get_classes(self):
+        """Get all unique classes"""
+        cached = self.cache.get(('classes',))
+        if cached is not None:
+            return cached
+        
+        generation = self.cache.generation
+        if not self.connect_db():
+            return []
+        
+        try:
+            query = """
+                SELECT DISTINCT form, class_name 
+                FROM students 
+                WHERE form IS NOT NULL AND class_name IS NOT NULL
+                ORDER BY form, class_name
+            """
+            self.cursor.execute(query)
+            classes = self.cursor.fetchall()
+            self.cache.set(('classes',), classes, generation)
+            return classes
+        except Error as e:
+            st.error(f"Error fetching classes: {e}")
+            return []
+        finally:
+            self.close_db()
+    
+    def get_class_students(self, form, class_name):
+        """Get all students in a specific class"""
+        key = ('roster', form, class_name)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        generation = self.cache.generation
+        if not self.connect_db():
+            return []
+        
+        try:
+            query = """
+                SELECT student_id, admission_number, first_name, last_name, 
+                       gender, date_of_birth, guardian_name, guardian_phone,
+                       stream, suburb
+                FROM students 
+                WHERE form = %s AND class_name = %s
+                ORDER BY last_name, first_name
+            """
+            self.cursor.execute(query, (form, class_name))
+            students = self.cursor.fetchall()
+            self.cache.set(key, students, generation)
+            return students
+        except Error as e:
+            st.error(f"Error fetching class students: {e}")
+            return []
+        finally:
+            self.close_db()
+    
+    def save_attendance(self, attendance_data, batch_size=None):
+        """Save daily attendance for multiple students using batched upserts"""
+        try:
+            return self.apply_attendance(attendance_data, batch_size)
+        except (Error, ValueError) as e:
+            st.error(f"Error saving attendance: {e}")
+            return None
+    
+    def apply_attendance(self, attendance_data, batch_size=None):
+        """Write attendance in one transaction on its own pooled connection
+        
+        Database errors are raised so the queue replayer can tell outages from bad rows.
+        """
+        connection = self.pool.acquire()
+        try:
+            cursor = self._new_cursor(connection, dictionary=True)
+            try:
+                connection.start_transaction()
+                result, term_deltas = self._write_attendance(cursor, attendance_data, batch_size)
+                connection.commit()
                 
-                FOREIGN KEY (student_id) REFERENCES students(student_id)
+                # Term and year rows are re-rolled after the save commits, so its row locks
+                # are not held through the rollup queries
+                try:
+                    connection.start_transaction()
+                    self._apply_term_deltas(cursor, term_deltas)
+                    connection.commit()
+                except Error:
+                    # The attendance is saved; the next summary run rebuilds these rollups
+                    logger.exception("Term rollups not updated after saving attendance")
+            finally:
+                cursor.close()
+        finally:
+            # Rolls back a failed write
+            self.pool.release(connection)
+        
+        self.history_cache.invalidate(*{('history', row['student_id']) for row in attendance_data})
+        # Class averages on the registers follow the term rollups
+        self.cache.invalidate_prefix('register')
+        return result
+    
+    def _write_attendance(self, cursor, attendance_data, batch_size=None):
+        """Upsert attendance rows in chunks
+        
+        Returns the inserted and updated counts, and the term deltas for _apply_term_deltas.
+        """
+        batch_size = batch_size or ATTENDANCE_BATCH_SIZE
+        
+        # Queue replays carry ISO date strings and the UI date objects; one form keeps a
+        # repeated (student, date) down to a single row
+        attendance_data = [
+            {**row, 'attendance_date': date.fromisoformat(str(row['attendance_date'])[:10])}
+            for row in attendance_data
+        ]
+        
+        # Archived academic years are read-only
+        days = sorted({str(row['attendance_date'])[:10] for row in attendance_data})
+        if days:
+            cursor.execute(
+                "SELECT academic_year, start_date, end_date FROM attendance_archives WHERE start_date <= %s AND end_date > %s",
+                (days[-1], days[0])
             )
-            '''
-            self.cursor.execute(create_incidents_table)
-            
-            # Create class_register table (static register data)
-            create_register_table = '''
-            CREATE TABLE IF NOT EXISTS class_register (
-                register_id INT PRIMARY KEY AUTO_INCREMENT,
-                form INT NOT NULL,
-                class_name VARCHAR(50) NOT NULL,
-                academic_year VARCHAR(9) NOT NULL, -- Format: YYYY-YYYY
-                term INT NOT NULL,
-                
-                -- Register details
-                total_students INT DEFAULT 0,
-                class_teacher VARCHAR(100),
-                class_prefect VARCHAR(100),
-                assistant_prefect VARCHAR(100),
-                
-                -- Class performance
-                average_attendance DECIMAL(5,2) DEFAULT 0,
-                top_performer VARCHAR(100),
-                most_improved VARCHAR(100),
-                
-                -- Notes
-                class_goals TEXT,
-                special_notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            for archive in cursor.fetchall():
+                for day in days:
+                    if str(archive['start_date'])[:10] <= day < str(archive['end_date'])[:10]:
+                        raise ValueError(f"Attendance for {day} belongs to the archived academic year "
+                                         f"{archive['academic_year']} and can no longer be changed")
+        
+        # Last submission wins for a repeated (student, date); rows are written in
+        # student order so concurrent class submissions lock rows in the same order
+        rows = {}
+        for student_data in attendance_data:
+            rows[(student_data['student_id'], student_data['attendance_date'])] = student_data
+        ordered_rows = [rows[key] for key in sorted(rows)]
+        
+        inserted_count = 0
+        updated_count = 0
+        summary_deltas = {}     # (student_id, month_year) -> (attendance row, counter changes)
+        class_day_deltas = {}   # (attendance_date, form, class_name) -> counter changes
+        
+        for start in range(0, len(ordered_rows), batch_size):
+            batch = ordered_rows[start:start + batch_size]
+            
+            # Lock the rows that already exist so the insert/update split is exact
+            key_params = []
+            for student_data in batch:
+                key_params += [student_data['student_id'], student_data['attendance_date']]
+            query = f"""
+                SELECT student_id, attendance_date, form, class_name, morning_status, afternoon_status,
+                       completed_homework, uniform_proper, books_brought, participation_level
+                FROM daily_attendance
+                WHERE {self.backend.row_in(('student_id', 'attendance_date'), len(batch))}
+                ORDER BY student_id, attendance_date
+                {self.backend.for_update}
+            """
+            cursor.execute(query, key_params)
+            existing_rows = {
+                (row['student_id'], str(row['attendance_date'])[:10]): row
+                for row in cursor.fetchall()
+            }
+            existing_count = len(existing_rows)
+            
+            # Summary change for each (student, month): new row's counts minus the old row's
+            for student_data in batch:
+                attendance_day = str(student_data['attendance_date'])[:10]
+                summary_key = (student_data['student_id'], attendance_day[:7])
+                old_row = existing_rows.get((student_data['student_id'], attendance_day))
+                change = summary_counts(student_data)
+                if old_row:
+                    change = tuple(new - old for new, old in zip(change, summary_counts(old_row)))
+                if summary_key in summary_deltas:
+                    change = tuple(a + b for a, b in zip(summary_deltas[summary_key][1], change))
+                summary_deltas[summary_key] = (student_data, change)
                 
-                UNIQUE KEY unique_class_term (form, class_name, academic_year, term)
+                # An existing row keeps its class, so its class-day is the one that changes
+                class_row = old_row or student_data
+                class_key = (attendance_day, class_row['form'], class_row['class_name'])
+                change = class_day_counts(student_data)
+                if old_row:
+                    change = tuple(new - old for new, old in zip(change, class_day_counts(old_row)))
+                if class_key in class_day_deltas:
+                    change = tuple(a + b for a, b in zip(class_day_deltas[class_key], change))
+                class_day_deltas[class_key] = change
+            
+            query = f"""
+                INSERT INTO daily_attendance 
+                (student_id, admission_number, attendance_date, form, class_name,
+                 morning_status, afternoon_status, completed_homework, uniform_proper,
+                 books_brought, participation_level, teacher_notes, recorded_by)
+                VALUES {', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'] * len(batch))}
+                {self.backend.upsert(('student_id', 'attendance_date'), self.backend.new_values((
+                    'morning_status', 'afternoon_status', 'completed_homework', 'uniform_proper',
+                    'books_brought', 'participation_level', 'teacher_notes', 'recorded_by')))}
+            """
+            params = []
+            for student_data in batch:
+                params += [
+                    student_data['student_id'],
+                    student_data['admission_number'],
+                    student_data['attendance_date'],
+                    student_data['form'],
+                    student_data['class_name'],
+                    student_data['morning_status'],
+                    student_data['afternoon_status'],
+                    student_data['completed_homework'],
+                    student_data['uniform_proper'],
+                    student_data['books_brought'],
+                    student_data['participation_level'],
+                    student_data.get('teacher_notes', ''),
+                    student_data['recorded_by']
+                ]
+            cursor.execute(query, params)
+            
+            inserted_count += len(batch) - existing_count
+            updated_count += existing_count
+        
+        self._apply_summary_deltas(cursor, summary_deltas, batch_size)
+        self._apply_class_day_deltas(cursor, class_day_deltas, batch_size)
+        
+        return {'inserted': inserted_count, 'updated': updated_count}, self._term_deltas(summary_deltas)
+    
+    def _apply_summary_deltas(self, cursor, summary_deltas, batch_size):
+        """Add counter changes to monthly_attendance_summary and refresh the derived columns"""
+        changed_keys = sorted(key for key, (_, change) in summary_deltas.items() if any(change))
+        
+        for start in range(0, len(changed_keys), batch_size):
+            batch = changed_keys[start:start + batch_size]
+            
+            query = f"""
+                INSERT INTO monthly_attendance_summary 
+                (student_id, admission_number, month_year, form, class_name, comments,
+                 {', '.join(SUMMARY_COUNTERS)})
+                VALUES {', '.join(['(' + ', '.join(['%s'] * (6 + len(SUMMARY_COUNTERS))) + ')'] * len(batch))}
+                {self.backend.upsert(('student_id', 'month_year'), {
+                    column: f"{column} + {self.backend.new_value(column)}" for column in SUMMARY_COUNTERS})}
+            """
+            params = []
+            for student_id, month_year in batch:
+                student_data, change = summary_deltas[(student_id, month_year)]
+                params += [student_id, student_data['admission_number'], month_year,
+                           student_data['form'], student_data['class_name'],
+                           f"Monthly summary for {month_year}"]
+                params += list(change)
+            cursor.execute(query, params)
+            
+            # Same rules as the full recomputation, including the participation tie-break
+            query = f"""
+                UPDATE monthly_attendance_summary
+                SET attendance_percentage = days_present * 100.0 / total_days,
+                    homework_completion_rate = homework_days * 100.0 / total_days,
+                    uniform_compliance_rate = uniform_days * 100.0 / total_days,
+                    books_brought_rate = books_days * 100.0 / total_days,
+                    average_participation = CASE {self.backend.greatest}(participation_excellent, participation_good,
+                                                                         participation_fair, participation_poor)
+                        WHEN participation_excellent THEN 'Excellent'
+                        WHEN participation_good THEN 'Good'
+                        WHEN participation_fair THEN 'Fair'
+                        ELSE 'Poor'
+                    END
+                WHERE total_days > 0
+                AND {self.backend.row_in(('student_id', 'month_year'), len(batch))}
+            """
+            cursor.execute(query, [value for key in batch for value in key])
+    
+    def _apply_class_day_deltas(self, cursor, class_day_deltas, batch_size):
+        """Add counter changes to class_daily_stats"""
+        changed_keys = sorted(key for key, change in class_day_deltas.items() if any(change))
+        
+        for start in range(0, len(changed_keys), batch_size):
+            batch = changed_keys[start:start + batch_size]
+            
+            query = f"""
+                INSERT INTO class_daily_stats
+                (attendance_date, form, class_name, {', '.join(CLASS_DAY_COUNTERS)})
+                VALUES {', '.join(['(' + ', '.join(['%s'] * (3 + len(CLASS_DAY_COUNTERS))) + ')'] * len(batch))}
+                {self.backend.upsert(('attendance_date', 'form', 'class_name'), {
+                    column: f"{column} + {self.backend.new_value(column)}" for column in CLASS_DAY_COUNTERS})}
+            """
+            params = []
+            for key in batch:
+                params += list(key) + list(class_day_deltas[key])
+            cursor.execute(query, params)
+    
+    def rebuild_class_daily_stats(self, start_date=None, end_date=None):
+        """Recompute class_daily_stats from daily_attendance between two dates (inclusive)
+        
+        Without dates every day is rebuilt. Returns the class-days written, or None on error.
+        """
+        if not self.connect_db():
+            return None
+        
+        try:
+            self.connection.start_transaction()
+            written = self._rebuild_class_daily_stats(self.cursor, start_date, end_date)
+            self.connection.commit()
+            return written
+        except Error as e:
+            st.error(f"Error rebuilding class statistics: {e}")
+            self.connection.rollback()
+            return None
+        finally:
+            self.close_db()
+    
+    def _rebuild_class_daily_stats(self, cursor, start_date=None, end_date=None):
+        # Archived years are no longer in daily_attendance, so their rows are kept as they are
+        cursor.execute("SELECT start_date, end_date FROM attendance_archives WHERE status = 'Archived'")
+        exclusion, params = self._archive_exclusion('attendance_date', cursor.fetchall())
+        conditions = "1=1" + exclusion
+        if start_date:
+            conditions += " AND attendance_date >= %s"
+            params.append(start_date)
+        if end_date:
+            conditions += " AND attendance_date <= %s"
+            params.append(end_date)
+        
+        cursor.execute(f"DELETE FROM class_daily_stats WHERE {conditions}", params)
+        cursor.execute(f"""
+            INSERT INTO class_daily_stats
+            (attendance_date, form, class_name, {', '.join(CLASS_DAY_COUNTERS)})
+            SELECT attendance_date, form, class_name,
+                   COUNT(*),
+                   SUM(CASE WHEN morning_status = 'Present' OR afternoon_status = 'Present' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN morning_status = 'Absent' AND afternoon_status = 'Absent' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN morning_status = 'Late' OR afternoon_status = 'Late' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN morning_status = 'Excused' OR afternoon_status = 'Excused' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN morning_status = 'Present' AND afternoon_status = 'Present' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN morning_status = 'Present' AND afternoon_status = 'Present' THEN 0
+                            WHEN morning_status = 'Absent' AND afternoon_status = 'Absent' THEN 0
+                            WHEN morning_status = 'Late' OR afternoon_status = 'Late' THEN 0
+                            ELSE 1 END),
+                   SUM(CASE WHEN completed_homework THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN uniform_proper THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN books_brought THEN 1 ELSE 0 END)
+            FROM daily_attendance
+            WHERE {conditions}
+            GROUP BY attendance_date, form, class_name
+        """, params)
+        return max(cursor.rowcount, 0)
+    
+    def get_class_daily_stats(self, start_date, end_date, form=None, class_name=None, as_frame=False):
+        """Per-class day counts from the class_daily_stats rollup over a date range (inclusive)"""
+        if not self.connect_db():
+            return pd.DataFrame() if as_frame else []
+        
+        try:
+            query = """
+                SELECT * FROM class_daily_stats
+                WHERE attendance_date >= %s AND attendance_date <= %s
+            """
+            params = [start_date, end_date]
+            
+            if form:
+                query += " AND form = %s"
+                params.append(form)
+            
+            if class_name:
+                query += " AND class_name = %s"
+                params.append(class_name)
+            
+            query += " ORDER BY attendance_date, form, class_name"
+            
+            if as_frame:
+                return self._fetch_frame(query, params)
+            
+            self.cursor.execute(query, params)
+            return self.cursor.fetchall()
+        except Error as e:
+            st.error(f"Error fetching class statistics: {e}")
+            return pd.DataFrame() if as_frame else []
+        finally:
+            self.close_db()
+    
+    def get_todays_attendance(self, form=None, class_name=None, date_filter=None,
+                              key_by_student=False, as_frame=False):
+        """Get today's attendance records
+        
+        key_by_student returns {student_id: record}; as_frame returns a DataFrame.
+        """
+        if date_filter is None:
+            date_filter = date.today()
+        
+        archives = self._archives_overlapping(date_filter, date_filter)
+        if archives:
+            records = self._with_student_names(
+                self._archived_attendance(archives, date_filter, date_filter, form=form, class_name=class_name),
+                ('first_name', 'last_name', 'gender')
             )
-            '''
-            self.cursor.execute(create_register_table)
+            if records is None:
+                return pd.DataFrame() if as_frame else {} if key_by_student else []
+            records.sort(key=lambda record: (record['last_name'], record['first_name']))
+            if as_frame:
+                return self._records_frame(records)
+            if key_by_student:
+                return {record['student_id']: record for record in records}
+            return records
+        
+        if not self.connect_db():
+            return pd.DataFrame() if as_frame else {} if key_by_student else []
+        
+        try:
+            query = """
+                SELECT da.*, s.first_name, s.last_name, s.gender
+                FROM daily_attendance da
+                JOIN students s ON da.student_id = s.student_id
+                WHERE da.attendance_date = %s
+            """
+            params = [date_filter]
+            
+            if form:
+                query += " AND da.form = %s"
+                params.append(form)
+            
+            if class_name:
+                query += " AND da.class_name = %s"
+                params.append(class_name)
+            
+            query += " ORDER BY s.last_name, s.first_name"
+            
+            if as_frame:
+                return self._fetch_frame(query, params)
+            
+            self.cursor.execute(query, params)
+            records = self.cursor.fetchall()
+            if key_by_student:
+                return {record['student_id']: record for record in records}
+            return records
+        except Error as e:
+            st.error(f"Error fetching attendance: {e}")
+            return pd.DataFrame() if as_frame else {} if key_by_student else []
+        finally:
+            self.close_db()
+    
+    def get_attendance_range_summary(self, start_date, end_date, form=None, class_name=None):
+        """Per-student day counts over a date range (inclusive), in one grouped query"""
+        if not self.connect_db():
+            return []
+        
+        try:
+            query = """
+                SELECT da.form, da.class_name, da.student_id,
+                       s.admission_number, s.first_name, s.last_name,
+                       COUNT(*) AS days_recorded,
+                       SUM(CASE WHEN da.morning_status = 'Present' OR da.afternoon_status = 'Present' THEN 1 ELSE 0 END) AS days_present,
+                       SUM(CASE WHEN da.morning_status = 'Absent' AND da.afternoon_status = 'Absent' THEN 1 ELSE 0 END) AS days_absent,
+                       SUM(CASE WHEN da.morning_status = 'Late' OR da.afternoon_status = 'Late' THEN 1 ELSE 0 END) AS days_late,
+                       SUM(CASE WHEN da.morning_status = 'Excused' OR da.afternoon_status = 'Excused' THEN 1 ELSE 0 END) AS days_excused
+                FROM daily_attendance da
+                JOIN students s ON da.student_id = s.student_id
+                WHERE da.attendance_date >= %s AND da.attendance_date <= %s
+            """
+            params = [start_date, end_date]
+            
+            # Archived years are counted from their files below
+            archives = self._archives_overlapping(start_date, end_date)
+            exclusion, exclusion_params = self._archive_exclusion('da.attendance_date', archives)
+            query += exclusion
+            params += exclusion_params
+            
+            if form:
+                query += " AND da.form = %s"
+                params.append(form)
+            
+            if class_name:
+                query += " AND da.class_name = %s"
+                params.append(class_name)
+            
+            query += """
+                GROUP BY da.form, da.class_name, da.student_id,
+                         s.admission_number, s.first_name, s.last_name
+                ORDER BY da.form, da.class_name, s.last_name, s.first_name
+            """
+            
+            self.cursor.execute(query, params)
+            rows = self.cursor.fetchall()
+            if archives:
+                rows = self._add_archived_counts(rows, archives, start_date, end_date, form, class_name)
+            return rows
+        except Error as e:
+            st.error(f"Error fetching attendance range: {e}")
+            return []
+        finally:
+            self.close_db()
+    
+    def get_attendance_range(self, start_date, end_date, form=None, class_name=None):
+        """Daily statuses over a date range (inclusive), one row per student per day"""
+        if not self.connect_db():
+            return []
+        
+        try:
+            query = """
+                SELECT student_id, attendance_date, morning_status, afternoon_status
+                FROM daily_attendance
+                WHERE attendance_date >= %s AND attendance_date <= %s
+            """
+            params = [start_date, end_date]
+            
+            archives = self._archives_overlapping(start_date, end_date)
+            exclusion, exclusion_params = self._archive_exclusion('attendance_date', archives)
+            query += exclusion
+            params += exclusion_params
+            
+            if form:
+                query += " AND form = %s"
+                params.append(form)
+            
+            if class_name:
+                query += " AND class_name = %s"
+                params.append(class_name)
+            
+            self.cursor.execute(query, params)
+            rows = self.cursor.fetchall()
+            for record in self._archived_attendance(archives, start_date, end_date, form=form, class_name=class_name):
+                rows.append({column: record[column] for column in
+                             ('student_id', 'attendance_date', 'morning_status', 'afternoon_status')})
+            return rows
+        except Error as e:
+            st.error(f"Error fetching attendance range: {e}")
+            return []
+        finally:
+            self.close_db()
+    
+    def save_class_register(self, register_data):
+        """Save class register information"""
+        if not self.connect_db():
+            return False
+        
+        try:
+            query = f"""
+                INSERT INTO class_register 
+                (form, class_name, academic_year, term, total_students,
+                 class_teacher, class_prefect, assistant_prefect,
+                 target_attendance, top_performer, most_improved,
+                 class_goals, special_notes)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                {self.backend.upsert(('form', 'class_name', 'academic_year', 'term'), self.backend.new_values((
+                    'total_students', 'class_teacher', 'class_prefect', 'assistant_prefect',
+                    'target_attendance', 'top_performer', 'most_improved', 'class_goals',
+                    'special_notes')))}
+            """
+            
+            self.cursor.execute(query, (
+                register_data['form'],
+                register_data['class_name'],
+                register_data['academic_year'],
+                register_data['term'],
+                register_data['total_students'],
+                register_data['class_teacher'],
+                register_data['class_prefect'],
+                register_data['assistant_prefect'],
+                register_data.get('target_attendance', 95),
+                register_data.get('top_performer', ''),
+                register_data.get('most_improved', ''),
+                register_data.get('class_goals', ''),
+                register_data.get('special_notes', '')
+            ))
+            self._sync_register_averages(self.cursor, register_data['academic_year'], register_data['term'])
+            
+            self.connection.commit()
+            self.cache.invalidate(('register', register_data['form'], register_data['class_name'],
+                                   register_data['academic_year'], register_data['term']))
+            return True
+            
+        except Error as e:
+            st.error(f"Error saving register: {e}")
+            self.connection.rollback()
+            return False
+        finally:
+            self.close_db()
+    
+    def get_class_register(self, form, class_name, academic_year, term):
+        """Get class register information"""
+        key = ('register', form, class_name, academic_year, term)
+        cached = self.cache.get(key, _MISSING)
+        if cached is not _MISSING:
+            return cached
+        
+        generation = self.cache.generation
+        if not self.connect_db():
+            return None
+        
+        try:
+            query = """
+                SELECT * FROM class_register 
+                WHERE form = %s AND class_name = %s 
+                AND academic_year = %s AND term = %s
+            """
+            self.cursor.execute(query, (form, class_name, academic_year, term))
+            class_register = self.cursor.fetchone()
+            self.cache.set(key, class_register, generation)
+            return class_register
+        except Error as e:
+            st.error(f"Error fetching register: {e}")
+            return None
+        finally:
+            self.close_db()
+    
+    def save_incident(self, incident_data):
+        """Save student incident"""
+        if not self.connect_db():
+            return False
+        
+        try:
+            query = """
+                INSERT INTO student_incidents 
+                (student_id, incident_date, incident_type, incident_category,
+                 description, action_taken, recorded_by)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """
+            
+            self.cursor.execute(query, (
+                incident_data['student_id'],
+                incident_data['incident_date'],
+                incident_data['incident_type'],
+                incident_data.get('incident_category', ''),
+                incident_data['description'],
+                incident_data.get('action_taken', ''),
+                incident_data['recorded_by']
+            ))
+            
+            self.connection.commit()
+            self.history_cache.invalidate(('history', incident_data['student_id']))
+            return True
+            
+        except Error as e:
+            st.error(f"Error saving incident: {e}")
+            self.connection.rollback()
+            return False
+        finally:
+            self.close_db()
+    
+    def _fetch_all(self, query, params=()):
+        """Run one read on its own pooled connection (safe to call from worker threads)"""
+        connection = self.pool.acquire()
+        try:
+            cursor = self._new_cursor(connection, dictionary=True)
+            try:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+        finally:
+            self.pool.release(connection)
+    
+    def _fetch_frame(self, query, params=()):
+        """Run a query on a tuple cursor and return the result as a DataFrame
+        
+        ENUM columns become categoricals and DECIMAL columns become floats.
+        """
+        cursor = self._new_cursor(self.connection)
+        try:
+            cursor.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        
+        frame = pd.DataFrame.from_records(rows, columns=columns)
+        
+        for column, categories in ENUM_CATEGORIES.items():
+            if column in frame.columns:
+                frame[column] = pd.Categorical(frame[column], categories=categories)
+        
+        # A column's first row may be NULL, so look at its first value
+        for column in columns:
+            values = frame[column]
+            if values.dtype == object:
+                first = values.first_valid_index()
+                if first is not None and isinstance(values[first], Decimal):
+                    frame[column] = values.astype(float)
+        
+        return frame
+    
+    def get_student_history(self, student_id):
+        """Attendance, incidents and monthly summaries for one student, newest first"""
+        key = ('history', student_id)
+        cached = self.history_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        generation = self.history_cache.generation
+        queries = {
+            'attendance': """
+                SELECT * FROM daily_attendance
+                WHERE student_id = %s
+                ORDER BY attendance_date DESC
+            """,
+            'incidents': """
+                SELECT * FROM student_incidents
+                WHERE student_id = %s
+                ORDER BY incident_date DESC, incident_id DESC
+            """,
+            'summaries': """
+                SELECT * FROM monthly_attendance_summary
+                WHERE student_id = %s
+                ORDER BY month_year DESC
+            """
+        }
+        
+        # The three reads are independent, so run them side by side
+        executor = get_query_executor()
+        futures = {name: executor.submit(self._fetch_all, query, (student_id,))
+                   for name, query in queries.items()}
+        try:
+            history = {name: future.result() for name, future in futures.items()}
+        except Error as e:
+            st.error(f"Error fetching student history: {e}")
+            return None
+        
+        archives = [archive for archive in self.get_archives() if archive['status'] == 'Archived']
+        if archives:
+            history['attendance'] += self._archived_attendance(archives, student_id=student_id)
+            history['attendance'].sort(key=lambda record: record['attendance_date'], reverse=True)
+        
+        self.history_cache.set(key, history, generation)
+        return history
+    
+    def _incident_filters(self, student_id=None, form=None, class_name=None,
+                          incident_type=None, date_from=None, date_to=None):
+        """WHERE clause and parameters shared by the incident queries"""
+        conditions = ["1=1"]
+        params = []
+        
+        if student_id:
+            conditions.append("si.student_id = %s")
+            params.append(student_id)
+        
+        if form:
+            conditions.append("s.form = %s")
+            params.append(form)
+        
+        if class_name:
+            conditions.append("s.class_name = %s")
+            params.append(class_name)
+        
+        if incident_type:
+            conditions.append("si.incident_type = %s")
+            params.append(incident_type)
+        
+        if date_from:
+            conditions.append("si.incident_date >= %s")
+            params.append(date_from)
+        
+        if date_to:
+            conditions.append("si.incident_date <= %s")
+            params.append(date_to)
+        
+        return " AND ".join(conditions), params
+    
+    def get_student_incidents(self, student_id=None, form=None, class_name=None,
+                              incident_type=None, date_from=None, date_to=None,
+                              after=None, limit=None, as_frame=False):
+        """Get student incidents, newest first
+        
+        For paging pass limit, and after=(incident_date, incident_id) of the
+        last incident on the previous page. as_frame returns a DataFrame.
+        """
+        if not self.connect_db():
+            return pd.DataFrame() if as_frame else []
+        
+        try:
+            where, params = self._incident_filters(student_id, form, class_name,
+                                                   incident_type, date_from, date_to)
+            query = f"""
+                SELECT si.*, s.first_name, s.last_name, s.admission_number,
+                       s.form, s.class_name
+                FROM student_incidents si
+                JOIN students s ON si.student_id = s.student_id
+                WHERE {where}
+            """
+            
+            if after:
+                query += " AND (si.incident_date < %s OR (si.incident_date = %s AND si.incident_id < %s))"
+                params += [after[0], after[0], after[1]]
+            
+            query += " ORDER BY si.incident_date DESC, si.incident_id DESC"
+            
+            if limit:
+                query += " LIMIT %s"
+                params.append(limit)
+            
+            if as_frame:
+                return self._fetch_frame(query, params)
+            
+            self.cursor.execute(query, params)
+            return self.cursor.fetchall()
+        except Error as e:
+            st.error(f"Error fetching incidents: {e}")
+            return pd.DataFrame() if as_frame else []
+        finally:
+            self.close_db()
+    
+    def count_student_incidents(self, student_id=None, form=None, class_name=None,
+                                incident_type=None, date_from=None, date_to=None):
+        """Count incidents matching the same filters as get_student_incidents"""
+        if not self.connect_db():
+            return 0
+        
+        try:
+            where, params = self._incident_filters(student_id, form, class_name,
+                                                   incident_type, date_from, date_to)
+            query = f"""
+                SELECT COUNT(*) AS total
+                FROM student_incidents si
+                JOIN students s ON si.student_id = s.student_id
+                WHERE {where}
+            """
+            self.cursor.execute(query, params)
+            return self.cursor.fetchone()['total']
+        except Error as e:
+            st.error(f"Error counting incidents: {e}")
+            return 0
+        finally:
+            self.close_db()
+    
+    def export_tables(self, fileobj, tables=None, chunk_size=None):
+        """Stream whole tables into a zip of per-table CSV files; returns rows written per table"""
+        tables = tables or EXPORT_TABLES
+        chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+        
+        if not self.connect_db():
+            return None
+        
+        try:
+            # One snapshot for every table so the files agree with each other
+            self.connection.start_transaction(consistent_snapshot=True, readonly=True)
+            
+            row_counts = {}
+            with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for table in tables:
+                    # Unbuffered tuple cursor: rows stay on the server until fetched
+                    cursor = self._new_cursor(self.connection)
+                    try:
+                        cursor.execute(f"SELECT * FROM {table}")
+                        with archive.open(f"{table}.csv", 'w', force_zip64=True) as member:
+                            text = io.TextIOWrapper(member, encoding='utf-8', newline='')
+                            writer = csv.writer(text)
+                            writer.writerow([column[0] for column in cursor.description])
+                            
+                            row_counts[table] = 0
+                            while True:
+                                rows = cursor.fetchmany(chunk_size)
+                                if not rows:
+                                    break
+                                writer.writerows(rows)
+                                row_counts[table] += len(rows)
+                            
+                            text.flush()
+                            text.detach()
+                    finally:
+                        cursor.close()
+            
+            self.connection.rollback()
+            return row_counts
+            
+        except Error as e:
+            st.error(f"Error exporting data: {e}")
+            return None
+        finally:
+            self.close_db()
+    
+    def import_csv(self, kind, fileobj, rejects=None, progress=None, chunk_rows=None):
+        """Stream a CSV file of students, daily_attendance or student_incidents rows into its table
+        
+        Rows are validated against IMPORT_TABLES and written chunk_rows at a time, one
+        transaction per chunk, so memory does not grow with the file. Rejected rows are counted
+        and the first few listed; when `rejects` (a text file) is given every rejected row is
+        copied there with its line and reason. `progress` is called with the report after each
+        chunk. Returns {'rows', 'imported', 'rejected', 'rejections', 'seconds',
+        'rows_per_second', 'refresh_seconds'}, with 'error' set if the import stopped early,
+        or None if it could not start.
+        """
+        if kind not in IMPORT_TABLES:
+            st.error(f"Unknown import '{kind}', expected one of {', '.join(IMPORT_TABLES)}")
+            return None
+        chunk_rows = chunk_rows or IMPORT_CONFIG['chunk_rows']
+        
+        if isinstance(fileobj, io.TextIOBase):
+            return self._import_rows(kind, fileobj, rejects, progress, chunk_rows)
+        # Binary files (e.g. uploads) are decoded as they are read and left open afterwards
+        text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+        try:
+            return self._import_rows(kind, text, rejects, progress, chunk_rows)
+        finally:
+            text.detach()
+    
+    def _import_rows(self, kind, text, rejects, progress, chunk_rows):
+        spec = IMPORT_TABLES[kind]
+        reader = csv.DictReader(text)
+        header = [name.strip().lower() for name in reader.fieldnames or []]
+        reader.fieldnames = header
+        missing = [column for column, (_, default) in spec['columns'].items()
+                   if default is _REQUIRED and column not in header]
+        if kind != 'students' and 'student_id' not in header and 'admission_number' not in header:
+            missing.append("student_id or admission_number")
+        if missing:
+            st.error(f"The file is missing required columns: {', '.join(missing)}")
+            return None
+        
+        # One entry per student, however long the file
+        students = admissions = archives = None
+        if kind != 'students':
+            try:
+                students = {row['student_id']: row for row in self._fetch_all(
+                    "SELECT student_id, admission_number, form, class_name FROM students")}
+            except Error as e:
+                st.error(f"Error loading students for the import: {e}")
+                return None
+            admissions = {row['admission_number']: student_id for student_id, row in students.items()}
+            archives = self.get_archives() if kind == 'daily_attendance' else []
+        
+        report = {'rows': 0, 'imported': 0, 'rejected': 0, 'rejections': [],
+                  'seconds': 0.0, 'rows_per_second': 0.0, 'refresh_seconds': 0.0}
+        reject_writer = csv.writer(rejects) if rejects is not None else None
+        
+        def reject(line, row, reason):
+            report['rejected'] += 1
+            if len(report['rejections']) < IMPORT_CONFIG['rejections_kept']:
+                report['rejections'].append({'line': line, 'error': reason})
+            if reject_writer:
+                if report['rejected'] == 1:
+                    reject_writer.writerow(header + ['line', 'error'])
+                reject_writer.writerow([row.get(column) for column in header] + [line, reason])
+        
+        columns = tuple(spec['columns'])
+        first_day = last_day = None
+        months = set()
+        started = time.perf_counter()
+        connection = None
+        try:
+            connection = self.pool.acquire()
+            cursor = self._new_cursor(connection)
+            try:
+                chunk = []
+                for row in reader:
+                    report['rows'] += 1
+                    try:
+                        values = self._import_values(kind, row, students, admissions, archives)
+                    except ValueError as e:
+                        reject(reader.line_num, row, str(e))
+                    else:
+                        chunk.append((reader.line_num, row, tuple(values[column] for column in columns)))
+                        if kind == 'daily_attendance':
+                            day = values['attendance_date']
+                            first_day = min(first_day or day, day)
+                            last_day = max(last_day or day, day)
+                            months.add(day.strftime("%Y-%m"))
+                    
+                    if len(chunk) >= chunk_rows:
+                        report['imported'] += self._write_import_chunk(connection, cursor, kind, chunk, reject)
+                        chunk = []
+                        if progress:
+                            progress(report)
+                if chunk:
+                    report['imported'] += self._write_import_chunk(connection, cursor, kind, chunk, reject)
+            finally:
+                cursor.close()
+        except Error as e:
+            report['error'] = str(e)
+            st.error(f"Import stopped after {report['imported']} rows: {e}")
+        finally:
+            if connection is not None:
+                self.pool.release(connection)
+        
+        report['seconds'] = time.perf_counter() - started
+        report['rows_per_second'] = report['rows'] / report['seconds'] if report['seconds'] else 0.0
+        
+        # Rollups and caches are brought up to date once for the whole file
+        started = time.perf_counter()
+        if kind == 'students':
+            self.invalidate_students()
+        else:
+            self.history_cache.invalidate_prefix('history')
+        if first_day is not None:
+            self.rebuild_class_daily_stats(first_day, last_day)
+            self.calculate_monthly_summaries(sorted(months))
+        report['refresh_seconds'] = time.perf_counter() - started
+        if progress:
+            progress(report)
+        return report
+    
+    def _import_values(self, kind, row, students, admissions, archives):
+        """Column values for one import row; raises ValueError naming the first problem"""
+        values = {}
+        for column, (domain, default) in IMPORT_TABLES[kind]['columns'].items():
+            cell = (row.get(column) or "").strip()
+            if not cell:
+                if default is _REQUIRED:
+                    raise ValueError(f"{column} is required")
+                values[column] = default
+                continue
+            try:
+                values[column] = parse_import_value(cell, domain)
+            except ValueError as e:
+                raise ValueError(f"{column} {e}") from None
+        if kind == 'students':
+            return values
+        
+        admission_number = (row.get('admission_number') or "").strip()
+        student_id = values['student_id']
+        if student_id is None:
+            if not admission_number:
+                raise ValueError("student_id or admission_number is required")
+            student_id = admissions.get(admission_number)
+            if student_id is None:
+                raise ValueError(f"no student has admission number {admission_number}")
+        student = students.get(student_id)
+        if student is None:
+            raise ValueError(f"no student has student_id {student_id}")
+        if admission_number and admission_number != student['admission_number']:
+            raise ValueError(f"admission_number {admission_number} is not student {student_id}'s")
+        values['student_id'] = student_id
+        if kind == 'student_incidents':
+            return values
+        
+        values['admission_number'] = student['admission_number']
+        for column in ('form', 'class_name'):
+            if values[column] is None:
+                values[column] = student[column]
+            if values[column] is None:
+                raise ValueError(f"{column} is required for a student without a class")
+        for archive in archives:
+            if archive['start_date'] <= values['attendance_date'] < archive['end_date']:
+                raise ValueError(f"{values['attendance_date']} belongs to the archived academic year "
+                                 f"{archive['academic_year']}")
+        return values
+    
+    def _write_import_chunk(self, connection, cursor, kind, chunk, reject):
+        """Write (line, row, values) import rows in one transaction; returns the rows written
+        
+        If the database refuses the chunk its rows are retried one at a time, so only the
+        rows it refuses are rejected. Connectivity errors are raised.
+        """
+        if kind == 'students':
+            chunk = self._reject_taken_student_ids(cursor, chunk, reject)
+            if not chunk:
+                return 0
+        
+        try:
+            connection.start_transaction()
+            self._insert_import_rows(cursor, kind, [values for _, _, values in chunk])
+            connection.commit()
+            return len(chunk)
+        except DatabaseError as e:
+            connection.rollback()
+            if is_connectivity_error(e):
+                raise
+        
+        written = 0
+        for line, row, values in chunk:
+            try:
+                connection.start_transaction()
+                self._insert_import_rows(cursor, kind, [values])
+                connection.commit()
+                written += 1
+            except DatabaseError as e:
+                connection.rollback()
+                if is_connectivity_error(e):
+                    raise
+                reject(line, row, str(e))
+        return written
+    
+    def _reject_taken_student_ids(self, cursor, chunk, reject):
+        """Student import rows whose student_id is unused or already theirs; the others are rejected
+        
+        The upsert is keyed on admission_number, but MySQL also applies it when the
+        student_id primary key clashes, which would overwrite that other student.
+        """
+        columns = tuple(IMPORT_TABLES['students']['columns'])
+        student_ids = sorted({dict(zip(columns, values))['student_id'] for _, _, values in chunk} - {None})
+        owners = {}
+        if student_ids:
+            cursor.execute(f"SELECT student_id, admission_number FROM students "
+                           f"WHERE student_id IN ({', '.join(['%s'] * len(student_ids))})", student_ids)
+            owners = dict(cursor.fetchall())
+        
+        kept = []
+        for line, row, values in chunk:
+            student = dict(zip(columns, values))
+            if student['student_id'] is not None:
+                # Earlier rows of the chunk claim their ids as well
+                owner = owners.setdefault(student['student_id'], student['admission_number'])
+                if owner != student['admission_number']:
+                    reject(line, row, f"student_id {student['student_id']} belongs to admission number {owner}")
+                    continue
+            kept.append((line, row, values))
+        return kept
+    
+    def _insert_import_rows(self, cursor, kind, rows):
+        key = IMPORT_TABLES[kind]['key']
+        columns = tuple(IMPORT_TABLES[kind]['columns'])
+        if self.backend.bulk_load and kind != 'students':
+            # REPLACE would delete students that attendance and incidents still reference
+            self.backend.load_rows(cursor, kind, columns, rows, replace=key is not None)
+        else:
+            # Students keep their student_id when their details are re-imported
+            update_columns = [column for column in columns
+                              if key and column not in key and column != 'student_id']
+            self.backend.insert_rows(cursor, kind, columns, rows, key, update_columns)
+    
+    def calculate_monthly_summary(self, month_year=None, workers=None):
+        """Calculate monthly attendance summary for every student, several classes at a time"""
+        if month_year is None:
+            month_year = datetime.now().strftime("%Y-%m")
+        
+        result = self.calculate_monthly_summaries([month_year], workers)
+        if result is None:
+            return 0
+        
+        for failure in result['failed']:
+            st.error(f"Error calculating summary for Form {failure['form']} {failure['class_name']}: "
+                     f"{failure['error']}")
+        return result['updated']
+    
+    def calculate_monthly_summaries(self, months, workers=None):
+        """Recompute several months, running each (month, class) partition on its own connection
+        
+        Every partition commits separately, so a failing class leaves the rest in place.
+        Returns {'updated', 'partitions', 'failed'}, or None if nothing could start.
+        """
+        for month_year in months:
+            try:
+                month_bounds(month_year)
+            except ValueError:
+                st.error(f"Invalid month '{month_year}', expected YYYY-MM")
+                return None
+        
+        if not self.connect_db():
+            return None
+        
+        try:
+            partitions = self._summary_partitions(self.cursor)
+        except Error as e:
+            st.error(f"Error calculating summary: {e}")
+            return None
+        finally:
+            self.close_db()
+        
+        work = [(month_year, partition['form'], partition['class_name'], partition['students'])
+                for month_year in months for partition in partitions]
+        updated, failed = self._run_summary_partitions(work, workers)
+        
+        try:
+            self._refresh_term_summaries(months)
+        except Error as e:
+            st.error(f"Error updating term summaries: {e}")
+        return {'updated': updated, 'partitions': len(work), 'failed': failed}
+    
+    def _summary_partitions(self, cursor):
+        """Classes a summary run is split into, with their roster sizes"""
+        cursor.execute("""
+            SELECT form, class_name, COUNT(*) AS students
+            FROM students
+            WHERE form IS NOT NULL AND class_name IS NOT NULL
+            GROUP BY form, class_name
+            ORDER BY form, class_name
+        """)
+        return cursor.fetchall()
+    
+    def _run_summary_partitions(self, work, workers=None, job_id=None):
+        """Run (month_year, form, class_name, students) partitions on a bounded thread pool
+        
+        Returns the number of students updated and a list of failed partitions.
+        """
+        # Leave a connection free for the sessions still using the app
+        workers = max(1, min(workers or SUMMARY_WORKERS, self.pool.pool_size - 1, len(work),
+                             self.backend.max_writers or len(work)))
+        updated = 0
+        failed = []
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="register-summary") as executor:
+            futures = {
+                executor.submit(self._summarise_partition, month_year, form, class_name, job_id, students):
+                    (month_year, form, class_name)
+                for month_year, form, class_name, students in work
+            }
+            for future in as_completed(futures):
+                month_year, form, class_name = futures[future]
+                try:
+                    updated += future.result()
+                except Error as e:
+                    failed.append({'month_year': month_year, 'form': form,
+                                   'class_name': class_name, 'error': str(e)})
+        
+        if len(failed) < len(work):
+            self.history_cache.invalidate_prefix('history')
+        return updated, failed
+    
+    def _summarise_partition(self, month_year, form, class_name, job_id=None, students=0):
+        """Recompute and commit one class's month on its own pooled connection
+        
+        With a job_id, the class's checkpoint and the job's progress commit with it.
+        """
+        connection = self.pool.acquire()
+        try:
+            cursor = self._new_cursor(connection, dictionary=True)
+            try:
+                # Archived months keep the summaries they were archived with
+                updated = 0
+                if not self._month_archived(cursor, month_year):
+                    updated = self._run_summary_engine(cursor, month_year, form, class_name)
+                if job_id is not None:
+                    cursor.execute("""
+                        INSERT INTO summary_job_partitions (job_id, form, class_name, students, students_updated)
+                        VALUES (%s, %s, %s, %s, %s)
+                    """, (job_id, form, class_name, students, updated))
+                    cursor.execute("""
+                        UPDATE summary_jobs
+                        SET students_processed = students_processed + %s,
+                            classes_processed = classes_processed + 1,
+                            students_updated = students_updated + %s,
+                            heartbeat_at = %s
+                        WHERE job_id = %s
+                    """, (students, updated, datetime.now(), job_id))
+                connection.commit()
+                return updated
+            finally:
+                cursor.close()
+        finally:
+            # Rolls back an uncommitted partition
+            self.pool.release(connection)
+    
+    def submit_summary_job(self, month_year=None, requested_by=None):
+        """Queue a monthly summary job, or return the queued/running job for that month"""
+        if month_year is None:
+            month_year = datetime.now().strftime("%Y-%m")
+        try:
+            month_bounds(month_year)
+        except ValueError:
+            st.error(f"Invalid month '{month_year}', expected YYYY-MM")
+            return None
+        
+        if not self.connect_db():
+            return None
+        
+        # A locking read that finds no job takes only a gap lock, which does not stop two
+        # submitters from both inserting one, so submits for a month take a named lock first
+        lock_name = f"register_summary_job_{month_year}"
+        lock_acquired = False
+        try:
+            self.connection.start_transaction()
+            lock_acquired = self.backend.acquire_lock(self.cursor, lock_name)
+            if not lock_acquired:
+                st.error(f"Timed out waiting for another summary request for {month_year}")
+                self.connection.rollback()
+                return None
+            # A locking read sees the jobs committed by the previous holder of the lock
+            self.cursor.execute(f"""
+                SELECT job_id, status FROM summary_jobs
+                WHERE month_year = %s AND status IN ('Queued', 'Running', 'Failed')
+                ORDER BY job_id DESC
+                {self.backend.for_update}
+            """, (month_year,))
+            jobs = self.cursor.fetchall()
+            
+            active = [job for job in jobs if job['status'] in JOB_ACTIVE_STATUSES]
+            if active:
+                job_id = active[0]['job_id']
+            elif jobs:
+                # Resume the latest failed job; its finished classes are kept
+                job_id = jobs[0]['job_id']
+                self.cursor.execute("""
+                    UPDATE summary_jobs
+                    SET status = 'Queued', error = NULL, finished_at = NULL
+                    WHERE job_id = %s
+                """, (job_id,))
+            else:
+                self.cursor.execute(
+                    "INSERT INTO summary_jobs (month_year, requested_by) VALUES (%s, %s)",
+                    (month_year, requested_by)
+                )
+                job_id = self.cursor.lastrowid
+            
+            self.connection.commit()
+            return job_id
+        except Error as e:
+            st.error(f"Error queuing summary job: {e}")
+            self.connection.rollback()
+            return None
+        finally:
+            if lock_acquired:
+                self.backend.release_lock(self.cursor, lock_name)
+            self.close_db()
+    
+    def claim_summary_job(self):
+        """Mark the oldest queued (or abandoned) job as running and return its id"""
+        if not self.connect_db():
+            return None
+        
+        try:
+            now = datetime.now()
+            stale = now - timedelta(seconds=JOB_CONFIG['stale_after'])
+            self.connection.start_transaction()
+            self.cursor.execute(f"""
+                SELECT job_id FROM summary_jobs
+                WHERE status = 'Queued' OR (status = 'Running' AND heartbeat_at < %s)
+                ORDER BY job_id
+                LIMIT 1
+                {self.backend.for_update_skip_locked}
+            """, (stale,))
+            job = self.cursor.fetchone()
+            if job is None:
+                self.connection.commit()
+                return None
+            
+            self.cursor.execute("""
+                UPDATE summary_jobs
+                SET status = 'Running', started_at = COALESCE(started_at, %s), resumed_at = %s,
+                    heartbeat_at = %s
+                WHERE job_id = %s
+            """, (now, now, now, job['job_id']))
+            self.connection.commit()
+            return job['job_id']
+        except Error:
+            self.connection.rollback()
+            return None
+        finally:
+            self.close_db()
+    
+    def run_summary_job(self, job_id):
+        """Recompute a job's month, several classes at a time, checkpointing each finished class"""
+        if not self.connect_db():
+            return False
+        
+        try:
+            self.cursor.execute("SELECT * FROM summary_jobs WHERE job_id = %s", (job_id,))
+            job = self.cursor.fetchone()
+            if job is None:
+                return False
+            month_bounds(job['month_year'])
+            
+            partitions = self._summary_partitions(self.cursor)
+            self.cursor.execute(
+                "SELECT form, class_name, students_updated FROM summary_job_partitions WHERE job_id = %s",
+                (job_id,)
+            )
+            done = {(row['form'], row['class_name']): row['students_updated']
+                    for row in self.cursor.fetchall()}
+            
+            # Restart the counters from the checkpoints; workers add to them as classes finish
+            self.cursor.execute("""
+                UPDATE summary_jobs
+                SET students_total = %s, classes_total = %s,
+                    students_processed = %s, classes_processed = %s,
+                    students_updated = %s, heartbeat_at = %s
+                WHERE job_id = %s
+            """, (sum(p['students'] for p in partitions), len(partitions),
+                  sum(p['students'] for p in partitions if (p['form'], p['class_name']) in done),
+                  len(done), sum(done.values()), datetime.now(), job_id))
+            self.connection.commit()
             
+            work = [(job['month_year'], p['form'], p['class_name'], p['students'])
+                    for p in partitions if (p['form'], p['class_name']) not in done]
+            _, failed = self._run_summary_partitions(work, job_id=job_id)
+            if not failed:
+                self._refresh_term_summaries([job['month_year']])
+            
+            finished = datetime.now()
+            if failed:
+                self.cursor.execute("""
+                    UPDATE summary_jobs
+                    SET status = 'Failed', error = %s, finished_at = %s
+                    WHERE job_id = %s
+                """, ("; ".join(f"Form {f['form']} {f['class_name']}: {f['error']}" for f in failed),
+                      finished, job_id))
+            else:
+                self.cursor.execute("""
+                    UPDATE summary_jobs
+                    SET status = 'Completed', finished_at = %s, duration_seconds = %s
+                    WHERE job_id = %s
+                """, (finished, (finished - job['resumed_at']).total_seconds(), job_id))
             self.connection.commit()
-            st.success("✅ Database tables created successfully!")
-            return True
+            return not failed
             
-        except Error as e:
-            st.error(f"Database setup error: {e}")
+        except (Error, ValueError) as e:
+            self.connection.rollback()
+            try:
+                self.cursor.execute("""
+                    UPDATE summary_jobs
+                    SET status = 'Failed', error = %s, finished_at = %s
+                    WHERE job_id = %s
+                """, (str(e), datetime.now(), job_id))
+                self.connection.commit()
+            except Error:
+                pass
             return False
         finally:
             self.close_db()
     
-    def get_classes(self):
-        """Get all unique classes"""
+    def fail_summary_job(self, job_id, error):
+        """Mark a job failed; used when running it raised unexpectedly"""
         if not self.connect_db():
-            return []
+            return False
         
         try:
-            query = """
-                SELECT DISTINCT form, class_name 
-                FROM students 
-                WHERE form IS NOT NULL AND class_name IS NOT NULL
-                ORDER BY form, class_name
-            """
-            self.cursor.execute(query)
-            return self.cursor.fetchall()
-        except Error as e:
-            st.error(f"Error fetching classes: {e}")
-            return []
+            self.cursor.execute("""
+                UPDATE summary_jobs
+                SET status = 'Failed', error = %s, finished_at = %s
+                WHERE job_id = %s
+            """, (error, datetime.now(), job_id))
+            self.connection.commit()
+            return True
+        except Error:
+            self.connection.rollback()
+            return False
         finally:
             self.close_db()
     
-    def get_class_students(self, form, class_name):
-        """Get all students in a specific class"""
+    def get_summary_job(self, job_id):
+        """Status and progress of one summary job"""
         if not self.connect_db():
-            return []
+            return None
         
         try:
-            query = """
-                SELECT student_id, admission_number, first_name, last_name, 
-                       gender, date_of_birth, guardian_name, guardian_phone,
-                       stream, suburb
-                FROM students 
-                WHERE form = %s AND class_name = %s
-                ORDER BY last_name, first_name
-            """
-            self.cursor.execute(query, (form, class_name))
-            return self.cursor.fetchall()
+            self.cursor.execute("SELECT * FROM summary_jobs WHERE job_id = %s", (job_id,))
+            return self.cursor.fetchone()
         except Error as e:
-            st.error(f"Error fetching class students: {e}")
-            return []
+            st.error(f"Error fetching summary job: {e}")
+            return None
         finally:
             self.close_db()
     
-    def save_attendance(self, attendance_data):
-        """Save daily attendance for multiple students"""
+    def get_recent_summary_jobs(self, limit=10):
+        """Most recent summary jobs, newest first"""
         if not self.connect_db():
-            return False
+            return []
         
         try:
-            inserted_count = 0
-            for student_data in attendance_data:
-                query = """
-                    INSERT INTO daily_attendance 
-                    (student_id, admission_number, attendance_date, form, class_name,
-                     morning_status, afternoon_status, completed_homework, uniform_proper,
-                     books_brought, participation_level, teacher_notes, recorded_by)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                    morning_status = VALUES(morning_status),
-                    afternoon_status = VALUES(afternoon_status),
-                    completed_homework = VALUES(completed_homework),
-                    uniform_proper = VALUES(uniform_proper),
-                    books_brought = VALUES(books_brought),
-                    participation_level = VALUES(participation_level),
-                    teacher_notes = VALUES(teacher_notes),
-                    recorded_by = VALUES(recorded_by)
-                """
-                
-                self.cursor.execute(query, (
-                    student_data['student_id'],
-                    student_data['admission_number'],
-                    student_data['attendance_date'],
-                    student_data['form'],
-                    student_data['class_name'],
-                    student_data['morning_status'],
-                    student_data['afternoon_status'],
-                    student_data['completed_homework'],
-                    student_data['uniform_proper'],
-                    student_data['books_brought'],
-                    student_data['participation_level'],
-                    student_data.get('teacher_notes', ''),
-                    student_data['recorded_by']
-                ))
-                
-                if self.cursor.rowcount > 0:
-                    inserted_count += 1
-            
-            self.connection.commit()
-            return inserted_count
-            
+            self.cursor.execute(
+                "SELECT * FROM summary_jobs ORDER BY job_id DESC LIMIT %s",
+                (limit,)
+            )
+            return self.cursor.fetchall()
         except Error as e:
-            st.error(f"Error saving attendance: {e}")
-            self.connection.rollback()
-            return 0
+            st.error(f"Error fetching summary jobs: {e}")
+            return []
         finally:
             self.close_db()
     
-    def get_todays_attendance(self, form=None, class_name=None, date_filter=None):
-        """Get today's attendance records"""
+    def _summary_select(self, month_year, form=None, class_name=None):
+        """SELECT producing full monthly_attendance_summary rows for a month (optionally one class)"""
+        month_start, month_end = month_bounds(month_year)
+        
+        student_filter = "s.form IS NOT NULL"
+        student_params = []
+        if form:
+            student_filter += " AND s.form = %s"
+            student_params.append(form)
+        if class_name:
+            student_filter += " AND s.class_name = %s"
+            student_params.append(class_name)
+        
+        # Only scan the attendance of the students being summarised
+        attendance_filter = "attendance_date >= %s AND attendance_date < %s"
+        attendance_params = [month_start, month_end]
+        if form or class_name:
+            attendance_filter += f" AND student_id IN (SELECT s.student_id FROM students s WHERE {student_filter})"
+            attendance_params += student_params
+        
+        # Most frequent participation level per student; ties go to the better level
+        query = f"""
+            SELECT s.student_id, s.admission_number, %s AS month_year, s.form, s.class_name,
+                   a.total_days, a.days_present, a.days_absent, a.days_late, a.days_excused,
+                   a.days_present * 100.0 / a.total_days AS attendance_percentage,
+                   a.homework_days * 100.0 / a.total_days AS homework_completion_rate,
+                   a.uniform_days * 100.0 / a.total_days AS uniform_compliance_rate,
+                   a.books_days * 100.0 / a.total_days AS books_brought_rate,
+                   COALESCE(p.participation_level, 'Good') AS average_participation,
+                   %s AS comments,
+                   a.homework_days, a.uniform_days, a.books_days,
+                   a.participation_excellent, a.participation_good,
+                   a.participation_fair, a.participation_poor
+            FROM students s
+            JOIN (
+                SELECT 
+                    student_id,
+                    COUNT(*) as total_days,
+                    SUM(CASE WHEN morning_status = 'Present' OR afternoon_status = 'Present' THEN 1 ELSE 0 END) as days_present,
+                    SUM(CASE WHEN morning_status = 'Absent' AND afternoon_status = 'Absent' THEN 1 ELSE 0 END) as days_absent,
+                    SUM(CASE WHEN morning_status = 'Late' OR afternoon_status = 'Late' THEN 1 ELSE 0 END) as days_late,
+                    SUM(CASE WHEN morning_status = 'Excused' OR afternoon_status = 'Excused' THEN 1 ELSE 0 END) as days_excused,
+                    SUM(CASE WHEN completed_homework THEN 1 ELSE 0 END) as homework_days,
+                    SUM(CASE WHEN uniform_proper THEN 1 ELSE 0 END) as uniform_days,
+                    SUM(CASE WHEN books_brought THEN 1 ELSE 0 END) as books_days,
+                    SUM(CASE WHEN participation_level = 'Excellent' THEN 1 ELSE 0 END) as participation_excellent,
+                    SUM(CASE WHEN participation_level = 'Good' THEN 1 ELSE 0 END) as participation_good,
+                    SUM(CASE WHEN participation_level = 'Fair' THEN 1 ELSE 0 END) as participation_fair,
+                    SUM(CASE WHEN participation_level = 'Poor' THEN 1 ELSE 0 END) as participation_poor
+                FROM daily_attendance 
+                WHERE {attendance_filter}
+                GROUP BY student_id
+            ) a ON a.student_id = s.student_id
+            LEFT JOIN (
+                SELECT student_id, participation_level
+                FROM (
+                    SELECT student_id, participation_level,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY student_id
+                               ORDER BY COUNT(*) DESC,
+                                        CASE participation_level
+                                            WHEN 'Excellent' THEN 1 WHEN 'Good' THEN 2
+                                            WHEN 'Fair' THEN 3 ELSE 4
+                                        END
+                           ) as rank_in_student
+                    FROM daily_attendance 
+                    WHERE {attendance_filter}
+                    GROUP BY student_id, participation_level
+                ) ranked
+                WHERE rank_in_student = 1
+            ) p ON p.student_id = s.student_id
+            WHERE {student_filter}
+        """
+        params = ([month_year, f"Monthly summary for {month_year}"]
+                  + attendance_params + attendance_params + student_params)
+        
+        count_query = f"""
+            SELECT COUNT(*) AS students
+            FROM students s
+            JOIN (
+                SELECT DISTINCT student_id
+                FROM daily_attendance
+                WHERE {attendance_filter}
+            ) a ON a.student_id = s.student_id
+            WHERE {student_filter}
+        """
+        count_params = attendance_params + student_params
+        
+        return query, params, count_query, count_params
+    
+    def _run_summary_engine(self, cursor, month_year, form=None, class_name=None):
+        """Recompute summary rows for a month (optionally one class); returns students updated"""
+        select_query, params, count_query, count_params = self._summary_select(month_year, form, class_name)
+        
+        cursor.execute(count_query, count_params)
+        updated_count = cursor.fetchone()['students']
+        
+        if updated_count == 0:
+            return 0
+        
+        query = f"""
+            INSERT INTO monthly_attendance_summary 
+            (student_id, admission_number, month_year, form, class_name,
+             total_days, days_present, days_absent, days_late, days_excused,
+             attendance_percentage, homework_completion_rate, uniform_compliance_rate,
+             books_brought_rate, average_participation, comments,
+             {', '.join(SUMMARY_COUNTERS[5:])})
+            {select_query}
+            {self.backend.upsert(('student_id', 'month_year'), self.backend.new_values(SUMMARY_COLUMNS))}
+        """
+        cursor.execute(query, params)
+        
+        return updated_count
+    
+    def verify_monthly_summary(self, month_year=None):
+        """Compare stored summary rows for a month with a full recomputation"""
         if not self.connect_db():
-            return []
+            return None
         
         try:
-            if date_filter is None:
-                date_filter = date.today()
+            if month_year is None:
+                month_year = datetime.now().strftime("%Y-%m")
             
-            query = """
-                SELECT da.*, s.first_name, s.last_name, s.gender
-                FROM daily_attendance da
-                JOIN students s ON da.student_id = s.student_id
-                WHERE da.attendance_date = %s
-            """
-            params = [date_filter]
+            select_query, params, _, _ = self._summary_select(month_year)
+            if self._month_archived(self.cursor, month_year):
+                st.info(f"{month_year} is archived; its summaries are kept as they were when archived.")
+                return None
+            self.cursor.execute(select_query, params)
+            expected = {row['student_id']: row for row in self.cursor.fetchall()}
             
-            if form:
-                query += " AND da.form = %s"
-                params.append(form)
+            self.cursor.execute(
+                "SELECT * FROM monthly_attendance_summary WHERE month_year = %s",
+                (month_year,)
+            )
+            stored = {row['student_id']: row for row in self.cursor.fetchall()}
             
-            if class_name:
-                query += " AND da.class_name = %s"
-                params.append(class_name)
+            mismatches = []
+            for student_id in sorted(set(expected) & set(stored)):
+                for column in SUMMARY_COLUMNS:
+                    expected_value = expected[student_id][column]
+                    stored_value = stored[student_id][column]
+                    if column == 'average_participation' or column == 'comments':
+                        same = expected_value == stored_value
+                    else:
+                        same = abs(float(expected_value or 0) - float(stored_value or 0)) < 0.01
+                    if not same:
+                        mismatches.append({
+                            'student_id': student_id,
+                            'column': column,
+                            'stored': stored_value,
+                            'expected': expected_value
+                        })
             
-            query += " ORDER BY s.last_name, s.first_name"
+            return {
+                'month_year': month_year,
+                'checked': len(set(expected) & set(stored)),
+                'mismatches': mismatches,
+                'missing': sorted(set(expected) - set(stored)),
+                'unexpected': sorted(set(stored) - set(expected))
+            }
             
-            self.cursor.execute(query, params)
-            return self.cursor.fetchall()
+        except ValueError:
+            st.error(f"Invalid month '{month_year}', expected YYYY-MM")
+            return None
         except Error as e:
-            st.error(f"Error fetching attendance: {e}")
-            return []
+            st.error(f"Error verifying summary: {e}")
+            return None
         finally:
             self.close_db()
     
-    def save_class_register(self, register_data):
-        """Save class register information"""
-        if not self.connect_db():
-            return False
+    def calculate_term_summaries(self, academic_year, term):
+        """Roll monthly summaries up into a term's per-student and per-class rows
         
+        Term 0 is the whole academic year. The term's class_register rows get their
+        average_attendance from the class rows. Returns the student rows written, or None.
+        """
         try:
-            query = """
-                INSERT INTO class_register 
-                (form, class_name, academic_year, term, total_students,
-                 class_teacher, class_prefect, assistant_prefect,
-                 average_attendance, top_performer, most_improved,
-                 class_goals, special_notes)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                total_students = VALUES(total_students),
-                class_teacher = VALUES(class_teacher),
-                class_prefect = VALUES(class_prefect),
-                assistant_prefect = VALUES(assistant_prefect),
-                average_attendance = VALUES(average_attendance),
-                top_performer = VALUES(top_performer),
-                most_improved = VALUES(most_improved),
-                class_goals = VALUES(class_goals),
-                special_notes = VALUES(special_notes)
-            """
-            
-            self.cursor.execute(query, (
-                register_data['form'],
-                register_data['class_name'],
-                register_data['academic_year'],
-                register_data['term'],
-                register_data['total_students'],
-                register_data['class_teacher'],
-                register_data['class_prefect'],
-                register_data['assistant_prefect'],
-                register_data.get('average_attendance', 0),
-                register_data.get('top_performer', ''),
-                register_data.get('most_improved', ''),
-                register_data.get('class_goals', ''),
-                register_data.get('special_notes', '')
-            ))
-            
-            self.connection.commit()
-            return True
-            
-        except Error as e:
-            st.error(f"Error saving register: {e}")
-            self.connection.rollback()
-            return False
-        finally:
-            self.close_db()
-    
-    def get_class_register(self, form, class_name, academic_year, term):
-        """Get class register information"""
-        if not self.connect_db():
+            term_months(academic_year, term)
+        except ValueError:
+            st.error(f"Invalid academic year '{academic_year}' or term '{term}'")
             return None
         
         try:
-            query = """
-                SELECT * FROM class_register 
-                WHERE form = %s AND class_name = %s 
-                AND academic_year = %s AND term = %s
-            """
-            self.cursor.execute(query, (form, class_name, academic_year, term))
-            return self.cursor.fetchone()
+            return self._write_term_summaries(academic_year, term)
         except Error as e:
-            st.error(f"Error fetching register: {e}")
+            st.error(f"Error calculating term summaries: {e}")
             return None
+    
+    def _write_term_summaries(self, academic_year, term):
+        """Rebuild one term's (or year's) rollup rows on a pooled connection; raises database errors"""
+        connection = self.pool.acquire()
+        try:
+            cursor = self._new_cursor(connection, dictionary=True)
+            try:
+                connection.start_transaction()
+                written = self._write_term_rows(cursor, academic_year, term)
+                connection.commit()
+            finally:
+                cursor.close()
         finally:
-            self.close_db()
+            # Rolls back a failed rebuild
+            self.pool.release(connection)
+        
+        self.cache.invalidate_prefix('register')
+        return written
     
-    def save_incident(self, incident_data):
-        """Save student incident"""
+    def _write_term_rows(self, cursor, academic_year, term, student_ids=None):
+        """Rebuild a term's student rows (all, or only student_ids) and the class rows they roll into"""
+        months = term_months(academic_year, term)
+        student_filter = ""
+        student_params = []
+        class_filter = ""
+        class_params = []
+        if student_ids is not None:
+            student_filter = f" AND student_id IN ({', '.join(['%s'] * len(student_ids))})"
+            student_params = list(student_ids)
+            # The classes the students were rolled into before, and are in now
+            cursor.execute(f"""
+                SELECT form, class_name FROM term_attendance_summary
+                WHERE academic_year = %s AND term = %s {student_filter}
+                UNION
+                SELECT form, class_name FROM students
+                WHERE form IS NOT NULL {student_filter}
+            """, [academic_year, term] + student_params + student_params)
+            classes = [(row['form'], row['class_name']) for row in cursor.fetchall()]
+            class_filter = " AND " + (self.backend.row_in(('form', 'class_name'), len(classes)) if classes else "1=0")
+            class_params = [value for key in classes for value in key]
+        
+        cursor.execute(f"DELETE FROM term_attendance_summary WHERE academic_year = %s AND term = %s {student_filter}",
+                       [academic_year, term] + student_params)
+        cursor.execute(f"DELETE FROM class_term_summary WHERE academic_year = %s AND term = %s {class_filter}",
+                       [academic_year, term] + class_params)
+        
+        # Students are summarised in their current class, as the monthly summaries are
+        cursor.execute(f"""
+            INSERT INTO term_attendance_summary
+            (student_id, admission_number, academic_year, term, form, class_name, months,
+             total_days, days_present, days_absent, days_late, days_excused,
+             homework_days, uniform_days, books_days,
+             attendance_percentage, homework_completion_rate, uniform_compliance_rate,
+             books_brought_rate)
+            SELECT s.student_id, s.admission_number, %s, %s, s.form, s.class_name, COUNT(*),
+                   SUM(mas.total_days), SUM(mas.days_present), SUM(mas.days_absent),
+                   SUM(mas.days_late), SUM(mas.days_excused),
+                   SUM(mas.homework_days), SUM(mas.uniform_days), SUM(mas.books_days),
+                   SUM(mas.days_present) * 100.0 / SUM(mas.total_days),
+                   SUM(mas.homework_days) * 100.0 / SUM(mas.total_days),
+                   SUM(mas.uniform_days) * 100.0 / SUM(mas.total_days),
+                   SUM(mas.books_days) * 100.0 / SUM(mas.total_days)
+            FROM monthly_attendance_summary mas
+            JOIN students s ON s.student_id = mas.student_id
+            WHERE mas.month_year IN ({', '.join(['%s'] * len(months))})
+            AND mas.total_days > 0 AND s.form IS NOT NULL {student_filter.replace('student_id', 's.student_id')}
+            GROUP BY s.student_id, s.admission_number, s.form, s.class_name
+        """, [academic_year, term] + months + student_params)
+        written = max(cursor.rowcount, 0)
+        
+        cursor.execute(f"""
+            INSERT INTO class_term_summary
+            (academic_year, term, form, class_name, students,
+             total_days, days_present, days_absent, days_late, days_excused,
+             attendance_percentage, homework_completion_rate, uniform_compliance_rate,
+             books_brought_rate)
+            SELECT academic_year, term, form, class_name, COUNT(*),
+                   SUM(total_days), SUM(days_present), SUM(days_absent),
+                   SUM(days_late), SUM(days_excused),
+                   SUM(days_present) * 100.0 / SUM(total_days),
+                   SUM(homework_days) * 100.0 / SUM(total_days),
+                   SUM(uniform_days) * 100.0 / SUM(total_days),
+                   SUM(books_days) * 100.0 / SUM(total_days)
+            FROM term_attendance_summary
+            WHERE academic_year = %s AND term = %s {class_filter}
+            GROUP BY academic_year, term, form, class_name
+        """, [academic_year, term] + class_params)
+        
+        if term:
+            self._sync_register_averages(cursor, academic_year, term)
+        return written
+    
+    def _term_deltas(self, summary_deltas):
+        """{(academic_year, term): student_ids} for the terms and years of changed monthly summaries"""
+        periods = {}
+        for (student_id, month_year), (_, change) in summary_deltas.items():
+            if not any(change):
+                continue
+            academic_year, term = term_of(month_bounds(month_year)[0])
+            for period in ((academic_year, term), (academic_year, 0)):
+                periods.setdefault(period, set()).add(student_id)
+        return periods
+    
+    def _apply_term_deltas(self, cursor, term_deltas):
+        """Re-roll the given terms and years for just the students involved
+        
+        Only rollups already built are kept current; the next summary run builds the others in full.
+        """
+        for (academic_year, term), student_ids in sorted(term_deltas.items()):
+            cursor.execute("SELECT form FROM class_term_summary WHERE academic_year = %s AND term = %s LIMIT 1",
+                           (academic_year, term))
+            if cursor.fetchall():
+                self._write_term_rows(cursor, academic_year, term, sorted(student_ids))
+    
+    def _sync_register_averages(self, cursor, academic_year, term):
+        """Copy the computed class averages of a term into class_register"""
+        cursor.execute("""
+            UPDATE class_register
+            SET average_attendance = COALESCE((
+                SELECT cts.attendance_percentage FROM class_term_summary cts
+                WHERE cts.academic_year = class_register.academic_year AND cts.term = class_register.term
+                AND cts.form = class_register.form AND cts.class_name = class_register.class_name
+            ), 0)
+            WHERE academic_year = %s AND term = %s
+        """, (academic_year, term))
+    
+    def _refresh_term_summaries(self, months):
+        """Rebuild the terms and academic years that contain any of the given months"""
+        periods = set()
+        for month_year in months:
+            academic_year, term = term_of(month_bounds(month_year)[0])
+            periods |= {(academic_year, term), (academic_year, 0)}
+        for academic_year, term in sorted(periods):
+            self._write_term_summaries(academic_year, term)
+    
+    def get_class_term_summaries(self, academic_year, term, as_frame=False):
+        """Per-class term (or year, term 0) rows with each class's target for the term"""
         if not self.connect_db():
-            return False
+            return pd.DataFrame() if as_frame else []
         
         try:
             query = """
-                INSERT INTO student_incidents 
-                (student_id, incident_date, incident_type, incident_category,
-                 description, action_taken, recorded_by)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                SELECT cts.*, cr.target_attendance, cr.class_teacher
+                FROM class_term_summary cts
+                LEFT JOIN class_register cr
+                ON cr.form = cts.form AND cr.class_name = cts.class_name
+                AND cr.academic_year = cts.academic_year AND cr.term = cts.term
+                WHERE cts.academic_year = %s AND cts.term = %s
+                ORDER BY cts.form, cts.class_name
             """
+            params = (academic_year, term)
             
-            self.cursor.execute(query, (
-                incident_data['student_id'],
-                incident_data['incident_date'],
-                incident_data['incident_type'],
-                incident_data.get('incident_category', ''),
-                incident_data['description'],
-                incident_data.get('action_taken', ''),
-                incident_data['recorded_by']
-            ))
-            
-            self.connection.commit()
-            return True
+            if as_frame:
+                return self._fetch_frame(query, params)
             
+            self.cursor.execute(query, params)
+            return self.cursor.fetchall()
         except Error as e:
-            st.error(f"Error saving incident: {e}")
-            self.connection.rollback()
-            return False
+            st.error(f"Error fetching term summaries: {e}")
+            return pd.DataFrame() if as_frame else []
         finally:
             self.close_db()
     
-    def get_student_incidents(self, student_id=None, form=None, class_name=None):
-        """Get student incidents"""
+    def get_term_summary(self, academic_year, term, form=None, class_name=None, as_frame=False):
+        """Per-student term (or year, term 0) rows, best attendance first"""
         if not self.connect_db():
-            return []
+            return pd.DataFrame() if as_frame else []
         
         try:
             query = """
-                SELECT si.*, s.first_name, s.last_name, s.admission_number,
-                       s.form, s.class_name
-                FROM student_incidents si
-                JOIN students s ON si.student_id = s.student_id
-                WHERE 1=1
+                SELECT tas.*, s.first_name, s.last_name, s.gender
+                FROM term_attendance_summary tas
+                JOIN students s ON tas.student_id = s.student_id
+                WHERE tas.academic_year = %s AND tas.term = %s
             """
-            params = []
-            
-            if student_id:
-                query += " AND si.student_id = %s"
-                params.append(student_id)
+            params = [academic_year, term]
             
             if form:
-                query += " AND s.form = %s"
+                query += " AND tas.form = %s"
                 params.append(form)
             
             if class_name:
-                query += " AND s.class_name = %s"
+                query += " AND tas.class_name = %s"
                 params.append(class_name)
             
-            query += " ORDER BY si.incident_date DESC"
+            query += " ORDER BY tas.attendance_percentage DESC"
+            
+            if as_frame:
+                return self._fetch_frame(query, params)
             
             self.cursor.execute(query, params)
             return self.cursor.fetchall()
         except Error as e:
-            st.error(f"Error fetching incidents: {e}")
-            return []
+            st.error(f"Error fetching term summary: {e}")
+            return pd.DataFrame() if as_frame else []
         finally:
             self.close_db()
     
-    def calculate_monthly_summary(self, month_year=None):
-        """Calculate monthly attendance summary"""
+    def get_archives(self):
+        """attendance_archives rows, oldest year first"""
+        cached = self.cache.get(('archives',))
+        if cached is not None:
+            return cached
+        
+        generation = self.cache.generation
+        try:
+            archives = self._fetch_all("SELECT * FROM attendance_archives ORDER BY academic_year")
+        except Error as e:
+            st.error(f"Error fetching archives: {e}")
+            return []
+        self.cache.set(('archives',), archives, generation)
+        return archives
+    
+    def archived_year(self, day):
+        """The archived academic year holding a date, or None while it is still in the database"""
+        archives = self._archives_overlapping(day, day)
+        return archives[0]['academic_year'] if archives else None
+    
+    def _archives_overlapping(self, start_date, end_date):
+        """Finished archives holding any day from start_date to end_date (inclusive)"""
+        return [archive for archive in self.get_archives()
+                if archive['status'] == 'Archived'
+                and archive['start_date'] <= end_date and archive['end_date'] > start_date]
+    
+    def _archive_exclusion(self, column, archives):
+        """SQL condition leaving archived years out of a daily_attendance query"""
+        clause = ""
+        params = []
+        for archive in archives:
+            clause += f" AND NOT ({column} >= %s AND {column} < %s)"
+            params += [archive['start_date'], archive['end_date']]
+        return clause, params
+    
+    def _month_archived(self, cursor, month_year):
+        month_start, _ = month_bounds(month_year)
+        cursor.execute("""
+            SELECT academic_year FROM attendance_archives
+            WHERE status = 'Archived' AND start_date <= %s AND end_date > %s
+        """, (month_start, month_start))
+        return bool(cursor.fetchall())
+    
+    def _archived_attendance(self, archives, start_date=None, end_date=None,
+                             student_id=None, form=None, class_name=None):
+        """daily_attendance rows read from archive files, filtered like the SQL they replace"""
+        records = []
+        for archive in archives:
+            arrays = load_archive_file(archive['file_path'])
+            mask = np.ones(len(arrays['student_id']), dtype=bool)
+            if student_id is not None:
+                # Archive rows are sorted by student, then date
+                first, last = np.searchsorted(arrays['student_id'], [student_id, student_id + 1])
+                mask[:first] = False
+                mask[last:] = False
+            if start_date is not None:
+                mask &= arrays['attendance_date'] >= np.datetime64(start_date, 'D')
+            if end_date is not None:
+                mask &= arrays['attendance_date'] <= np.datetime64(end_date, 'D')
+            if form:
+                mask &= arrays['form'] == form
+            if class_name:
+                mask &= arrays['class_name'] == class_name
+            records += archive_records(arrays, np.flatnonzero(mask))
+        return records
+    
+    def _with_student_names(self, records, columns):
+        """Add students' columns to archived rows, dropping rows whose student is gone"""
+        student_ids = sorted({record['student_id'] for record in records})
+        if not student_ids:
+            return records
+        try:
+            students = {
+                student['student_id']: student
+                for student in self._fetch_all(
+                    f"SELECT student_id, {', '.join(columns)} FROM students "
+                    f"WHERE student_id IN ({', '.join(['%s'] * len(student_ids))})",
+                    student_ids
+                )
+            }
+        except Error as e:
+            st.error(f"Error fetching archived attendance: {e}")
+            return None
+        return [dict(record, **{column: students[record['student_id']][column] for column in columns})
+                for record in records if record['student_id'] in students]
+    
+    def _records_frame(self, records):
+        """DataFrame of row dicts with ENUM columns as categoricals, like _fetch_frame"""
+        frame = pd.DataFrame.from_records(records)
+        for column, categories in ENUM_CATEGORIES.items():
+            if column in frame.columns:
+                frame[column] = pd.Categorical(frame[column], categories=categories)
+        return frame
+    
+    def _add_archived_counts(self, rows, archives, start_date, end_date, form=None, class_name=None):
+        """get_attendance_range_summary rows with the archived days added in"""
+        records = self._archived_attendance(archives, start_date, end_date, form=form, class_name=class_name)
+        if not records:
+            return rows
+        
+        frame = pd.DataFrame.from_records(records)
+        morning, afternoon = frame['morning_status'], frame['afternoon_status']
+        frame['days_recorded'] = 1
+        frame['days_present'] = ((morning == 'Present') | (afternoon == 'Present')).astype(int)
+        frame['days_absent'] = ((morning == 'Absent') & (afternoon == 'Absent')).astype(int)
+        frame['days_late'] = ((morning == 'Late') | (afternoon == 'Late')).astype(int)
+        frame['days_excused'] = ((morning == 'Excused') | (afternoon == 'Excused')).astype(int)
+        counters = ['days_recorded', 'days_present', 'days_absent', 'days_late', 'days_excused']
+        counts = frame.groupby(['form', 'class_name', 'student_id'])[counters].sum()
+        
+        totals = {(row['form'], row['class_name'], row['student_id']): dict(row) for row in rows}
+        archived = []
+        for (row_form, row_class, student_id), values in counts.iterrows():
+            key = (row_form, row_class, student_id)
+            if key in totals:
+                for counter in counters:
+                    totals[key][counter] += int(values[counter])
+            else:
+                archived.append(dict({'form': row_form, 'class_name': row_class, 'student_id': student_id},
+                                     **{counter: int(values[counter]) for counter in counters}))
+        
+        archived = self._with_student_names(archived, ('admission_number', 'first_name', 'last_name'))
+        if archived is None:
+            return rows
+        
+        combined = list(totals.values()) + archived
+        combined.sort(key=lambda row: (row['form'], row['class_name'], row['last_name'], row['first_name']))
+        return combined
+    
+    def get_archivable_years(self):
+        """Closed academic years that still have rows in daily_attendance"""
+        current_start, _ = academic_year_bounds(academic_year_of(date.today()))
         if not self.connect_db():
-            return False
+            return []
         
         try:
-            if month_year is None:
-                month_year = datetime.now().strftime("%Y-%m")
-            
-            # Calculate for each student
-            query = """
-                SELECT student_id, admission_number, form, class_name
-                FROM students 
-                WHERE form IS NOT NULL
-            """
-            self.cursor.execute(query)
-            students = self.cursor.fetchall()
+            self.cursor.execute(
+                "SELECT MIN(attendance_date) AS first_day FROM daily_attendance WHERE attendance_date < %s",
+                (current_start,)
+            )
+            first_day = self.cursor.fetchone()['first_day']
+            if first_day is None:
+                return []
             
-            updated_count = 0
-            
-            for student in students:
-                # Get attendance for the month
-                month_start = f"{month_year}-01"
-                query = """
-                    SELECT 
-                        COUNT(*) as total_days,
-                        SUM(CASE WHEN morning_status = 'Present' OR afternoon_status = 'Present' THEN 1 ELSE 0 END) as days_present,
-                        SUM(CASE WHEN morning_status = 'Absent' AND afternoon_status = 'Absent' THEN 1 ELSE 0 END) as days_absent,
-                        SUM(CASE WHEN morning_status = 'Late' OR afternoon_status = 'Late' THEN 1 ELSE 0 END) as days_late,
-                        SUM(CASE WHEN morning_status = 'Excused' OR afternoon_status = 'Excused' THEN 1 ELSE 0 END) as days_excused,
-                        AVG(CASE WHEN completed_homework THEN 1 ELSE 0 END) * 100 as homework_rate,
-                        AVG(CASE WHEN uniform_proper THEN 1 ELSE 0 END) * 100 as uniform_rate,
-                        AVG(CASE WHEN books_brought THEN 1 ELSE 0 END) * 100 as books_rate
-                    FROM daily_attendance 
-                    WHERE student_id = %s 
-                    AND attendance_date >= %s 
-                    AND attendance_date < DATE_ADD(%s, INTERVAL 1 MONTH)
-                """
-                self.cursor.execute(query, (student['student_id'], month_start, month_start))
-                stats = self.cursor.fetchone()
-                
-                if stats['total_days'] > 0:
-                    attendance_percentage = (stats['days_present'] / stats['total_days']) * 100
-                    
-                    # Determine average participation
-                    query = """
-                        SELECT participation_level, COUNT(*) as count
-                        FROM daily_attendance 
-                        WHERE student_id = %s 
-                        AND attendance_date >= %s 
-                        AND attendance_date < DATE_ADD(%s, INTERVAL 1 MONTH)
-                        GROUP BY participation_level
-                        ORDER BY count DESC
-                        LIMIT 1
-                    """
-                    self.cursor.execute(query, (student['student_id'], month_start, month_start))
-                    participation = self.cursor.fetchone()
-                    
-                    # Insert/update summary
-                    query = """
-                        INSERT INTO monthly_attendance_summary 
-                        (student_id, admission_number, month_year, form, class_name,
-                         total_days, days_present, days_absent, days_late, days_excused,
-                         attendance_percentage, homework_completion_rate, uniform_compliance_rate,
-                         books_brought_rate, average_participation, comments)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON DUPLICATE KEY UPDATE
-                        total_days = VALUES(total_days),
-                        days_present = VALUES(days_present),
-                        days_absent = VALUES(days_absent),
-                        days_late = VALUES(days_late),
-                        days_excused = VALUES(days_excused),
-                        attendance_percentage = VALUES(attendance_percentage),
-                        homework_completion_rate = VALUES(homework_completion_rate),
-                        uniform_compliance_rate = VALUES(uniform_compliance_rate),
-                        books_brought_rate = VALUES(books_brought_rate),
-                        average_participation = VALUES(average_participation),
-                        comments = VALUES(comments)
-                    """
-                    
-                    self.cursor.execute(query, (
-                        student['student_id'],
-                        student['admission_number'],
-                        month_year,
-                        student['form'],
-                        student['class_name'],
-                        stats['total_days'],
-                        stats['days_present'],
-                        stats['days_absent'],
-                        stats['days_late'],
-                        stats['days_excused'],
-                        attendance_percentage,
-                        stats['homework_rate'] or 0,
-                        stats['uniform_rate'] or 0,
-                        stats['books_rate'] or 0,
-                        participation['participation_level'] if participation else 'Good',
-                        f"Monthly summary for {month_year}"
-                    ))
-                    
-                    updated_count += 1
+            years = []
+            year = academic_year_of(date.fromisoformat(str(first_day)[:10]))
+            while academic_year_bounds(year)[0] < current_start:
+                start_date, end_date = academic_year_bounds(year)
+                self.cursor.execute(
+                    "SELECT COUNT(*) AS row_count FROM daily_attendance WHERE attendance_date >= %s AND attendance_date < %s",
+                    (start_date, end_date)
+                )
+                if self.cursor.fetchone()['row_count']:
+                    years.append(year)
+                year = academic_year_of(end_date)
+            return years
+        except Error as e:
+            st.error(f"Error listing academic years: {e}")
+            return []
+        finally:
+            self.close_db()
+    
+    def archive_academic_year(self, academic_year):
+        """Move a closed academic year's daily attendance into a compressed archive file
+        
+        The year's monthly summaries and class-day statistics are recomputed first
+        and stay in the database.
+        Re-running an interrupted archive picks up where it stopped.
+        Returns {'academic_year', 'rows', 'deleted', 'file_path', 'file_bytes'} or None.
+        """
+        try:
+            start_date, end_date = academic_year_bounds(academic_year)
+        except ValueError:
+            st.error(f"Invalid academic year '{academic_year}', expected YYYY-YYYY")
+            return None
+        if end_date > academic_year_bounds(academic_year_of(date.today()))[0]:
+            st.error(f"{academic_year} has not finished; only past academic years can be archived")
+            return None
+        
+        file_path = os.path.join(ARCHIVE_CONFIG['directory'], f"daily_attendance_{academic_year}.npz")
+        months = term_months(academic_year, 0)
+        
+        try:
+            connection = self.pool.acquire()
+            try:
+                cursor = self._new_cursor(connection, dictionary=True)
+                try:
+                    cursor.execute("SELECT * FROM attendance_archives WHERE academic_year = %s", (academic_year,))
+                    archive = cursor.fetchone()
+                    if archive is None:
+                        # From here on writes to the year are refused, so the file will be complete
+                        cursor.execute(
+                            "INSERT INTO attendance_archives (academic_year, start_date, end_date) VALUES (%s, %s, %s)",
+                            (academic_year, start_date, end_date)
+                        )
+                        connection.commit()
+                        archive = {'status': 'Archiving'}
+                    self.cache.invalidate(('archives',))
+                finally:
+                    cursor.close()
+            finally:
+                self.pool.release(connection)
             
-            self.connection.commit()
-            return updated_count
+            if archive['status'] != 'Archived':
+                result = self.calculate_monthly_summaries(months)
+                if result is None or result['failed']:
+                    st.error(f"Could not bring {academic_year}'s monthly summaries up to date; nothing was archived.")
+                    return None
+                if self.rebuild_class_daily_stats(start_date, end_date - timedelta(days=1)) is None:
+                    return None
+                self._write_archive(academic_year, start_date, end_date, file_path)
             
-        except Error as e:
-            st.error(f"Error calculating summary: {e}")
-            self.connection.rollback()
-            return 0
+            deleted = self._delete_archived_rows(file_path)
+        except (Error, OSError) as e:
+            st.error(f"Error archiving {academic_year}: {e}")
+            return None
+        
+        archive = next(a for a in self.get_archives() if a['academic_year'] == academic_year)
+        return {'academic_year': academic_year, 'rows': archive['row_count'], 'deleted': deleted,
+                'file_path': archive['file_path'], 'file_bytes': archive['file_bytes']}
+    
+    def _write_archive(self, academic_year, start_date, end_date, file_path):
+        """Copy the year's rows into the archive file and mark the year archived"""
+        connection = self.pool.acquire()
+        try:
+            cursor = self._new_cursor(connection)
+            try:
+                cursor.execute(f"""
+                    SELECT {', '.join(ARCHIVE_COLUMNS)} FROM daily_attendance
+                    WHERE attendance_date >= %s AND attendance_date < %s
+                    ORDER BY student_id, attendance_date
+                """, (start_date, end_date))
+                chunks = []
+                while True:
+                    rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                    if not rows:
+                        break
+                    chunks.append(encode_archive_rows(rows))
+                arrays = {column: np.concatenate([chunk[column] for chunk in chunks])
+                          for column in ARCHIVE_COLUMNS} if chunks else encode_archive_rows([])
+                
+                file_bytes = write_archive_file(file_path, arrays)
+                # Read the file back before anything is deleted
+                if len(load_archive_file(file_path)['attendance_id']) != len(arrays['attendance_id']):
+                    raise OSError(f"{file_path} does not hold every archived row")
+                
+                cursor.execute("""
+                    UPDATE attendance_archives
+                    SET status = 'Archived', row_count = %s, file_path = %s, file_bytes = %s, archived_at = %s
+                    WHERE academic_year = %s
+                """, (len(arrays['attendance_id']), file_path, file_bytes, datetime.now(), academic_year))
+                connection.commit()
+            finally:
+                cursor.close()
         finally:
-            self.close_db()
+            self.pool.release(connection)
+        
+        self.cache.invalidate(('archives',))
+        self.history_cache.invalidate_prefix('history')
+    
+    def _delete_archived_rows(self, file_path):
+        """Delete the archived rows from daily_attendance in short transactions; returns rows deleted"""
+        attendance_ids = load_archive_file(file_path)['attendance_id'].tolist()
+        chunk_rows = ARCHIVE_CONFIG['delete_chunk_rows']
+        deleted = 0
+        
+        connection = self.pool.acquire()
+        try:
+            cursor = self._new_cursor(connection)
+            try:
+                for start in range(0, len(attendance_ids), chunk_rows):
+                    chunk = attendance_ids[start:start + chunk_rows]
+                    cursor.execute(
+                        f"DELETE FROM daily_attendance WHERE attendance_id IN ({', '.join(['%s'] * len(chunk))})",
+                        chunk
+                    )
+                    deleted += cursor.rowcount
+                    connection.commit()
+            finally:
+                cursor.close()
+        finally:
+            self.pool.release(connection)
+        return deleted
     
-    def get_monthly_summary(self, month_year=None, form=None, class_name=None):
-        """Get monthly attendance summary"""
+    def get_monthly_summary(self, month_year=None, form=None, class_name=None, as_frame=False):
+        """Get monthly attendance summary (as a DataFrame when as_frame is set)"""
         if not self.connect_db():
-            return []
+            return pd.DataFrame() if as_frame else []
         
         try:
             if month_year is None:
@@ -577,14 +4245,22 @@ class SchoolRegisterSystem:
             
             query += " ORDER BY mas.attendance_percentage DESC"
             
+            if as_frame:
+                return self._fetch_frame(query, params)
+            
             self.cursor.execute(query, params)
             return self.cursor.fetchall()
         except Error as e:
             st.error(f"Error fetching summary: {e}")
-            return []
+            return pd.DataFrame() if as_frame else []
         finally:
             self.close_db()
 
+@st.cache_resource
+def migrate_database_once():
+    """Apply pending schema migrations the first time any session starts"""
+    return SchoolRegisterSystem().run_migrations() is not None
+
 def main():
     """Main Streamlit app"""
     
@@ -633,10 +4309,13 @@ def main():
     # Initialize system
     register = SchoolRegisterSystem()
     
-    # Setup database on first run
-    if 'db_setup' not in st.session_state:
-        if register.setup_database():
-            st.session_state.db_setup = True
+    # Bring the schema up to date once per process (retried on the next run if it fails)
+    if not migrate_database_once():
+        migrate_database_once.clear()
+    
+    # Start the background workers once per process
+    get_job_runner()
+    get_attendance_replayer()
     
     # Sidebar
     with st.sidebar:
@@ -660,6 +4339,20 @@ def main():
         classes = register.get_classes()
         st.metric("Total Classes", len(classes))
         
+        today_stats = register.get_class_daily_stats(today, today)
+        today_recorded = sum(row['students_recorded'] for row in today_stats)
+        if today_recorded:
+            today_present = sum(row['present'] for row in today_stats)
+            st.metric("Present Today", f"{today_present / today_recorded * 100:.1f}%",
+                      help=f"{today_present} of {today_recorded} students recorded")
+        
+        queue_depth = get_attendance_queue().depth()
+        if queue_depth['submissions']:
+            st.metric("Attendance Waiting to Save", queue_depth['rows'],
+                      help=f"{queue_depth['submissions']} submissions, oldest at {queue_depth['oldest']}")
+        if queue_depth['dead']:
+            st.warning(f"{queue_depth['dead']} attendance submissions could not be saved. See Settings.")
+        
         st.markdown("---")
         st.caption(f"© {datetime.now().year} Northlea High School")
     
@@ -708,6 +4401,12 @@ def daily_attendance_section(register):
         attendance_date = st.date_input("Attendance Date", date.today())
         recorded_by = st.text_input("Recorded By", "Teacher")
     
+    archived_year = register.archived_year(attendance_date)
+    if archived_year:
+        st.warning(f"{archived_year} has been archived, so its attendance can no "
+                   "longer be changed. Use View Records to see it.")
+        return
+    
     # Get students in selected class
     students = register.get_class_students(
         selected_class_data['form'], 
@@ -725,14 +4424,34 @@ def daily_attendance_section(register):
     existing_attendance = register.get_todays_attendance(
         form=selected_class_data['form'],
         class_name=selected_class_data['class_name'],
-        date_filter=attendance_date
+        date_filter=attendance_date,
+        key_by_student=True
     )
     
-    # Create attendance form
-    attendance_data = []
+    # Submissions still in the local queue are newer than the database
+    pending = get_attendance_queue().pending(selected_class_data['form'],
+                                             selected_class_data['class_name'], attendance_date)
+    if pending:
+        existing_attendance.update(pending)
+        st.caption(f"⏳ {len(pending)} students' attendance is still being saved to the database.")
     
     st.markdown("### Mark Attendance")
     
+    entry_mode = st.radio(
+        "Entry Mode:",
+        ["Grid", "Per Student"],
+        horizontal=True,
+        help="Grid mode edits the whole class in a single table"
+    )
+    
+    if entry_mode == "Grid":
+        attendance_grid_form(register, students, existing_attendance,
+                             selected_class_data, attendance_date, recorded_by)
+        return
+    
+    # Create attendance form
+    attendance_data = []
+    
     # Create columns for student list
     with st.form("attendance_form"):
         for i, student in enumerate(students):
@@ -743,26 +4462,21 @@ def daily_attendance_section(register):
                 st.caption(f"Adm: {student['admission_number']}")
             
             # Check if attendance already exists
-            existing_record = next(
-                (rec for rec in existing_attendance if rec['student_id'] == student['student_id']), 
-                None
-            )
+            existing_record = existing_attendance.get(student['student_id'])
             
             with col2:
                 morning_status = st.selectbox(
                     "Morning",
-                    ["Present", "Absent", "Late", "Excused"],
-                    index=0 if not existing_record else 
-                    ["Present", "Absent", "Late", "Excused"].index(existing_record['morning_status']),
+                    ATTENDANCE_STATUSES,
+                    index=0 if not existing_record else STATUS_INDEX[existing_record['morning_status']],
                     key=f"morning_{i}"
                 )
             
             with col3:
                 afternoon_status = st.selectbox(
                     "Afternoon",
-                    ["Present", "Absent", "Late", "Excused"],
-                    index=0 if not existing_record else 
-                    ["Present", "Absent", "Late", "Excused"].index(existing_record['afternoon_status']),
+                    ATTENDANCE_STATUSES,
+                    index=0 if not existing_record else STATUS_INDEX[existing_record['afternoon_status']],
                     key=f"afternoon_{i}"
                 )
             
@@ -790,9 +4504,8 @@ def daily_attendance_section(register):
             # Participation
             participation = st.selectbox(
                 "Participation Level",
-                ["Excellent", "Good", "Fair", "Poor"],
-                index=1 if not existing_record else 
-                ["Excellent", "Good", "Fair", "Poor"].index(existing_record['participation_level']),
+                PARTICIPATION_LEVELS,
+                index=1 if not existing_record else PARTICIPATION_INDEX[existing_record['participation_level']],
                 key=f"participation_{i}"
             )
             
@@ -829,29 +4542,124 @@ def daily_attendance_section(register):
         submit_button = st.form_submit_button("💾 Save Attendance")
         
         if submit_button:
-            # Calculate summary
-            total_students = len(attendance_data)
-            present_morning = sum(1 for s in attendance_data if s['morning_status'] == 'Present')
-            present_afternoon = sum(1 for s in attendance_data if s['afternoon_status'] == 'Present')
-            
-            # Save attendance
-            saved_count = register.save_attendance(attendance_data)
-            
-            if saved_count > 0:
-                st.success(f"✅ Attendance saved for {saved_count} students!")
-                
-                # Show summary
-                with st.expander("Attendance Summary", expanded=True):
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.metric("Total Students", total_students)
-                    with col2:
-                        st.metric("Morning Present", f"{present_morning} ({present_morning/total_students*100:.1f}%)")
-                    with col3:
-                        st.metric("Afternoon Present", f"{present_afternoon} ({present_afternoon/total_students*100:.1f}%)")
-                    with col4:
-                        absent_count = sum(1 for s in attendance_data if s['morning_status'] == 'Absent' and s['afternoon_status'] == 'Absent')
-                        st.metric("Fully Absent", absent_count)
+            save_class_attendance(register, attendance_data, existing_attendance)
+
+def attendance_grid_form(register, students, existing_attendance, class_data, attendance_date, recorded_by):
+    """Whole-class attendance entry as one editable table"""
+    
+    grid_rows = []
+    for student in students:
+        existing_record = existing_attendance.get(student['student_id'])
+        grid_rows.append({
+            'student_id': student['student_id'],
+            'admission_number': student['admission_number'],
+            'Student': f"{student['first_name']} {student['last_name']}",
+            'Morning': existing_record['morning_status'] if existing_record else 'Present',
+            'Afternoon': existing_record['afternoon_status'] if existing_record else 'Present',
+            'Homework': bool(existing_record['completed_homework']) if existing_record else True,
+            'Uniform': bool(existing_record['uniform_proper']) if existing_record else True,
+            'Books': bool(existing_record['books_brought']) if existing_record else True,
+            'Participation': existing_record['participation_level'] if existing_record else 'Good',
+            'Notes': (existing_record.get('teacher_notes') or '') if existing_record else ''
+        })
+    grid = pd.DataFrame(grid_rows)
+    
+    with st.form("attendance_grid_form"):
+        edited = st.data_editor(
+            grid,
+            column_order=['Student', 'Morning', 'Afternoon', 'Homework', 'Uniform',
+                          'Books', 'Participation', 'Notes'],
+            column_config={
+                'Student': st.column_config.TextColumn("Student", disabled=True),
+                'Morning': st.column_config.SelectboxColumn("Morning", options=ATTENDANCE_STATUSES, required=True),
+                'Afternoon': st.column_config.SelectboxColumn("Afternoon", options=ATTENDANCE_STATUSES, required=True),
+                'Homework': st.column_config.CheckboxColumn("Homework ✓"),
+                'Uniform': st.column_config.CheckboxColumn("Uniform ✓"),
+                'Books': st.column_config.CheckboxColumn("Books ✓"),
+                'Participation': st.column_config.SelectboxColumn("Participation", options=PARTICIPATION_LEVELS, required=True),
+                'Notes': st.column_config.TextColumn("Teacher Notes")
+            },
+            hide_index=True,
+            num_rows="fixed",
+            use_container_width=True,
+            key=f"attendance_grid_{class_data['form']}_{class_data['class_name']}_{attendance_date}"
+        )
+        
+        submit_button = st.form_submit_button("💾 Save Attendance")
+        
+        if submit_button:
+            attendance_data = [
+                {
+                    'student_id': int(student_id),
+                    'admission_number': admission_number,
+                    'attendance_date': attendance_date,
+                    'form': class_data['form'],
+                    'class_name': class_data['class_name'],
+                    'morning_status': morning,
+                    'afternoon_status': afternoon,
+                    'completed_homework': bool(homework),
+                    'uniform_proper': bool(uniform),
+                    'books_brought': bool(books),
+                    'participation_level': participation,
+                    'teacher_notes': notes or '',
+                    'recorded_by': recorded_by
+                }
+                for student_id, admission_number, morning, afternoon, homework, uniform, books, participation, notes
+                in zip(edited['student_id'], edited['admission_number'], edited['Morning'],
+                       edited['Afternoon'], edited['Homework'], edited['Uniform'], edited['Books'],
+                       edited['Participation'], edited['Notes'])
+            ]
+            save_class_attendance(register, attendance_data, existing_attendance)
+
+def save_class_attendance(register, attendance_data, existing_attendance=None):
+    """Save a class's attendance and show the day's summary
+    
+    With existing_attendance (the rows the form was filled from, keyed by student_id)
+    only new and changed rows are written.
+    """
+    
+    # Calculate summary
+    total_students = len(attendance_data)
+    present_morning = sum(1 for s in attendance_data if s['morning_status'] == 'Present')
+    present_afternoon = sum(1 for s in attendance_data if s['afternoon_status'] == 'Present')
+    
+    # Rows nobody touched are left alone, so a re-save writes (and locks) only the corrections
+    changes, counts = attendance_changes(attendance_data, existing_attendance or {})
+    change_note = f"{counts['new']} new, {counts['changed']} changed, {counts['unchanged']} unchanged"
+    
+    if not changes:
+        saved = True
+        st.info(f"No changes to save; attendance for all {total_students} students is already recorded.")
+    else:
+        # Queue the submission locally; the replayer writes it to the database
+        try:
+            get_attendance_queue().append(changes)
+            get_attendance_replayer().wake()
+            saved = True
+            st.success(f"✅ Attendance received for {len(changes)} students ({change_note})! "
+                       "It is being saved to the database in the background.")
+        except sqlite3.Error as e:
+            # Without the local queue, fall back to writing directly
+            st.warning(f"Local attendance queue unavailable ({e}); saving directly.")
+            result = register.save_attendance(changes)
+            saved = result is not None
+            if saved:
+                st.success(f"✅ Attendance saved for {result['inserted'] + result['updated']} students! "
+                           f"({change_note})")
+    
+    if saved:
+        # Show summary
+        with st.expander("Attendance Summary", expanded=True):
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Total Students", total_students)
+            with col2:
+                st.metric("Morning Present", f"{present_morning} ({present_morning/total_students*100:.1f}%)")
+            with col3:
+                st.metric("Afternoon Present", f"{present_afternoon} ({present_afternoon/total_students*100:.1f}%)")
+            with col4:
+                absent_count = sum(1 for s in attendance_data if s['morning_status'] == 'Absent' and s['afternoon_status'] == 'Absent')
+                st.metric("Fully Absent", absent_count)
 
 def class_register_section(register):
     """Class register information section"""
@@ -952,13 +4760,22 @@ def class_register_section(register):
             )
         
         with col1:
-            average_attendance = st.number_input(
+            target_attendance = st.number_input(
                 "Target Attendance %",
                 min_value=0,
                 max_value=100,
-                value=95 if not existing_register else existing_register['average_attendance']
+                value=95 if not existing_register else int(existing_register['target_attendance'])
             )
         
+        with col2:
+            # Computed from the term summaries, not entered
+            if existing_register and existing_register['average_attendance']:
+                actual = float(existing_register['average_attendance'])
+                st.metric("Actual Attendance %", f"{actual:.1f}%",
+                          delta=f"{actual - float(existing_register['target_attendance']):+.1f} vs target")
+            else:
+                st.caption("Actual attendance appears once the term's summaries have been calculated.")
+        
         st.markdown("### Class Goals & Notes")
         
         class_goals = st.text_area(
@@ -986,7 +4803,7 @@ def class_register_section(register):
                 'class_teacher': class_teacher,
                 'class_prefect': class_prefect,
                 'assistant_prefect': assistant_prefect,
-                'average_attendance': average_attendance,
+                'target_attendance': target_attendance,
                 'top_performer': top_performer,
                 'most_improved': most_improved,
                 'class_goals': class_goals,
@@ -1019,76 +4836,295 @@ def view_records_section(register):
             # Get students for dropdown
             classes = register.get_classes()
             if classes:
+                class_options = [f"Form {c['form']} {c['class_name']}" for c in classes]
                 selected_class = st.selectbox(
                     "Select Class:",
-                    [f"Form {c['form']} {c['class_name']}" for c in classes]
+                    class_options
                 )
+                selected_class_data = classes[class_options.index(selected_class)]
     
     with col3:
         if view_type == "Date Range":
             end_date = st.date_input("End Date", date.today())
     
     if view_type == "Today's Attendance":
-        # Get today's attendance for all classes
-        today_attendance = register.get_todays_attendance(date_filter=date_filter)
-        
-        if not today_attendance:
-            st.info(f"No attendance records for {date_filter.strftime('%d %B %Y')}")
-        else:
-            # Group by class
-            classes_data = {}
-            for record in today_attendance:
-                class_key = f"Form {record['form']} {record['class_name']}"
-                if class_key not in classes_data:
-                    classes_data[class_key] = []
-                classes_data[class_key].append(record)
-            
-            # Display each class
-            for class_name, records in classes_data.items():
-                with st.expander(f"{class_name} ({len(records)} students)", expanded=True):
-                    # Calculate stats
-                    total = len(records)
-                    present = sum(1 for r in records if r['morning_status'] == 'Present' or r['afternoon_status'] == 'Present')
-                    absent = sum(1 for r in records if r['morning_status'] == 'Absent' and r['afternoon_status'] == 'Absent')
-                    
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("Present", f"{present} ({present/total*100:.1f}%)")
-                    with col2:
-                        st.metric("Absent", f"{absent} ({absent/total*100:.1f}%)")
-                    with col3:
-                        late = sum(1 for r in records if r['morning_status'] == 'Late' or r['afternoon_status'] == 'Late')
-                        st.metric("Late", late)
-                    
-                    # Display table
-                    display_data = []
-                    for record in records:
-                        status = ""
-                        if record['morning_status'] == 'Present' and record['afternoon_status'] == 'Present':
-                            status = "✅ Full Day"
-                        elif record['morning_status'] == 'Absent' and record['afternoon_status'] == 'Absent':
-                            status = "❌ Absent"
-                        elif record['morning_status'] == 'Late' or record['afternoon_status'] == 'Late':
-                            status = "⚠️ Late"
-                        else:
-                            status = "⏰ Half Day"
-                        
-                        display_data.append({
-                            'Student': f"{record['first_name']} {record['last_name']}",
-                            'Admission': record['admission_number'],
-                            'Morning': record['morning_status'],
-                            'Afternoon': record['afternoon_status'],
-                            'Status': status,
-                            'Homework': '✓' if record['completed_homework'] else '✗',
-                            'Uniform': '✓' if record['uniform_proper'] else '✗',
-                            'Participation': record['participation_level']
-                        })
-                    
-                    df = pd.DataFrame(display_data)
-                    st.dataframe(df, use_container_width=True, hide_index=True)
+        todays_attendance_view(register, date_filter)
+    
+    elif view_type == "Date Range":
+        attendance_range_view(register, date_filter, end_date)
     
     elif view_type == "Student History":
-        st.info("Student history feature coming soon...")
+        if not classes:
+            st.warning("No classes found.")
+        else:
+            student_history_view(register, selected_class_data)
+
+def todays_attendance_view(register, date_filter):
+    """School overview for one day from the class-day rollup, with one class's students below"""
+    
+    stats = register.get_class_daily_stats(date_filter, date_filter, as_frame=True)
+    
+    if stats.empty:
+        st.info(f"No attendance records for {date_filter.strftime('%d %B %Y')}")
+        return
+    
+    recorded = int(stats['students_recorded'].sum())
+    present = int(stats['present'].sum())
+    absent = int(stats['absent'].sum())
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Students Recorded", recorded)
+    with col2:
+        st.metric("Present", f"{present} ({present/recorded*100:.1f}%)")
+    with col3:
+        st.metric("Absent", f"{absent} ({absent/recorded*100:.1f}%)")
+    with col4:
+        st.metric("Late", int(stats['late'].sum()))
+    
+    st.markdown("#### By Class")
+    class_labels = "Form " + stats['form'].astype(str) + " " + stats['class_name']
+    st.dataframe(
+        pd.DataFrame({
+            'Class': class_labels,
+            'Students': stats['students_recorded'],
+            'Present': stats['present'],
+            'Absent': stats['absent'],
+            'Late': stats['late'],
+            'Excused': stats['excused'],
+            'Half Day': stats['half_day'],
+            'Attendance %': (stats['present'] / stats['students_recorded'] * 100).round(1),
+            'Homework %': (stats['homework_completed'] / stats['students_recorded'] * 100).round(1),
+            'Uniform %': (stats['uniform_compliant'] / stats['students_recorded'] * 100).round(1),
+            'Books %': (stats['books_brought'] / stats['students_recorded'] * 100).round(1)
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    # Student rows are only loaded for the class being looked at
+    selected_class = st.selectbox("Show Students For:", class_labels.tolist(), key="today_class")
+    class_data = stats.iloc[class_labels.tolist().index(selected_class)]
+    records = register.get_todays_attendance(form=int(class_data['form']), class_name=class_data['class_name'],
+                                             date_filter=date_filter, as_frame=True)
+    if records.empty:
+        return
+    
+    morning = records['morning_status']
+    afternoon = records['afternoon_status']
+    st.dataframe(
+        pd.DataFrame({
+            'Student': records['first_name'] + " " + records['last_name'],
+            'Admission': records['admission_number'],
+            'Morning': morning,
+            'Afternoon': afternoon,
+            'Status': day_status(morning, afternoon),
+            'Homework': np.where(records['completed_homework'].astype(bool), '✓', '✗'),
+            'Uniform': np.where(records['uniform_proper'].astype(bool), '✓', '✗'),
+            'Participation': records['participation_level']
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+
+def student_history_view(register, class_data):
+    """Full attendance, incident and monthly summary history for one student"""
+    
+    students = register.get_class_students(class_data['form'], class_data['class_name'])
+    if not students:
+        st.warning("No students in selected class.")
+        return
+    
+    student_options = [f"{s['admission_number']} - {s['first_name']} {s['last_name']}" for s in students]
+    selected_student = st.selectbox("Select Student:", student_options, key="history_student")
+    student = students[student_options.index(selected_student)]
+    
+    history = register.get_student_history(student['student_id'])
+    if history is None:
+        return
+    
+    attendance = history['attendance']
+    incidents = history['incidents']
+    summaries = history['summaries']
+    
+    st.markdown(f"### {student['first_name']} {student['last_name']} ({student['admission_number']})")
+    
+    days_present = sum(1 for r in attendance if r['morning_status'] == 'Present' or r['afternoon_status'] == 'Present')
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Days Recorded", len(attendance))
+    with col2:
+        st.metric("Attendance", f"{days_present/len(attendance)*100:.1f}%" if attendance else "—")
+    with col3:
+        st.metric("Positive Incidents", sum(1 for i in incidents if i['incident_type'] == 'Positive'))
+    with col4:
+        st.metric("Negative Incidents", sum(1 for i in incidents if i['incident_type'] == 'Negative'))
+    
+    tab1, tab2, tab3 = st.tabs(["📈 Monthly Summaries", "📋 Daily Attendance", "⚠️ Incidents"])
+    
+    with tab1:
+        if not summaries:
+            st.info("No monthly summaries yet.")
+        else:
+            st.dataframe(
+                pd.DataFrame({
+                    'Month': [r['month_year'] for r in summaries],
+                    'Class': [f"Form {r['form']} {r['class_name']}" for r in summaries],
+                    'Days': [r['total_days'] for r in summaries],
+                    'Present': [r['days_present'] for r in summaries],
+                    'Absent': [r['days_absent'] for r in summaries],
+                    'Late': [r['days_late'] for r in summaries],
+                    'Attendance %': [float(r['attendance_percentage']) for r in summaries],
+                    'Homework %': [float(r['homework_completion_rate']) for r in summaries],
+                    'Participation': [r['average_participation'] for r in summaries]
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+    
+    with tab2:
+        if not attendance:
+            st.info("No attendance recorded.")
+        else:
+            st.dataframe(
+                pd.DataFrame({
+                    'Date': [r['attendance_date'] for r in attendance],
+                    'Morning': [r['morning_status'] for r in attendance],
+                    'Afternoon': [r['afternoon_status'] for r in attendance],
+                    'Homework': ['✓' if r['completed_homework'] else '✗' for r in attendance],
+                    'Uniform': ['✓' if r['uniform_proper'] else '✗' for r in attendance],
+                    'Books': ['✓' if r['books_brought'] else '✗' for r in attendance],
+                    'Participation': [r['participation_level'] for r in attendance],
+                    'Notes': [r['teacher_notes'] or '' for r in attendance]
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+    
+    with tab3:
+        if not incidents:
+            st.info("No incidents recorded.")
+        else:
+            st.dataframe(
+                pd.DataFrame({
+                    'Date': [i['incident_date'] for i in incidents],
+                    'Type': [i['incident_type'] for i in incidents],
+                    'Category': [i['incident_category'] for i in incidents],
+                    'Description': [i['description'] for i in incidents],
+                    'Action': [i['action_taken'] or '' for i in incidents],
+                    'Recorded By': [i['recorded_by'] for i in incidents]
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+
+def attendance_range_view(register, start_date, end_date):
+    """Attendance counts over a date range by class and student, with a class day grid"""
+    
+    if end_date < start_date:
+        st.warning("End Date is before the selected start date.")
+        return
+    
+    classes = register.get_classes()
+    class_options = ["All Classes"] + [f"Form {c['form']} {c['class_name']}" for c in classes]
+    class_filter = st.selectbox("Class:", class_options, key="range_class")
+    class_data = classes[class_options.index(class_filter) - 1] if class_filter != "All Classes" else None
+    
+    summary = register.get_attendance_range_summary(
+        start_date, end_date,
+        form=class_data['form'] if class_data else None,
+        class_name=class_data['class_name'] if class_data else None
+    )
+    
+    if not summary:
+        st.info(f"No attendance records between {start_date.strftime('%d %B %Y')} "
+                f"and {end_date.strftime('%d %B %Y')}")
+        return
+    
+    count_columns = ['days_recorded', 'days_present', 'days_absent', 'days_late', 'days_excused']
+    students = pd.DataFrame(summary)
+    students[count_columns] = students[count_columns].astype(int)
+    
+    # Per-class totals and the daily trend come from the class-day rollup
+    stats = register.get_class_daily_stats(
+        start_date, end_date,
+        form=class_data['form'] if class_data else None,
+        class_name=class_data['class_name'] if class_data else None,
+        as_frame=True
+    )
+    if stats is None or stats.empty:
+        st.info("No class totals recorded for this range yet.")
+    else:
+        stats['class'] = "Form " + stats['form'].astype(str) + " " + stats['class_name']
+        stat_columns = ['students_recorded', 'present', 'absent', 'late', 'excused', 'half_day']
+        per_class = stats.groupby(['form', 'class_name', 'class'])[stat_columns].sum().reset_index()
+        class_students = students.groupby(['form', 'class_name']).size()
+    
+        st.markdown("#### By Class")
+        st.dataframe(
+            pd.DataFrame({
+                'Class': per_class['class'],
+                'Students': [class_students.get((form, class_name), 0)
+                             for form, class_name in zip(per_class['form'], per_class['class_name'])],
+                'Student-Days': per_class['students_recorded'],
+                'Present': per_class['present'],
+                'Absent': per_class['absent'],
+                'Late': per_class['late'],
+                'Excused': per_class['excused'],
+                'Half Day': per_class['half_day'],
+                'Attendance %': (per_class['present'] / per_class['students_recorded'] * 100).round(1)
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+    
+        if stats['attendance_date'].nunique() > 1:
+            st.markdown("#### Daily Attendance %")
+            stats['attendance'] = stats['present'] / stats['students_recorded'] * 100
+            trend = stats.pivot(index='attendance_date', columns='class', values='attendance')
+            trend.index = pd.to_datetime(trend.index)
+            st.line_chart(trend)
+    
+    st.markdown("#### By Student")
+    st.dataframe(
+        pd.DataFrame({
+            'Student': students['first_name'] + " " + students['last_name'],
+            'Admission': students['admission_number'],
+            'Class': "Form " + students['form'].astype(str) + " " + students['class_name'],
+            'Days': students['days_recorded'],
+            'Present': students['days_present'],
+            'Absent': students['days_absent'],
+            'Late': students['days_late'],
+            'Excused': students['days_excused'],
+            'Attendance %': (students['days_present'] / students['days_recorded'] * 100).round(1)
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    # The student x date grid is only readable (and cheap) for a single class
+    if class_data:
+        records = register.get_attendance_range(
+            start_date, end_date, form=class_data['form'], class_name=class_data['class_name']
+        )
+        if not records:
+            st.info("No daily records for this class in the selected range.")
+            return
+        
+        daily = pd.DataFrame(records)
+        morning = daily['morning_status']
+        afternoon = daily['afternoon_status']
+        daily['status'] = day_status(morning, afternoon, labels=('✅', '❌', '⚠️', '⏰'))
+        
+        names = students.drop_duplicates('student_id').set_index('student_id')
+        matrix = daily.pivot(index='student_id', columns='attendance_date', values='status')
+        matrix = matrix.reindex(names.index[names.index.isin(matrix.index)])
+        matrix.columns = [pd.Timestamp(day).strftime('%d %b') for day in matrix.columns]
+        matrix.index = (names['first_name'] + " " + names['last_name']).reindex(matrix.index).values
+        
+        st.markdown("#### Daily Grid")
+        st.caption("✅ Full Day · ❌ Absent · ⚠️ Late · ⏰ Half Day")
+        st.dataframe(matrix.fillna(''), use_container_width=True)
 
 def incidents_section(register):
     """Student incidents logging section"""
@@ -1140,7 +5176,7 @@ def incidents_section(register):
                     with col1:
                         incident_type = st.selectbox(
                             "Incident Type",
-                            ["Positive", "Negative", "Neutral"]
+                            INCIDENT_TYPES
                         )
                     
                     with col2:
@@ -1172,46 +5208,86 @@ def incidents_section(register):
     
     with tab2:
         # View incidents with filters
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns(3)
         
         with col1:
             incident_type_filter = st.selectbox(
                 "Filter by Type:",
-                ["All", "Positive", "Negative", "Neutral"]
+                ["All"] + INCIDENT_TYPES
             )
         
         with col2:
             # Get classes for filter
             classes = register.get_classes()
-            if classes:
-                class_filter = st.selectbox(
-                    "Filter by Class:",
-                    ["All"] + [f"Form {c['form']} {c['class_name']}" for c in classes]
-                )
+            class_options = ["All"] + [f"Form {c['form']} {c['class_name']}" for c in classes]
+            class_filter = st.selectbox("Filter by Class:", class_options)
+            class_data = classes[class_options.index(class_filter) - 1] if class_filter != "All" else None
+        
+        with col3:
+            student_id_filter = None
+            if class_data:
+                class_students = register.get_class_students(class_data['form'], class_data['class_name'])
+                student_options = ["All"] + [f"{s['admission_number']} - {s['first_name']} {s['last_name']}"
+                                             for s in class_students]
+                student_filter = st.selectbox("Filter by Student:", student_options)
+                if student_filter != "All":
+                    student_id_filter = class_students[student_options.index(student_filter) - 1]['student_id']
             else:
-                class_filter = "All"
+                st.selectbox("Filter by Student:", ["Select a class first"], disabled=True)
+        
+        date_from = date_to = None
+        if st.checkbox("Filter by date range"):
+            col1, col2 = st.columns(2)
+            with col1:
+                date_from = st.date_input("From", date.today().replace(day=1), key="incident_from")
+            with col2:
+                date_to = st.date_input("To", date.today(), key="incident_to")
         
-        # Get incidents
-        incidents = register.get_student_incidents()
+        filters = {
+            'student_id': student_id_filter,
+            'form': class_data['form'] if class_data else None,
+            'class_name': class_data['class_name'] if class_data else None,
+            'incident_type': incident_type_filter if incident_type_filter != "All" else None,
+            'date_from': date_from,
+            'date_to': date_to
+        }
         
-        if not incidents:
+        # Keyset pagination: remember where each page starts, restart when filters change
+        if st.session_state.get('incident_filters') != filters:
+            st.session_state.incident_filters = filters
+            st.session_state.incident_page_starts = [None]
+        page_starts = st.session_state.incident_page_starts
+        
+        total_incidents = register.count_student_incidents(**filters)
+        
+        if total_incidents == 0:
             st.info("No incidents recorded yet.")
         else:
-            # Apply filters
-            filtered_incidents = incidents
-            
-            if incident_type_filter != "All":
-                filtered_incidents = [i for i in filtered_incidents if i['incident_type'] == incident_type_filter]
+            incidents = register.get_student_incidents(
+                **filters,
+                after=page_starts[-1],
+                limit=INCIDENTS_PAGE_SIZE
+            )
             
-            if class_filter != "All":
-                form = int(class_filter.split()[1])
-                class_name = class_filter.split()[2]
-                filtered_incidents = [i for i in filtered_incidents if i['form'] == form and i['class_name'] == class_name]
+            page_number = len(page_starts)
+            page_count = (total_incidents + INCIDENTS_PAGE_SIZE - 1) // INCIDENTS_PAGE_SIZE
             
             # Display incidents
-            st.metric("Total Incidents", len(filtered_incidents))
+            col1, col2, col3 = st.columns([2, 1, 1])
+            with col1:
+                st.metric("Total Incidents", total_incidents)
+                st.caption(f"Page {page_number} of {page_count}")
+            with col2:
+                if st.button("⬅️ Previous", disabled=page_number == 1):
+                    page_starts.pop()
+                    st.rerun()
+            with col3:
+                if st.button("Next ➡️", disabled=page_number >= page_count or not incidents):
+                    last = incidents[-1]
+                    page_starts.append((last['incident_date'], last['incident_id']))
+                    st.rerun()
             
-            for incident in filtered_incidents:
+            for incident in incidents:
                 # Color based on type
                 if incident['incident_type'] == 'Positive':
                     border_color = "#10B981"
@@ -1237,10 +5313,13 @@ def monthly_reports_section(register):
     
     st.markdown('<h2 class="section-header">📈 Monthly Attendance Reports</h2>', unsafe_allow_html=True)
     
-    tab1, tab2 = st.tabs(["📊 Generate Report", "📋 View Reports"])
+    tab1, tab2, tab3 = st.tabs(["📊 Generate Report", "📋 View Reports", "🗓️ Term Reports"])
     
     with tab1:
         st.markdown("### Generate Monthly Summary")
+        st.caption("Summaries are updated automatically whenever attendance is saved. "
+                   "Generating recomputes the whole month from the daily records in the background, "
+                   "so you can leave this page while it runs.")
         
         col1, col2 = st.columns(2)
         
@@ -1254,13 +5333,44 @@ def monthly_reports_section(register):
         with col2:
             st.write("")  # Spacing
             if st.button("📊 Generate Monthly Summary", type="primary"):
-                with st.spinner("Calculating monthly summary..."):
-                    updated_count = register.calculate_monthly_summary(month_year)
-                    
-                    if updated_count > 0:
-                        st.success(f"✅ Monthly summary generated for {updated_count} students!")
+                job_id = register.submit_summary_job(month_year)
+                if job_id is not None:
+                    st.session_state.summary_job_id = job_id
+                    get_job_runner().wake()
+            
+            if st.button("🔍 Verify Monthly Summary"):
+                with st.spinner("Comparing with a full recomputation..."):
+                    verification = register.verify_monthly_summary(month_year)
+                
+                if verification is not None:
+                    problems = (len(verification['mismatches']) + len(verification['missing'])
+                                + len(verification['unexpected']))
+                    if problems == 0:
+                        st.success(f"✅ All {verification['checked']} summary rows match the daily records.")
                     else:
-                        st.info("No attendance data found for calculation.")
+                        st.warning(f"{len(verification['mismatches'])} differing values, "
+                                   f"{len(verification['missing'])} missing rows and "
+                                   f"{len(verification['unexpected'])} unexpected rows. "
+                                   "Generate the summary to rebuild this month.")
+                        if verification['mismatches']:
+                            st.dataframe(pd.DataFrame(verification['mismatches']), hide_index=True)
+        
+        job_running = summary_job_progress(register)
+        
+        with st.expander("Recent summary jobs"):
+            jobs = register.get_recent_summary_jobs()
+            if jobs:
+                st.dataframe(pd.DataFrame([{
+                    'Job': job['job_id'],
+                    'Month': job['month_year'],
+                    'Status': job['status'],
+                    'Students': f"{job['students_processed']}/{job['students_total']}",
+                    'Updated': job['students_updated'],
+                    'Duration (s)': job['duration_seconds'],
+                    'Error': job['error'] or ""
+                } for job in jobs]), hide_index=True)
+            else:
+                st.info("No summary jobs yet.")
     
     with tab2:
         st.markdown("### View Monthly Reports")
@@ -1297,20 +5407,22 @@ def monthly_reports_section(register):
                     summary = register.get_monthly_summary(
                         month_year=report_month,
                         form=form,
-                        class_name=class_name
+                        class_name=class_name,
+                        as_frame=True
                     )
                 else:
-                    summary = register.get_monthly_summary(month_year=report_month)
+                    summary = register.get_monthly_summary(month_year=report_month, as_frame=True)
                 
-                if not summary:
+                if summary.empty:
                     st.info(f"No monthly report found for {report_month}")
                 else:
                     st.success(f"✅ Loaded report for {len(summary)} students")
                     
                     # Overall statistics
+                    attendance = summary['attendance_percentage']
                     total_students = len(summary)
-                    avg_attendance = np.mean([s['attendance_percentage'] for s in summary])
-                    perfect_attendance = sum(1 for s in summary if s['attendance_percentage'] == 100)
+                    avg_attendance = attendance.mean()
+                    perfect_attendance = int((attendance == 100).sum())
                     
                     col1, col2, col3 = st.columns(3)
                     with col1:
@@ -1321,38 +5433,22 @@ def monthly_reports_section(register):
                         st.metric("Perfect Attendance", perfect_attendance)
                     
                     # Display report
-                    display_data = []
-                    for record in summary:
-                        # Determine attendance status
-                        if record['attendance_percentage'] >= 90:
-                            status = "Excellent"
-                            color = "green"
-                        elif record['attendance_percentage'] >= 80:
-                            status = "Good"
-                            color = "blue"
-                        elif record['attendance_percentage'] >= 70:
-                            status = "Fair"
-                            color = "orange"
-                        else:
-                            status = "Poor"
-                            color = "red"
-                        
-                        display_data.append({
-                            'Student': f"{record['first_name']} {record['last_name']}",
-                            'Admission': record['admission_number'],
-                            'Class': f"Form {record['form']} {record['class_name']}",
-                            'Attendance %': f"{record['attendance_percentage']:.1f}%",
-                            'Status': status,
-                            'Present': record['days_present'],
-                            'Absent': record['days_absent'],
-                            'Late': record['days_late'],
-                            'Homework %': f"{record['homework_completion_rate']:.1f}%",
-                            'Participation': record['average_participation']
-                        })
-                    
-                    df = pd.DataFrame(display_data)
+                    df = pd.DataFrame({
+                        'Student': summary['first_name'] + " " + summary['last_name'],
+                        'Admission': summary['admission_number'],
+                        'Class': "Form " + summary['form'].astype(str) + " " + summary['class_name'],
+                        'Attendance %': attendance.round(1),
+                        'Status': np.select([attendance >= 90, attendance >= 80, attendance >= 70],
+                                            ["Excellent", "Good", "Fair"], default="Poor"),
+                        'Present': summary['days_present'],
+                        'Absent': summary['days_absent'],
+                        'Late': summary['days_late'],
+                        'Homework %': summary['homework_completion_rate'].round(1),
+                        'Participation': summary['average_participation']
+                    })
                     st.dataframe(
-                        df.style.background_gradient(subset=['Attendance %'], cmap='RdYlGn'),
+                        df.style.background_gradient(subset=['Attendance %'], cmap='RdYlGn')
+                          .format({'Attendance %': '{:.1f}%', 'Homework %': '{:.1f}%'}),
                         use_container_width=True,
                         hide_index=True
                     )
@@ -1365,6 +5461,291 @@ def monthly_reports_section(register):
                         file_name=f"attendance_report_{report_month}.csv",
                         mime="text/csv"
                     )
+    
+    with tab3:
+        term_reports_tab(register)
+    
+    # Re-run while a job is in progress so its progress bar keeps moving
+    if job_running:
+        time.sleep(JOB_CONFIG['ui_refresh_seconds'])
+        st.rerun()
+
+def term_reports_tab(register):
+    """Per-class and per-student term and academic-year reports from the precomputed rollups"""
+    st.markdown("### Term Reports")
+    st.caption("Term and year summaries are rebuilt from the monthly summaries whenever a month is "
+               "generated. Refresh to pick up attendance saved since then.")
+    
+    current_year = academic_year_of(date.today())
+    start = int(current_year[:4])
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        academic_year = st.selectbox("Academic Year", [f"{year}-{year + 1}" for year in range(start, start - 3, -1)],
+                                     key="term_year")
+    with col2:
+        term = st.selectbox("Term", [1, 2, 3, 0], key="term_term",
+                            format_func=lambda value: f"Term {value}" if value else "Whole Year")
+    with col3:
+        st.write("")
+        if st.button("🔄 Refresh Term Summaries"):
+            with st.spinner("Rolling up monthly summaries..."):
+                written = register.calculate_term_summaries(academic_year, term)
+                if written is not None and term:
+                    register.calculate_term_summaries(academic_year, 0)
+            if written is not None:
+                st.success(f"✅ Term summaries updated for {written} students.")
+    
+    classes = register.get_class_term_summaries(academic_year, term, as_frame=True)
+    period = f"Term {term} {academic_year}" if term else academic_year
+    if classes.empty:
+        st.info(f"No summaries for {period} yet.")
+        return
+    
+    st.markdown(f"#### Classes, {period}")
+    class_view = pd.DataFrame({
+        'Class': "Form " + classes['form'].astype(str) + " " + classes['class_name'],
+        'Teacher': classes['class_teacher'].fillna(""),
+        'Students': classes['students'],
+        'Attendance %': classes['attendance_percentage'].round(1),
+        'Present': classes['days_present'],
+        'Absent': classes['days_absent'],
+        'Late': classes['days_late'],
+        'Homework %': classes['homework_completion_rate'].round(1),
+        'Uniform %': classes['uniform_compliance_rate'].round(1)
+    })
+    if term:
+        class_view.insert(4, 'Target %', classes['target_attendance'].astype(float).round(1))
+    st.dataframe(class_view, use_container_width=True, hide_index=True)
+    
+    class_options = ["All"] + class_view['Class'].tolist()
+    class_filter = st.selectbox("Students in:", class_options, key="term_class")
+    selected = classes.iloc[class_options.index(class_filter) - 1] if class_filter != "All" else None
+    students = register.get_term_summary(
+        academic_year, term,
+        form=int(selected['form']) if selected is not None else None,
+        class_name=selected['class_name'] if selected is not None else None,
+        as_frame=True
+    )
+    if students.empty:
+        return
+    
+    attendance = students['attendance_percentage']
+    student_view = pd.DataFrame({
+        'Student': students['first_name'] + " " + students['last_name'],
+        'Admission': students['admission_number'],
+        'Class': "Form " + students['form'].astype(str) + " " + students['class_name'],
+        'Attendance %': attendance.round(1),
+        'Status': np.select([attendance >= 90, attendance >= 80, attendance >= 70],
+                            ["Excellent", "Good", "Fair"], default="Poor"),
+        'Days': students['total_days'],
+        'Present': students['days_present'],
+        'Absent': students['days_absent'],
+        'Late': students['days_late'],
+        'Homework %': students['homework_completion_rate'].round(1)
+    })
+    st.dataframe(student_view, use_container_width=True, hide_index=True)
+    st.download_button(
+        label="📥 Download as CSV",
+        data=student_view.to_csv(index=False),
+        file_name=f"term_report_{academic_year}_{'year' if term == 0 else f'term{term}'}.csv",
+        mime="text/csv"
+    )
+
+def summary_job_progress(register):
+    """Show the progress of this session's summary job; returns True while it is still running"""
+    job_id = st.session_state.get('summary_job_id')
+    if job_id is None:
+        return False
+    
+    job = register.get_summary_job(job_id)
+    if job is None:
+        return False
+    
+    total = job['students_total'] or 0
+    processed = job['students_processed'] or 0
+    label = (f"Job #{job['job_id']} for {job['month_year']}: {job['status']} "
+             f"({processed}/{total} students, {job['classes_processed']}/{job['classes_total']} classes)")
+    
+    if job['status'] == 'Completed':
+        st.progress(1.0, text=label)
+        st.success(f"✅ Monthly summary generated for {job['students_updated']} students "
+                   f"in {float(job['duration_seconds'] or 0):.1f}s")
+        return False
+    if job['status'] == 'Failed':
+        st.progress(processed / total if total else 0.0, text=label)
+        st.error(f"Summary job failed: {job['error']}. Generate again to resume from the last finished class.")
+        return False
+    
+    st.progress(processed / total if total else 0.0, text=label)
+    return True
+
+def attendance_queue_panel(queue, replayer):
+    """Depth of the local attendance queue, the replayer's state and the submissions the database rejected"""
+    depth = queue.depth()
+    
+    if not replayer.is_alive():
+        st.error("The attendance replayer has stopped; restart the app to resume writing queued submissions.")
+    elif replayer.last_replayed_at:
+        st.caption(f"Replayer running; last replay at {replayer.last_replayed_at:%Y-%m-%d %H:%M:%S}.")
+    else:
+        st.caption("Replayer running; nothing replayed since the app started.")
+    if replayer.last_error:
+        st.caption(f"Last replay error: {replayer.last_error}")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Waiting Submissions", depth['submissions'])
+    with col2:
+        st.metric("Waiting Rows", depth['rows'])
+    with col3:
+        st.metric("Failed Submissions", depth['dead'])
+    
+    if depth['oldest']:
+        st.caption(f"Oldest waiting submission queued at {depth['oldest']}.")
+    
+    if depth['dead']:
+        st.dataframe(pd.DataFrame(queue.dead_letters()), hide_index=True, use_container_width=True)
+        if st.button("🔁 Retry Failed Submissions"):
+            requeued = queue.requeue_dead()
+            replayer.wake()
+            st.success(f"✅ {requeued} submissions queued again.")
+
+def attendance_archive_panel(register):
+    """Archived academic years, and archiving of closed years still in the database"""
+    archives = register.get_archives()
+    if archives:
+        archive_df = pd.DataFrame(archives)
+        archive_df['file_mb'] = archive_df['file_bytes'] / (1024 * 1024)
+        st.dataframe(
+            archive_df[['academic_year', 'status', 'row_count', 'file_mb', 'file_path', 'archived_at']],
+            hide_index=True, use_container_width=True,
+            column_config={'file_mb': st.column_config.NumberColumn("File (MB)", format="%.2f")}
+        )
+    else:
+        st.caption("No academic years have been archived.")
+    
+    years = register.get_archivable_years()
+    if not years:
+        st.caption("Every closed academic year has been archived.")
+        return
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        academic_year = st.selectbox("Academic Year to Archive", years)
+    with col2:
+        st.write("")
+        archive_clicked = st.button("🗄️ Archive Year")
+    st.caption("Archiving moves the year's daily attendance into a compressed file. Its records stay "
+               "viewable but can no longer be changed. Monthly summaries stay in the database.")
+    
+    if archive_clicked:
+        with st.spinner(f"Archiving {academic_year}..."):
+            result = register.archive_academic_year(academic_year)
+        if result is not None:
+            st.success(f"✅ Archived {result['rows']} attendance records for {academic_year} "
+                       f"({result['file_bytes'] / (1024 * 1024):.2f} MB); "
+                       f"{result['deleted']} rows removed from the database.")
+
+def bulk_import_panel(register):
+    """Load students, historical attendance or incidents from a CSV file"""
+    kinds = {'Students': 'students', 'Daily attendance': 'daily_attendance', 'Incidents': 'student_incidents'}
+    
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        kind = kinds[st.selectbox("Import", list(kinds), key="import_kind")]
+    with col2:
+        uploaded = st.file_uploader("CSV file", type=["csv"], key="import_file")
+    
+    columns = IMPORT_TABLES[kind]['columns']
+    st.caption("Columns: " + ", ".join(f"**{column}**" if default is _REQUIRED else column
+                                       for column, (_, default) in columns.items())
+               + ". Bold columns are required; blank cells take the usual defaults. "
+               + ("Each row names its student by student_id or admission_number. "
+                  if kind != 'students' else "")
+               + "Rows already in the database are updated, except incidents, which are always added.")
+    
+    if uploaded is None or not st.button("📥 Import File", type="primary"):
+        return
+    
+    # Rejected rows are usually few; many spill to a temporary file
+    rejects = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024, mode='w+', newline='', encoding='utf-8')
+    status = st.empty()
+    
+    def progress(report):
+        status.caption(f"{report['rows']:,} rows read, {report['imported']:,} imported, "
+                       f"{report['rejected']:,} rejected...")
+    
+    with st.spinner(f"Importing {uploaded.name}..."):
+        report = register.import_csv(kind, uploaded, rejects, progress)
+    if report is None:
+        return
+    
+    status.empty()
+    if 'error' not in report:
+        st.success(f"✅ Imported {report['imported']:,} of {report['rows']:,} rows from {uploaded.name}.")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Rows Read", f"{report['rows']:,}")
+    with col2:
+        st.metric("Imported", f"{report['imported']:,}")
+    with col3:
+        st.metric("Rejected", f"{report['rejected']:,}")
+    with col4:
+        st.metric("Rows / Second", f"{report['rows_per_second']:,.0f}")
+    st.caption(f"Loaded in {report['seconds']:.1f}s; summaries and caches refreshed in "
+               f"{report['refresh_seconds']:.1f}s.")
+    
+    if report['rejected']:
+        shown = len(report['rejections'])
+        st.warning(f"{report['rejected']:,} rows were rejected"
+                   + (f" (first {shown:,} shown)" if shown < report['rejected'] else "") + ".")
+        st.dataframe(pd.DataFrame(report['rejections']), hide_index=True, use_container_width=True)
+        rejects.seek(0)
+        st.download_button(
+            label="📥 Download Rejected Rows (CSV)",
+            data=rejects.read(),
+            file_name=f"rejected_{kind}_{date.today():%Y%m%d}.csv",
+            mime="text/csv"
+        )
+
+def query_performance_panel(tracer):
+    """Top statements by total time, count or p95 for this process"""
+    summary = tracer.summary()
+    
+    slow_log = tracer.slow_log_path or "off"
+    st.caption(f"Statements traced since the app started (last {tracer.buffer_size} executions). "
+               f"Slow-query log: {slow_log}, threshold {tracer.slow_query_ms} ms.")
+    
+    if summary.empty:
+        st.info("No queries traced yet.")
+        return
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        order = st.radio("Sort by:", ["Total time", "Count", "p95"], horizontal=True, key="trace_order")
+    with col2:
+        if st.button("🧹 Reset Trace"):
+            tracer.clear()
+            st.rerun()
+    
+    sort_column = {'Total time': 'total_ms', 'Count': 'count', 'p95': 'p95_ms'}[order]
+    top = summary.sort_values(sort_column, ascending=False).head(25)
+    
+    st.dataframe(
+        pd.DataFrame({
+            'Statement': top['fingerprint'],
+            'Count': top['count'],
+            'Total ms': top['total_ms'].round(1),
+            'Mean ms': top['mean_ms'].round(2),
+            'p95 ms': top['p95_ms'].round(2),
+            'Max ms': top['max_ms'].round(1),
+            'Rows': top['rows'],
+            'Called from': top['callers']
+        }),
+        hide_index=True,
+        use_container_width=True
+    )
 
 def settings_section(register):
     """Settings section"""
@@ -1376,12 +5757,12 @@ def settings_section(register):
     col1, col2 = st.columns(2)
     
     with col1:
-        if st.button("🔄 Recreate Database Tables", type="secondary"):
-            with st.spinner("Recreating tables..."):
+        if st.button("🔄 Apply Schema Migrations", type="secondary"):
+            with st.spinner("Updating database schema..."):
                 if register.setup_database():
-                    st.success("✅ Database tables recreated successfully!")
+                    st.success("✅ Database schema is up to date!")
                 else:
-                    st.error("❌ Failed to recreate tables.")
+                    st.error("❌ Failed to update the database schema.")
     
     with col2:
         if st.button("🧹 Clear Test Data", type="secondary"):
@@ -1391,23 +5772,46 @@ def settings_section(register):
                 # Add delete logic here
                 st.info("Delete functionality coming soon...")
     
+    # Students are maintained outside this app, so cached class lists can go stale
+    if st.button("♻️ Refresh Class Lists", type="secondary"):
+        register.invalidate_students()
+        st.success("✅ Classes and rosters will be reloaded from the database.")
+    
     st.markdown("### Export Data")
     
     if st.button("📤 Export All Data to CSV", type="primary"):
-        # Get all data
-        incidents = register.get_student_incidents()
-        # Add more data exports as needed
-        
-        if incidents:
-            incidents_df = pd.DataFrame(incidents)
-            csv = incidents_df.to_csv(index=False)
-            
-            st.download_button(
-                label="📥 Download Incidents CSV",
-                data=csv,
-                file_name="school_incidents_export.csv",
-                mime="text/csv"
-            )
+        # The zip is built in a temporary file, so exporting never holds every table in memory.
+        # download_button still reads the finished zip into memory (Streamlit serves downloads
+        # from its in-memory media store), so the file is removed as soon as it has been read
+        export_file = tempfile.NamedTemporaryFile(suffix='.zip', delete=False)
+        try:
+            with export_file, st.spinner("Exporting tables..."):
+                row_counts = register.export_tables(export_file)
+            
+            if row_counts is not None:
+                st.success("✅ Export ready: " + ", ".join(f"{table} ({count} rows)"
+                                                         for table, count in row_counts.items()))
+                with open(export_file.name, 'rb') as export_data:
+                    st.download_button(
+                        label="📥 Download Export (zip of CSV files)",
+                        data=export_data,
+                        file_name=f"northlea_export_{date.today():%Y%m%d}.zip",
+                        mime="application/zip"
+                    )
+        finally:
+            os.remove(export_file.name)
+    
+    st.markdown("### Bulk Import")
+    bulk_import_panel(register)
+    
+    st.markdown("### Attendance Queue")
+    attendance_queue_panel(get_attendance_queue(), get_attendance_replayer())
+    
+    st.markdown("### Attendance Archive")
+    attendance_archive_panel(register)
+    
+    st.markdown("### Query Performance")
+    query_performance_panel(register.tracer)
     
     st.markdown("### System Information")
     
@@ -0,0 +1,37 @@
+"""Registers on throwaway SQLite databases, loaded with the benchmarks' synthetic school"""
+from datetime import date
+
+import pytest
+
+import register
+from benchmarks.fixtures import load_school
+
+SCHOOL = dict(forms=2, classes_per_form=2, students_per_class=8, days=15,
+              incident_rate=0.02, start=date(2024, 11, 4), seed=1)
+
+def make_register(pool):
+    return register.SchoolRegisterSystem(
+        pool=pool,
+        cache=register.TTLCache(**register.CACHE_CONFIG),
+        history_cache=register.TTLCache(**register.HISTORY_CACHE_CONFIG),
+        tracer=register.QueryTracer(100, 500, None),
+    )
+
+@pytest.fixture
+def pool():
+    pool = register.ConnectionPool(register.SQLiteBackend(':memory:'), pool_size=4)
+    yield pool
+    pool.close_all()
+
+@pytest.fixture
+def system(pool):
+    system = make_register(pool)
+    assert system.run_migrations() is not None
+    return system
+
+@pytest.fixture
+def school(system):
+    """(students, school days) of a loaded school whose monthly summaries are up to date"""
+    students, days, _ = load_school(system.pool, **SCHOOL)
+    system.calculate_monthly_summaries(sorted({day.strftime("%Y-%m") for day in days}))
+    return students, days
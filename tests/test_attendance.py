@@ -0,0 +1,45 @@
+import register
+from benchmarks.synthetic import ATTENDANCE_COLUMNS, generate_attendance
+
+def test_a_day_given_as_text_and_as_a_date_is_one_row(system, school):
+    students, days = school
+    day = days[-1]
+    row = dict(zip(ATTENDANCE_COLUMNS, next(generate_attendance(students[:1], [day], seed=3))))
+    replayed = dict(row, attendance_date=day.isoformat(), morning_status='Absent', afternoon_status='Absent')
+    marked = dict(row, attendance_date=day, morning_status='Late', afternoon_status='Present')
+    
+    assert system.save_attendance([replayed, marked]) == {'inserted': 0, 'updated': 1}
+    
+    saved = system._fetch_all("SELECT morning_status, afternoon_status FROM daily_attendance "
+                              "WHERE student_id = %s AND attendance_date = %s", (row['student_id'], day))
+    assert saved == [{'morning_status': 'Late', 'afternoon_status': 'Present'}]
+    result = system.verify_monthly_summary(day.strftime("%Y-%m"))
+    assert not (result['mismatches'] or result['missing'] or result['unexpected'])
+
+def test_only_new_and_changed_marks_are_written(system, school):
+    students, days = school
+    form, class_name = students[0][10], students[0][11]
+    day = days[-1]
+    connection = system.pool.acquire()
+    connection.cursor().execute("DELETE FROM daily_attendance WHERE student_id = %s AND attendance_date = %s",
+                                (students[0][0], day))
+    connection.commit()
+    system.pool.release(connection)
+    existing = system.get_todays_attendance(form, class_name, day, key_by_student=True)
+    class_students = [s for s in students if (s[10], s[11]) == (form, class_name)]
+    submitted = [dict(zip(ATTENDANCE_COLUMNS, row)) for row in generate_attendance(class_students[:1], [day])]
+    for student in class_students[1:]:
+        record = existing[student[0]]
+        submitted.append({column: record[column] for column in ATTENDANCE_COLUMNS})
+    submitted[1]['morning_status'] = 'Excused' if submitted[1]['morning_status'] != 'Excused' else 'Late'
+    submitted[2]['recorded_by'] = "Someone else"
+    submitted[3]['completed_homework'] = bool(submitted[3]['completed_homework'])
+    
+    changes, counts = register.attendance_changes(submitted, existing)
+    
+    assert counts == {'new': 1, 'changed': 1, 'unchanged': len(class_students) - 2}
+    assert [row['student_id'] for row in changes] == [class_students[0][0], class_students[1][0]]
+    assert system.save_attendance(changes) == {'inserted': 1, 'updated': 1}
+    changes, counts = register.attendance_changes(
+        submitted, system.get_todays_attendance(form, class_name, day, key_by_student=True))
+    assert changes == [] and counts['unchanged'] == len(class_students)
@@ -0,0 +1,72 @@
+import sqlite3
+import time
+
+import pytest
+
+import register
+from benchmarks.synthetic import ATTENDANCE_COLUMNS, generate_attendance
+
+@pytest.fixture
+def queue(tmp_path):
+    return register.AttendanceQueue(str(tmp_path / "queue.db"))
+
+def _submission(students, day, seed):
+    return [dict(zip(ATTENDANCE_COLUMNS, row)) for row in generate_attendance(students, [day], seed=seed)]
+
+def test_a_bad_submission_is_dead_lettered_and_the_rest_written(system, school, queue):
+    students, days = school
+    good = _submission(students[:3], days[-1], seed=11)
+    bad = [{key: value for key, value in row.items() if key != 'recorded_by'}
+           for row in _submission(students[3:5], days[-1], seed=12)]
+    good_id = queue.append(good)
+    bad_id = queue.append(bad)
+    replayer = register.AttendanceReplayer(queue, system, batch_rows=100, poll_seconds=1, retry_seconds=1)
+    
+    assert replayer._replay(queue.next_batch(100))
+    
+    assert queue.depth()['submissions'] == 0 and queue.depth()['dead'] == 1
+    dead = queue.dead_letters()
+    assert [row['submission_id'] for row in dead] == [bad_id]
+    assert dead[0]['attempts'] == 1 and dead[0]['last_error'].startswith("Invalid submission")
+    assert good_id not in [submission_id for submission_id, _ in queue.next_batch(100)]
+    assert not queue.pending(bad[0]['form'], bad[0]['class_name'], days[-1])
+    saved = system._fetch_all("SELECT student_id, morning_status FROM daily_attendance WHERE attendance_date = %s "
+                              "AND student_id IN (%s, %s, %s)", (days[-1], *[row['student_id'] for row in good]))
+    assert sorted((row['student_id'], row['morning_status']) for row in saved) == sorted(
+        (row['student_id'], row['morning_status']) for row in good)
+    
+    assert queue.requeue_dead() == 1
+    assert [submission_id for submission_id, _ in queue.next_batch(100)] == [bad_id]
+
+def test_an_outage_keeps_the_batch_queued(queue):
+    class Unreachable:
+        def apply_attendance(self, attendance_data, batch_size=None):
+            raise register.OperationalError(msg="Lost connection to MySQL server")
+    submission_id = queue.append([{'student_id': 1, 'attendance_date': '2024-11-04',
+                                   'form': 1, 'class_name': 'A'}])
+    replayer = register.AttendanceReplayer(queue, Unreachable(), batch_rows=100, poll_seconds=1, retry_seconds=1)
+    
+    assert not replayer._replay(queue.next_batch(100))
+    
+    assert queue.depth()['submissions'] == 1 and queue.depth()['dead'] == 0
+    assert [submission_id for submission_id, _ in queue.next_batch(100)] == [submission_id]
+
+def test_a_failing_replay_does_not_stop_the_replayer(system, school, queue):
+    students, days = school
+    queue.append(_submission(students[:2], days[-1], seed=13))
+    next_batch = queue.next_batch
+    failures = []
+    def next_batch_failing_once(max_rows):
+        if not failures:
+            failures.append(max_rows)
+            raise sqlite3.OperationalError("database is locked")
+        return next_batch(max_rows)
+    queue.next_batch = next_batch_failing_once
+    
+    replayer = register.AttendanceReplayer(queue, system, batch_rows=100, poll_seconds=1, retry_seconds=0.01).start()
+    deadline = time.monotonic() + 5
+    while queue.depth()['submissions'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    
+    assert replayer.is_alive() and queue.depth()['submissions'] == 0
+    assert replayer.last_replayed_at is not None and "database is locked" in replayer.last_error
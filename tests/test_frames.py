@@ -0,0 +1,26 @@
+import sqlite3
+from decimal import Decimal
+
+def test_decimal_columns_become_floats_when_the_first_row_is_null(system, school, monkeypatch):
+    # MySQL returns DECIMAL columns as Decimal; make SQLite do the same
+    monkeypatch.setitem(sqlite3.converters, 'DECIMAL', lambda value: Decimal(value.decode()))
+    students, _ = school
+    connection = system.pool.acquire()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("UPDATE monthly_attendance_summary SET attendance_percentage = NULL WHERE student_id = %s",
+                       (students[0][0],))
+        cursor.close()
+        connection.commit()
+    finally:
+        system.pool.release(connection)
+    
+    assert system.connect_db()
+    try:
+        frame = system._fetch_frame("SELECT student_id, attendance_percentage FROM monthly_attendance_summary "
+                                    "ORDER BY attendance_percentage IS NOT NULL, student_id")
+    finally:
+        system.close_db()
+    
+    assert frame['attendance_percentage'].isna().iloc[0]
+    assert frame['attendance_percentage'].dtype == float
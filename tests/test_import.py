@@ -0,0 +1,45 @@
+import csv
+import io
+
+def test_rejected_rows_are_reported_by_file_line(system, school):
+    students, days = school
+    admission_number = students[0][1]
+    day = days[-1].isoformat()
+    text = io.StringIO(
+        "admission_number,attendance_date,morning_status,teacher_notes\n"
+        f"{admission_number},{day},Late,\n"
+        f"{admission_number},{day},Asleep,\n"
+        f'{admission_number},{day},Absent,"Left early:\nunwell"\n'
+        f"NO-SUCH-STUDENT,{day},Present,\n"
+        f"{admission_number},not-a-date,Present,\n"
+    )
+    rejects = io.StringIO()
+    
+    report = system.import_csv('daily_attendance', text, rejects, chunk_rows=2)
+    
+    assert (report['rows'], report['imported'], report['rejected']) == (5, 2, 3)
+    assert [rejection['line'] for rejection in report['rejections']] == [3, 6, 7]
+    rejects.seek(0)
+    rejected = list(csv.DictReader(rejects))
+    assert [(row['line'], row['morning_status']) for row in rejected] == [('3', 'Asleep'), ('6', 'Present'),
+                                                                          ('7', 'Present')]
+    saved = system._fetch_all("SELECT morning_status, teacher_notes FROM daily_attendance "
+                              "WHERE student_id = %s AND attendance_date = %s", (students[0][0], days[-1]))
+    assert saved == [{'morning_status': 'Absent', 'teacher_notes': "Left early:\nunwell"}]
+
+def test_a_student_id_taken_by_another_student_is_rejected(system, school):
+    students, _ = school
+    taken_id = students[1][0]
+    before = system._fetch_all("SELECT * FROM students WHERE student_id = %s", (taken_id,))
+    text = io.StringIO(
+        "student_id,admission_number,first_name,last_name\n"
+        f"{taken_id},NEW-0001,Someone,Else\n"
+        f"{students[0][0]},{students[0][1]},Renamed,Student\n"
+    )
+    
+    report = system.import_csv('students', text)
+    
+    assert (report['imported'], report['rejected']) == (1, 1)
+    assert report['rejections'][0]['line'] == 2 and str(students[1][1]) in report['rejections'][0]['error']
+    assert system._fetch_all("SELECT * FROM students WHERE student_id = %s", (taken_id,)) == before
+    assert not system._fetch_all("SELECT student_id FROM students WHERE admission_number = 'NEW-0001'")
@@ -0,0 +1,153 @@
+import io
+from datetime import date
+
+import register
+from benchmarks.fixtures import insert_rows
+from benchmarks.synthetic import (ATTENDANCE_COLUMNS, STUDENT_COLUMNS, generate_attendance,
+                                  generate_students, school_days)
+from tests.conftest import make_register
+
+def _pre_series_database(pool):
+    """A database from before versioned migrations: the original tables, with attendance and summaries"""
+    # Schools created students themselves, without the admission-number key
+    connection = pool.acquire()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"CREATE TABLE students (student_id INTEGER PRIMARY KEY, "
+                       f"{', '.join(f'{column} TEXT' for column in STUDENT_COLUMNS[1:])})")
+        cursor.close()
+        connection.commit()
+    finally:
+        pool.release(connection)
+    backend = pool.backend
+    backend.migrations = register.SQLITE_MIGRATIONS[1:2]
+    system = make_register(pool)
+    assert system.run_migrations() == [1]
+    
+    students = generate_students(2, 1, 6, seed=3)
+    days = school_days(date(2024, 11, 4), 30)
+    connection = pool.acquire()
+    try:
+        insert_rows(connection, "students", STUDENT_COLUMNS, students)
+        insert_rows(connection, "daily_attendance", ATTENDANCE_COLUMNS,
+                    generate_attendance(students, days, seed=3))
+        cursor = connection.cursor()
+        cursor.execute("""
+            INSERT INTO monthly_attendance_summary
+            (student_id, admission_number, month_year, form, class_name, total_days, days_present)
+            SELECT student_id, admission_number, strftime('%Y-%m', attendance_date), form, class_name,
+                   COUNT(*), SUM(morning_status = 'Present' OR afternoon_status = 'Present')
+            FROM daily_attendance
+            GROUP BY student_id, strftime('%Y-%m', attendance_date)
+        """)
+        cursor.execute("DROP TABLE schema_migrations")
+        cursor.close()
+        connection.commit()
+    finally:
+        pool.release(connection)
+    
+    backend.migrations = register.SQLITE_MIGRATIONS
+    return students, days
+
+def _months(days):
+    return sorted({day.strftime("%Y-%m") for day in days})
+
+def test_upgrade_backfills_summary_counters(pool):
+    _, days = _pre_series_database(pool)
+    system = make_register(pool)
+    
+    applied = system.run_migrations()
+    
+    assert applied == [version for version, _, _ in register.SQLITE_MIGRATIONS]
+    for month_year in _months(days):
+        result = system.verify_monthly_summary(month_year)
+        assert result['checked'] > 0
+        assert not (result['mismatches'] or result['missing'] or result['unexpected'])
+
+def test_upgrade_repairs_counters_left_unpopulated(system, school):
+    _, days = school
+    connection = system.pool.acquire()
+    try:
+        cursor = connection.cursor()
+        # As left by a version-2 backfill that failed after its columns were committed
+        cursor.execute("UPDATE monthly_attendance_summary SET "
+                       + ", ".join(f"{column} = 0" for column in register.SUMMARY_COUNTERS[5:]))
+        cursor.execute("DELETE FROM schema_migrations WHERE version = 9")
+        cursor.close()
+        connection.commit()
+    finally:
+        system.pool.release(connection)
+    
+    assert system.run_migrations() == [9]
+    for month_year in _months(days):
+        result = system.verify_monthly_summary(month_year)
+        assert not (result['mismatches'] or result['missing'] or result['unexpected'])
+
+def test_migrations_are_idempotent(system):
+    assert system.run_migrations() == []
+
+def _indexes(pool, table):
+    connection = pool.acquire()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        indexes = pool.backend.table_indexes(cursor, table)
+        cursor.close()
+        return indexes
+    finally:
+        pool.release(connection)
+
+def test_upgrade_merges_duplicate_students_and_adds_their_key(pool):
+    students, days = _pre_series_database(pool)
+    kept = students[0]
+    extra_day = date(2024, 11, 9)       # a Saturday, so not in the school calendar
+    connection = pool.acquire()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT morning_status FROM daily_attendance WHERE student_id = %s AND attendance_date = %s",
+                       (kept[0], days[0]))
+        kept_status = cursor.fetchone()['morning_status']
+        # A second record under the same admission number, with one clashing and one extra day
+        cursor.execute("INSERT INTO students (admission_number, first_name, last_name, form, class_name) "
+                       "VALUES (%s, 'Again', 'Entered', %s, %s)", (kept[1], kept[10], kept[11]))
+        duplicate_id = cursor.lastrowid
+        for day, status in ((days[0], 'Excused'), (extra_day, 'Late')):
+            cursor.execute("INSERT INTO daily_attendance (student_id, admission_number, attendance_date, "
+                           "form, class_name, morning_status, afternoon_status) "
+                           "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                           (duplicate_id, kept[1], day, kept[10], kept[11], status, status))
+        cursor.execute("INSERT INTO student_incidents (student_id, incident_date, incident_type, description) "
+                       "VALUES (%s, %s, 'Neutral', 'Entered twice')", (duplicate_id, days[0]))
+        cursor.close()
+        connection.commit()
+    finally:
+        pool.release(connection)
+    assert 'idx_students_class' not in _indexes(pool, 'students')
+    system = make_register(pool)
+    
+    assert system.run_migrations() is not None
+    
+    indexes = _indexes(pool, 'students')
+    assert (True, ('admission_number',)) in indexes.values()
+    assert 'idx_students_class' in indexes
+    assert system._fetch_all("SELECT student_id FROM students WHERE admission_number = %s", (kept[1],)) \
+        == [{'student_id': kept[0]}]
+    attendance = {row['attendance_date']: row['morning_status'] for row in system._fetch_all(
+        "SELECT attendance_date, morning_status FROM daily_attendance WHERE student_id = %s", (kept[0],))}
+    assert attendance[days[0]] == kept_status
+    assert attendance[extra_day] == 'Late'
+    assert system._fetch_all("SELECT student_id FROM student_incidents WHERE description = 'Entered twice'") \
+        == [{'student_id': kept[0]}]
+    result = system.verify_monthly_summary(extra_day.strftime("%Y-%m"))
+    assert not (result['mismatches'] or result['missing'] or result['unexpected'])
+
+def test_student_import_updates_rows_on_an_upgraded_database(pool):
+    students, _ = _pre_series_database(pool)
+    system = make_register(pool)
+    assert system.run_migrations() is not None
+    
+    report = system.import_csv('students', io.StringIO(
+        f"admission_number,first_name,last_name\n{students[0][1]},Renamed,Student\n"))
+    
+    assert report['imported'] == 1 and report['rejected'] == 0
+    assert system._fetch_all("SELECT student_id, first_name FROM students WHERE admission_number = %s",
+                             (students[0][1],)) == [{'student_id': students[0][0], 'first_name': 'Renamed'}]
@@ -0,0 +1,23 @@
+import pytest
+
+import register
+
+def test_connections_released_after_close_all_are_closed(pool):
+    connection = pool.acquire()
+    pool.close_all()
+    
+    pool.release(connection)
+    
+    assert not connection.is_connected()
+    assert pool.stats()['open'] == 0
+    with pytest.raises(register.PoolError):
+        pool.acquire()
+
+def test_a_connection_that_stops_answering_is_not_pooled(pool):
+    connection = pool.acquire()
+    connection.is_connected = lambda: False
+    
+    pool.release(connection)
+    
+    assert pool.stats() == {'pool_size': pool.pool_size, 'open': 0, 'idle': 0, 'in_use': 0}
+    assert pool.acquire() is not connection
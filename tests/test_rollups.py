@@ -0,0 +1,84 @@
+import random
+
+import register
+from benchmarks.synthetic import ATTENDANCE_COLUMNS, generate_attendance
+
+def _random_saves(system, students, days, saves=20, seed=7):
+    """Saves of random classes and days, each re-marking a few students"""
+    rng = random.Random(seed)
+    for _ in range(saves):
+        day = rng.choice(days)
+        form, class_name = rng.choice(sorted({(s[10], s[11]) for s in students}))
+        class_students = [s for s in students if (s[10], s[11]) == (form, class_name)]
+        rows = [dict(zip(ATTENDANCE_COLUMNS, row))
+                for row in generate_attendance(rng.sample(class_students, 3), [day], seed=rng.random())]
+        assert system.save_attendance(rows) is not None
+
+def _snapshot(system, query):
+    return sorted(tuple(sorted((key, str(value)) for key, value in row.items() if key != 'updated_at'))
+                  for row in system._fetch_all(query))
+
+def test_incremental_monthly_summaries_match_a_full_rebuild(system, school):
+    students, days = school
+    _random_saves(system, students, days)
+    
+    for month_year in sorted({day.strftime("%Y-%m") for day in days}):
+        result = system.verify_monthly_summary(month_year)
+        assert result['checked'] > 0
+        assert not (result['mismatches'] or result['missing'] or result['unexpected'])
+
+def test_class_daily_stats_deltas_match_a_full_rebuild(system, school):
+    students, days = school
+    _random_saves(system, students, days)
+    incremental = _snapshot(system, "SELECT * FROM class_daily_stats")
+    
+    system.rebuild_class_daily_stats()
+    
+    assert _snapshot(system, "SELECT * FROM class_daily_stats") == incremental
+
+def test_term_rollups_follow_saves(system, school):
+    students, days = school
+    academic_year, term = register.term_of(days[0])
+    register_row = {'form': students[0][10], 'class_name': students[0][11], 'academic_year': academic_year,
+                    'term': term, 'total_students': 8, 'class_teacher': "T", 'class_prefect': "",
+                    'assistant_prefect': "", 'target_attendance': 95}
+    assert system.save_class_register(register_row)
+    before = system.get_class_register(register_row['form'], register_row['class_name'], academic_year, term)
+    
+    # Everyone in the first class absent for a day moves its average
+    first_class = [s for s in students if (s[10], s[11]) == (students[0][10], students[0][11])]
+    rows = [dict(zip(ATTENDANCE_COLUMNS, row), morning_status='Absent', afternoon_status='Absent')
+            for row in generate_attendance(first_class, [days[0]], seed=5)]
+    assert system.save_attendance(rows) is not None
+    _random_saves(system, students, days)
+    incremental = {(period, table): _snapshot(system, f"SELECT * FROM {table} WHERE academic_year = '{academic_year}' "
+                                                      f"AND term = {period}")
+                   for period in (term, 0) for table in ('term_attendance_summary', 'class_term_summary')}
+    after = system.get_class_register(register_row['form'], register_row['class_name'], academic_year, term)
+    
+    for period in (term, 0):
+        system.calculate_term_summaries(academic_year, period)
+    
+    assert after['average_attendance'] < before['average_attendance']
+    for (period, table), rows in incremental.items():
+        assert _snapshot(system, f"SELECT * FROM {table} WHERE academic_year = '{academic_year}' "
+                                 f"AND term = {period}") == rows
+    assert system.get_class_register(register_row['form'], register_row['class_name'], academic_year, term) == after
+
+def test_a_failed_term_rollup_leaves_the_save_committed(system, school, monkeypatch):
+    students, days = school
+    academic_year, term = register.term_of(days[0])
+    system.calculate_term_summaries(academic_year, term)
+    before = _snapshot(system, "SELECT * FROM term_attendance_summary")
+    def unreachable(cursor, term_deltas):
+        raise register.OperationalError(msg="Lost connection to MySQL server")
+    monkeypatch.setattr(system, '_apply_term_deltas', unreachable)
+    rows = [dict(zip(ATTENDANCE_COLUMNS, row), morning_status='Absent', afternoon_status='Absent')
+            for row in generate_attendance(students[:2], [days[0]], seed=9)]
+    
+    assert system.save_attendance(rows) is not None
+    
+    saved = system._fetch_all("SELECT morning_status FROM daily_attendance WHERE attendance_date = %s "
+                              "AND student_id IN (%s, %s)", (days[0], students[0][0], students[1][0]))
+    assert [row['morning_status'] for row in saved] == ['Absent', 'Absent']
+    assert _snapshot(system, "SELECT * FROM term_attendance_summary") == before
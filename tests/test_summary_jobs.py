@@ -0,0 +1,84 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import register
+from tests.conftest import make_register
+
+def test_repeated_submits_share_the_open_job(system):
+    first = system.submit_summary_job("2024-11", "tester")
+    
+    assert system.submit_summary_job("2024-11", "tester") == first
+    assert system.submit_summary_job("2024-12", "tester") != first
+
+def test_concurrent_submits_queue_one_job(tmp_path):
+    pool = register.ConnectionPool(register.SQLiteBackend(str(tmp_path / "jobs.db")), pool_size=8)
+    try:
+        assert make_register(pool).run_migrations() is not None
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            job_ids = list(executor.map(lambda _: make_register(pool).submit_summary_job("2024-11", "tester"),
+                                        range(16)))
+        
+        assert len(set(job_ids)) == 1 and None not in job_ids
+        assert len(make_register(pool)._fetch_all("SELECT job_id FROM summary_jobs")) == 1
+    finally:
+        pool.close_all()
+
+def test_submit_resumes_a_failed_job(system):
+    job_id = system.submit_summary_job("2024-11", "tester")
+    connection = system.pool.acquire()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("UPDATE summary_jobs SET status = 'Failed', error = 'boom' WHERE job_id = %s", (job_id,))
+        cursor.close()
+        connection.commit()
+    finally:
+        system.pool.release(connection)
+    
+    assert system.submit_summary_job("2024-11", "tester") == job_id
+    assert system.get_summary_job(job_id)['status'] == 'Queued'
+
+def test_a_missing_job_is_not_run(system):
+    assert system.run_summary_job(12345) is False
+
+def test_a_resumed_job_is_timed_from_its_resume(system, school):
+    _, days = school
+    job_id = system.submit_summary_job(days[0].strftime("%Y-%m"), "tester")
+    connection = system.pool.acquire()
+    try:
+        cursor = connection.cursor()
+        # Started by a process that stopped a day ago
+        long_ago = datetime.now() - timedelta(days=1)
+        cursor.execute("UPDATE summary_jobs SET status = 'Running', started_at = %s, heartbeat_at = %s "
+                       "WHERE job_id = %s", (long_ago, long_ago, job_id))
+        cursor.close()
+        connection.commit()
+    finally:
+        system.pool.release(connection)
+    
+    assert system.claim_summary_job() == job_id
+    assert system.run_summary_job(job_id)
+    
+    job = system.get_summary_job(job_id)
+    assert job['status'] == 'Completed' and float(job['duration_seconds']) < 3600
+
+def test_an_unexpected_error_fails_the_job_and_the_runner_keeps_polling(system, monkeypatch):
+    first = system.submit_summary_job("2024-11", "tester")
+    second = system.submit_summary_job("2024-12", "tester")
+    worker = make_register(system.pool)
+    run_summary_job = worker.run_summary_job
+    def run_failing_first(job_id):
+        if job_id == first:
+            raise RuntimeError("boom")
+        return run_summary_job(job_id)
+    monkeypatch.setattr(worker, 'run_summary_job', run_failing_first)
+    
+    runner = register.SummaryJobRunner(worker, poll_seconds=0.2).start()
+    deadline = time.monotonic() + 5
+    while system.get_summary_job(second)['status'] != 'Completed' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    
+    assert runner._thread.is_alive()
+    failed = system.get_summary_job(first)
+    assert failed['status'] == 'Failed' and "boom" in failed['error']
+    assert system.get_summary_job(second)['status'] == 'Completed'
@@ -0,0 +1,22 @@
+import io
+
+def _callers(system):
+    return {entry['caller'] for entry in system.tracer._entries}
+
+def test_queries_run_through_helpers_are_traced_to_their_caller(system, school):
+    _, days = school
+    system.tracer.clear()
+    
+    system.get_archives()
+    system.get_monthly_summary(days[0].strftime("%Y-%m"), as_frame=True)
+    
+    assert _callers(system) == {'get_archives', 'get_monthly_summary'}
+
+def test_import_writes_are_traced_to_the_import(system, school):
+    students, _ = school
+    system.tracer.clear()
+    
+    system.import_csv('students', io.StringIO(f"admission_number,first_name,last_name\n{students[0][1]},A,B\n"))
+    
+    assert 'insert_rows' not in _callers(system)
+    assert '_write_import_chunk' in _callers(system)